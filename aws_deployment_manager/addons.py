@@ -0,0 +1,132 @@
+"""
+This module updates the images of the add ons of the EKS cluster, kube-proxy, CoreDNS and the Cluster Autoscaler,
+on the asyncio core. The workloads of all the add ons are read with a single kubectl get, the images of the
+changed ones are set concurrently and their rollouts are waited for in parallel, so that the nodes are not
+drained while add ons are still rolling out.
+"""
+
+import json
+import logging
+import re
+from aws_deployment_manager import aio
+from aws_deployment_manager import clock
+from aws_deployment_manager import constants
+from aws_deployment_manager import readiness
+from aws_deployment_manager import utils
+
+LOG = logging.getLogger(__name__)
+
+IMAGE_VERSION_PATTERN = r"\d+\.\d+\.\d+"
+
+
+class AddOn:
+    """ An add on running as a workload of the kube-system namespace """
+
+    def __init__(self, name, kind, workload, target_version):
+        """
+        :param name: Name of the add on in the EKS versions template
+        :param kind: Kind of its workload, deployment or daemonset
+        :param workload: Name of its workload, which is also the name of its container
+        :param target_version: Version of its image for the Kubernetes version
+        """
+        self.name = name
+        self.kind = kind
+        self.workload = workload
+        self.target_version = str(target_version)
+
+    def __repr__(self):
+        return "AddOn({0})".format(self.name)
+
+
+def get_add_ons(kube_proxy_version, core_dns_version, auto_scaler_version):
+    """
+    :param kube_proxy_version: Target version of kube-proxy
+    :param core_dns_version: Target version of CoreDNS
+    :param auto_scaler_version: Target version of the Cluster Autoscaler
+    :return: List of AddOn
+    """
+    return [AddOn(constants.KUBE_PROXY, 'daemonset', 'kube-proxy', kube_proxy_version),
+            AddOn(constants.CORE_DNS, 'deployment', 'coredns', core_dns_version),
+            AddOn(constants.AUTO_SCALER, 'deployment', 'cluster-autoscaler', auto_scaler_version)]
+
+
+def get_target_image(image, target_version):
+    """
+    :param image: Current image of an add on
+    :param target_version: Target version of the add on
+    :return: Image with the version of its tag replaced, e.g. v1.23.16-eksbuild.2 by v1.24.10-eksbuild.2
+    """
+    repository, separator, tag = image.rpartition(':')
+    if not separator or '/' in tag:
+        LOG.warning("Image {0} has no tag, it is not updated".format(image))
+        return image
+    return repository + separator + re.sub(IMAGE_VERSION_PATTERN, target_version, tag, count=1)
+
+
+def get_container_image(workload, container):
+    """
+    :param workload: Deployment or DaemonSet resource
+    :param container: Name of the container
+    :return: Image of the container, the one of the first container if there is none of that name
+    """
+    containers = workload['spec']['template']['spec']['containers']
+    for workload_container in containers:
+        if workload_container['name'] == container:
+            return workload_container['image']
+    return containers[0]['image']
+
+
+async def get_workloads(add_ons, kubeconfig_path):
+    """
+    Get the workloads of add ons with a single kubectl get
+    :param add_ons: List of AddOn
+    :param kubeconfig_path: Path to kubeconfig file
+    :return: Workloads by kind and name
+    """
+    resources = ' '.join("{0}/{1}".format(add_on.kind, add_on.workload) for add_on in add_ons)
+    command = constants.COMMAND_GET_ADD_ON_WORKLOADS.format(resources, kubeconfig_path)
+    resource = json.loads(await utils.execute_command_async(command))
+    # kubectl returns a List of several resources, and a single resource as is
+    return {(item['kind'].lower(), item['metadata']['name']): item for item in resource.get('items', [resource])}
+
+
+async def update_add_on(add_on, image, kubeconfig_path):
+    """
+    Set the image of an add on and wait for its rollout
+    :param add_on: AddOn
+    :param image: New image
+    :param kubeconfig_path: Path to kubeconfig file
+    :return: Seconds taken by the update and the rollout
+    """
+    start = clock.get_clock().monotonic()
+    LOG.info("Updating {0} to {1}...".format(add_on.name, image))
+    await utils.execute_command_async(constants.COMMAND_SET_ADD_ON_IMAGE.format(
+        add_on.kind, add_on.workload, add_on.workload, image, kubeconfig_path))
+    await readiness.wait_for_workload_rollout(add_on.kind, add_on.workload, constants.NAMESPACE_KUBE_SYSTEM,
+                                              kubeconfig_path)
+    return clock.get_clock().monotonic() - start
+
+
+async def update(add_ons, kubeconfig_path):
+    """
+    Update the add ons whose image is not the one of their target version, concurrently
+    :param add_ons: List of AddOn
+    :param kubeconfig_path: Path to kubeconfig file
+    :return: Seconds taken by the update and the rollout, by name of the updated add ons
+    """
+    workloads = await get_workloads(add_ons, kubeconfig_path)
+    updates = []
+    for add_on in add_ons:
+        current_image = get_container_image(workloads[(add_on.kind, add_on.workload)], add_on.workload)
+        target_image = get_target_image(current_image, add_on.target_version)
+        LOG.info("{0}: current image = {1}, target image = {2}".format(add_on.name, current_image, target_image))
+        if current_image == target_image:
+            LOG.info("No change in image version of {0}".format(add_on.name))
+        else:
+            updates.append((add_on, target_image))
+
+    durations = await aio.gather(*[update_add_on(add_on, image, kubeconfig_path) for add_on, image in updates])
+    durations = {add_on.name: duration for (add_on, _), duration in zip(updates, durations)}
+    for name, duration in durations.items():
+        LOG.info("Updated {0} and rolled it out in {1:.0f}s".format(name, duration))
+    return durations
@@ -0,0 +1,81 @@
+"""
+This module implements the asyncio execution core of the commands.
+Blocking AWS calls run in a thread pool shared by the process, subprocesses run with asyncio, and waiters
+sleep on the event loop, so that a coroutine can await groups of independent operations at the cost of
+a gather instead of a thread each.
+The click commands stay synchronous: run() is the façade running a coroutine to completion from
+the main thread or from a stage thread, each with its own event loop.
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from aws_deployment_manager import constants
+
+LOG = logging.getLogger(__name__)
+
+_LOCK = threading.Lock()
+_EXECUTOR = None
+
+
+def get_executor():
+    """
+    Get the thread pool running the blocking operations, created on first use
+    :return: Executor
+    """
+    global _EXECUTOR  # pylint: disable=global-statement
+    with _LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=constants.AIO_MAX_WORKERS, thread_name_prefix='aio')
+        return _EXECUTOR
+
+
+def run(coroutine):
+    """
+    Runs a coroutine to completion on a new event loop. Must not be called from a coroutine,
+    nor from an operation running in the executor, which would hold one of its threads while waiting.
+    :param coroutine: Coroutine
+    :return: Result of the coroutine
+    """
+    return asyncio.run(coroutine)
+
+
+async def call(func, *args, **kwargs):
+    """
+    Runs a blocking function in the executor, without blocking the event loop
+    :param func: Function, e.g. a method of an AWS client or wrapper
+    :param args: Positional arguments of the function
+    :param kwargs: Keyword arguments of the function
+    :return: Result of the function
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+async def gather(*awaitables):
+    """
+    Awaits operations running concurrently. When operations fail the others are still waited for,
+    the failures are logged and the first one is raised.
+    :param awaitables: Coroutines or futures
+    :return: List of the results, in the order of the operations
+    """
+    results = await asyncio.gather(*awaitables, return_exceptions=True)
+    failures = [result for result in results if isinstance(result, BaseException)]
+    if failures:
+        for failure in failures[1:]:
+            LOG.error("Concurrent operation failed: {0}".format(failure))
+        raise failures[0]
+    return results
+
+
+def run_concurrently(*functions):
+    """
+    Runs blocking functions concurrently in the executor and waits for all of them
+    :param functions: Functions without arguments, e.g. functools.partial of wrapper methods
+    :return: List of the results, in the order of the functions
+    """
+    async def run_all():
+        return await gather(*[call(func) for func in functions])
+    return run(run_all())
@@ -0,0 +1,205 @@
+"""
+This module instruments the AWS API calls made through botocore clients.
+Each call is recorded with its service, operation, latency, retries, HTTP status and request ID,
+and the calls are aggregated per operation into latency histograms written as JSON lines next to
+the log file of the command.
+"""
+
+import bisect
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from aws_deployment_manager import clock
+from aws_deployment_manager import timing
+
+LOG = logging.getLogger(__name__)
+
+# Upper bounds in milliseconds of the latency histogram buckets, the last bucket is unbounded
+LATENCY_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+THROTTLING_ERROR_CODES = {
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottledException',
+    'TooManyRequestsException', 'ProvisionedThroughputExceededException', 'TransactionInProgressException',
+    'RequestLimitExceeded', 'BandwidthLimitExceeded', 'LimitExceededException', 'RequestThrottled',
+    'SlowDown', 'PriorRequestNotComplete', 'EC2ThrottledException'
+}
+REPORT_FILE_POSTFIX = "_api_calls.jsonl"
+
+_CONTEXT_KEY = 'apimetrics'
+_LOCK = threading.Lock()
+_OPERATIONS = {}
+
+
+class OperationStats:
+    """ Aggregated statistics of the calls to one operation """
+
+    def __init__(self, service, operation):
+        self.service = service
+        self.operation = operation
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.throttles = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.status_codes = {}
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, latency, retries, throttles, status_code, error):
+        """
+        Adds a call
+        :param latency: Latency in seconds, retries included
+        :param retries: Number of retries
+        :param throttles: Number of throttled attempts
+        :param status_code: HTTP status code of the last attempt, None if there was no response
+        :param error: True if the call failed
+        """
+        self.calls += 1
+        self.errors += 1 if error else 0
+        self.retries += retries
+        self.throttles += throttles
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        status = str(status_code)
+        self.status_codes[status] = self.status_codes.get(status, 0) + 1
+        self.histogram[bisect.bisect_left(LATENCY_BUCKETS_MS, latency * 1000)] += 1
+
+    def as_dict(self):
+        """
+        :return: The statistics as dictionary
+        """
+        return {
+            'service': self.service,
+            'operation': self.operation,
+            'calls': self.calls,
+            'errors': self.errors,
+            'retries': self.retries,
+            'throttles': self.throttles,
+            'total_latency': round(self.total_latency, 3),
+            'mean_latency': round(self.total_latency / self.calls, 3) if self.calls else 0,
+            'max_latency': round(self.max_latency, 3),
+            'status_codes': dict(self.status_codes),
+            'histogram': {'buckets_ms': LATENCY_BUCKETS_MS, 'counts': list(self.histogram)}
+        }
+
+
+def _before_call(model, context, **_kwargs):
+    context[_CONTEXT_KEY] = {
+        'service': model.service_model.service_name,
+        'operation': model.name,
+        'start_time': clock.get_clock().time(),
+        'start': time.perf_counter(),
+        'throttles': 0
+    }
+
+
+def _needs_retry(response, request_dict, **_kwargs):
+    if response is None:
+        return
+    call = request_dict.get('context', {}).get(_CONTEXT_KEY)
+    if call is not None and response[1].get('Error', {}).get('Code') in THROTTLING_ERROR_CODES:
+        call['throttles'] += 1
+
+
+def _after_call(context, parsed=None, **_kwargs):
+    parsed = parsed or {}
+    metadata = parsed.get('ResponseMetadata', {})
+    status_code = metadata.get('HTTPStatusCode')
+    _record(context,
+            retries=metadata.get('RetryAttempts', 0),
+            status_code=status_code,
+            request_id=metadata.get('RequestId'),
+            error='Error' in parsed or (status_code or 0) >= 300)
+
+
+def _after_call_error(context, **_kwargs):
+    # No response, e.g. connection errors once the retries are exhausted
+    _record(context, retries=0, status_code=None, request_id=None, error=True)
+
+
+def _record(context, retries, status_code, request_id, error):
+    call = context.pop(_CONTEXT_KEY, None)
+    if call is None:
+        return
+    latency = time.perf_counter() - call['start']
+    timing.add_span("{0}.{1}".format(call['service'], call['operation']), timing.CATEGORY_AWS_CALL,
+                    call['start_time'], latency)
+    LOG.debug("AWS call {0}.{1} latency={2:.3f}s retries={3} status={4} request_id={5}".format(
+        call['service'], call['operation'], latency, retries, status_code, request_id))
+    key = (call['service'], call['operation'])
+    with _LOCK:
+        if key not in _OPERATIONS:
+            _OPERATIONS[key] = OperationStats(*key)
+        _OPERATIONS[key].add(latency, retries, call['throttles'], status_code, error)
+
+
+def instrument(client):
+    """
+    Registers the instrumentation handlers on a botocore client
+    :param client: boto3/botocore client
+    :return: The same client
+    """
+    events = client.meta.events
+    # First, so that calls answered by another before-call handler (e.g. stubs) are still recorded
+    events.register_first('before-call.*.*', _before_call, unique_id='apimetrics-before-call')
+    events.register('needs-retry.*.*', _needs_retry, unique_id='apimetrics-needs-retry')
+    events.register('after-call.*.*', _after_call, unique_id='apimetrics-after-call')
+    events.register('after-call-error.*.*', _after_call_error, unique_id='apimetrics-after-call-error')
+    return client
+
+
+def get_operation_stats():
+    """
+    :return: List of operation statistics as dictionaries, most called first
+    """
+    with _LOCK:
+        stats = [operation.as_dict() for operation in _OPERATIONS.values()]
+    return sorted(stats, key=lambda operation: operation['calls'], reverse=True)
+
+
+def reset():
+    """
+    Discards the recorded calls
+    """
+    with _LOCK:
+        _OPERATIONS.clear()
+
+
+def get_report_path(log_file_path):
+    """
+    :param log_file_path: Path of the log file of the command
+    :return: Path of the JSON lines report next to it
+    """
+    path = Path(log_file_path)
+    return str(path.with_name(path.stem + REPORT_FILE_POSTFIX))
+
+
+def report(log_file_path):
+    """
+    Logs a summary of the AWS calls of the command and saves the per operation statistics as
+    JSON lines next to its log file. Failures are logged and never raised.
+    :param log_file_path: Path of the log file of the command
+    :return: Path of the report, None if there were no calls or it could not be saved
+    """
+    try:
+        stats = get_operation_stats()
+        if not stats:
+            return None
+        LOG.info("AWS API calls: {0} in total, {1} retries, {2} throttled".format(
+            sum(operation['calls'] for operation in stats),
+            sum(operation['retries'] for operation in stats),
+            sum(operation['throttles'] for operation in stats)))
+        for operation in stats[:10]:
+            LOG.info("  {0:<45} calls={1:<5} mean={2:.3f}s max={3:.3f}s retries={4}".format(
+                operation['service'] + '.' + operation['operation'], operation['calls'],
+                operation['mean_latency'], operation['max_latency'], operation['retries']))
+        report_path = get_report_path(log_file_path)
+        with open(report_path, 'w') as report_file:
+            for operation in stats:
+                report_file.write(json.dumps(operation) + "\n")
+        LOG.info("AWS API call statistics saved to {0}".format(report_path))
+        return report_path
+    except Exception as exception:
+        LOG.warning("Failed to produce the AWS API call report: {0}".format(exception))
+        return None
@@ -3,7 +3,6 @@ Wrapper class for AWS Auto Scaling Service
 """
 
 import logging
-import boto3
 from aws_deployment_manager import constants
 from aws_deployment_manager.aws.aws_base import AwsBase
 
@@ -18,10 +17,7 @@ class AwsASGClient(AwsBase):
         AwsBase.__init__(self, config)
 
         # Initialize Client with AWS Region
-        self.__asg_client = boto3.client(
-            constants.ASG_SERVICE,
-            config=self.get_aws_client_config()
-        )
+        self.__asg_client = self.create_client(constants.ASG_SERVICE)
 
     def describe_auto_scaling_group(self, group_name):
         """
@@ -2,8 +2,9 @@
 This is the base class for AWS Clients
 """
 import logging
-from botocore.config import Config
+from aws_deployment_manager import aio
 from aws_deployment_manager import constants
+from aws_deployment_manager.aws import aws_clientpool
 
 LOG = logging.getLogger(__name__)
 
@@ -20,20 +21,38 @@ class AwsBase:
         self.__config = config
         self.__aws_region = self.__config[constants.AWS_REGION]
 
-        self.__aws_client_config = Config(
-            region_name = self.__aws_region,
-            retries = {
-                'max_attempts': 5,
-                'mode': 'standard'
-            }
-        )
-
     def get_aws_client_config(self):
         """
         Get AWS Client Config
         :return: AWS Client Config
         """
-        return self.__aws_client_config
+        return aws_clientpool.get_client_config(self.__aws_region)
+
+    def create_client(self, service):
+        """
+        Get the AWS client of the service in the region from the pool shared by all the wrappers
+        :param service: Name of AWS service
+        :return: AWS Client
+        """
+        return aws_clientpool.get_client(service, self.__aws_region)
+
+    def create_resource(self, service):
+        """
+        Get the AWS resource of the service in the region from the pool, for the current thread
+        :param service: Name of AWS service
+        :return: AWS Resource
+        """
+        return aws_clientpool.get_resource(service, self.__aws_region)
+
+    async def call_async(self, service, operation, **kwargs):
+        """
+        Call an AWS API operation from a coroutine, in the executor of the asyncio core
+        :param service: Name of AWS service
+        :param operation: Name of the client method, e.g. describe_stacks
+        :param kwargs: Parameters of the operation
+        :return: Response of the operation
+        """
+        return await aio.call(getattr(self.create_client(service), operation), **kwargs)
 
     def get_aws_region(self):
         """
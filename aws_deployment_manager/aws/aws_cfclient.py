@@ -2,15 +2,17 @@
 Wrapper class for AWS Cloudformation Service
 """
 import logging
-import time
-import boto3
 from botocore.exceptions import ClientError
 from aws_deployment_manager import errors
 from aws_deployment_manager import constants
+from aws_deployment_manager import waiter
 from aws_deployment_manager.aws.aws_base import AwsBase
 
 LOG = logging.getLogger(__name__)
 
+STACK_CREATE_FINAL_STATES = ('CREATE_COMPLETE', 'CREATE_FAILED', 'ROLLBACK_COMPLETE', 'ROLLBACK_FAILED')
+STACK_UPDATE_FINAL_STATES = ('UPDATE_COMPLETE', 'UPDATE_ROLLBACK_FAILED', 'UPDATE_ROLLBACK_COMPLETE')
+
 
 class AwsCFClient(AwsBase):
     """
@@ -20,10 +22,7 @@ class AwsCFClient(AwsBase):
         AwsBase.__init__(self, config)
 
         # Initialize Cloudformation Client with AWS Region
-        self.__cloudformation_client = boto3.client(
-            constants.CLOUDFORMATION_SERVICE,
-            config=self.get_aws_client_config()
-        )
+        self.__cloudformation_client = self.create_client(constants.CLOUDFORMATION_SERVICE)
 
     def create_stack(self, stack_name, template_name, template_url, config_parameters):
         """
@@ -258,18 +257,13 @@ class AwsCFClient(AwsBase):
         :return: Stack Response. If stack creation fails, error will be raised
         """
         LOG.info("Waiting for stack {0} to be created".format(stack_name))
-        stack_status = None
-
-        response = None
-        # Wait till stack status is complete or failed. Check every 30 seconds
-        while stack_status not in ('CREATE_COMPLETE', 'CREATE_FAILED'):
-            time.sleep(10)
-            response = self.__cloudformation_client.describe_stacks(
-                StackName=stack_id
-            )
-
-            stack_status = response['Stacks'][0]['StackStatus']
-            LOG.info("Stack Status = {0}".format(stack_status))
+        response = waiter.wait(
+            poll=lambda: self.__cloudformation_client.describe_stacks(StackName=stack_id),
+            until=lambda stack: _get_stack_status(stack) in STACK_CREATE_FINAL_STATES,
+            description="cloudformation create {0}".format(stack_name),
+            backoff=waiter.CLOUDFORMATION_STACK,
+            format_state=_get_stack_status)
+        stack_status = _get_stack_status(response)
 
         if stack_status == 'CREATE_COMPLETE':
             LOG.info("CREATE COMPLETE - Stack {0}".format(stack_name))
@@ -286,18 +280,13 @@ class AwsCFClient(AwsBase):
         :return: Stack Response. If stack update fails, error will be raised
         """
         LOG.info("Waiting for stack {0} to be updated".format(stack_name))
-        stack_status = None
-
-        response = None
-        # Check every 30 sec if stack update is either complete or failed
-        while stack_status not in ('UPDATE_COMPLETE', 'UPDATE_ROLLBACK_FAILED', 'UPDATE_ROLLBACK_COMPLETE'):
-            time.sleep(30)
-            response = self.__cloudformation_client.describe_stacks(
-                StackName=stack_id
-            )
-
-            stack_status = response['Stacks'][0]['StackStatus']
-            LOG.info("Stack Status = {0}".format(stack_status))
+        response = waiter.wait(
+            poll=lambda: self.__cloudformation_client.describe_stacks(StackName=stack_id),
+            until=lambda stack: _get_stack_status(stack) in STACK_UPDATE_FINAL_STATES,
+            description="cloudformation update {0}".format(stack_name),
+            backoff=waiter.CLOUDFORMATION_STACK,
+            format_state=_get_stack_status)
+        stack_status = _get_stack_status(response)
 
         if stack_status == 'UPDATE_COMPLETE':
             LOG.info("UPDATE COMPLETE - Stack {0}".format(stack_name))
@@ -313,33 +302,28 @@ class AwsCFClient(AwsBase):
         :return:
         """
         LOG.info("Waiting for stack {0} to be deleted".format(stack_name))
-        stack_status = None
 
-        # Check every 30 sec till stack deletion is complete or failed
-        while stack_status not in ('DELETE_FAILED', 'DELETE_COMPLETE'):
+        def get_stack_status():
             try:
-                time.sleep(30)
                 response = self.__cloudformation_client.describe_stacks(
                     StackName=stack_name
                 )
-
-                stack_status = response['Stacks'][0]['StackStatus']
-                LOG.info("Stack Status = {0}".format(stack_status))
+                return response['Stacks'][0]['StackStatus']
             except ClientError as client_error:
-                # When stack is deleted, describe_stacks function will raise exception. This is the indication to know
-                # that stack has been deleted
+                # When stack is deleted, describe_stacks function will raise exception. This is the indication
+                # to know that stack has been deleted
                 if client_error.response:
                     message = str(client_error.response['Error']['Message']).lower()
                     if 'does not exist' in message:
-                        stack_status = 'DELETE_COMPLETE'
-                    else:
-                        raise Exception("Delete Stack Failed for {0}. Error is - {1}".
-                                        format(stack_name, client_error)) from client_error
-                else:
-                    raise Exception("Delete Stack Failed for {0}. Error is - {1}".
-                                    format(stack_name, client_error)) from client_error
-            except Exception as exception:
-                raise exception
+                        return 'DELETE_COMPLETE'
+                raise Exception("Delete Stack Failed for {0}. Error is - {1}".
+                                format(stack_name, client_error)) from client_error
+
+        stack_status = waiter.wait(
+            poll=get_stack_status,
+            until=lambda status: status in ('DELETE_FAILED', 'DELETE_COMPLETE'),
+            description="cloudformation delete {0}".format(stack_name),
+            backoff=waiter.CLOUDFORMATION_STACK)
 
         if stack_status == 'DELETE_COMPLETE':
             LOG.info("DELETE COMPLETE - Stack {0}".format(stack_name))
@@ -350,3 +334,11 @@ class AwsCFClient(AwsBase):
 
     def list_stacks(self):
         return self.__cloudformation_client.list_stacks()
+
+
+def _get_stack_status(response):
+    """
+    :param response: Response of describe_stacks
+    :return: Status of the stack
+    """
+    return response['Stacks'][0]['StackStatus']
@@ -0,0 +1,77 @@
+"""
+Process wide pool of AWS clients, keyed by service and region
+Clients are created once from the default boto3 session, with a connection pool sized for stages
+running in parallel and adaptive retries, and are instrumented to record their API calls.
+Clients are thread safe and shared by all threads. Resources are not, so they are kept per thread.
+"""
+import logging
+import threading
+import boto3
+from botocore.config import Config
+from aws_deployment_manager import apimetrics
+from aws_deployment_manager import constants
+
+LOG = logging.getLogger(__name__)
+
+_LOCK = threading.Lock()
+_CLIENTS = {}
+_LOCAL = threading.local()
+
+
+def get_client_config(region):
+    """
+    :param region: AWS Region, the default region of the session if None
+    :return: Client config used for the clients of the region
+    """
+    return Config(
+        region_name=region,
+        max_pool_connections=constants.AWS_MAX_POOL_CONNECTIONS,
+        retries={
+            'max_attempts': constants.AWS_MAX_ATTEMPTS,
+            'mode': constants.AWS_RETRY_MODE
+        }
+    )
+
+
+def get_client(service, region):
+    """
+    Get the client of a service in a region, created on first use
+    :param service: Name of AWS service
+    :param region: AWS Region, the default region of the session if None
+    :return: AWS Client
+    """
+    key = (service, region)
+    with _LOCK:
+        # The default boto3 session is not thread safe, clients are created under the lock
+        if key not in _CLIENTS:
+            LOG.debug("Creating AWS client for {0} in region {1}".format(service, region))
+            client = boto3.client(service, region_name=region, config=get_client_config(region))
+            _CLIENTS[key] = apimetrics.instrument(client)
+        return _CLIENTS[key]
+
+
+def get_resource(service, region):
+    """
+    Get the resource of a service in a region for the current thread, created on first use
+    :param service: Name of AWS service
+    :param region: AWS Region, the default region of the session if None
+    :return: AWS Resource
+    """
+    if not hasattr(_LOCAL, 'resources'):
+        _LOCAL.resources = {}
+    key = (service, region)
+    if key not in _LOCAL.resources:
+        with _LOCK:
+            resource = boto3.resource(service, region_name=region, config=get_client_config(region))
+        apimetrics.instrument(resource.meta.client)
+        _LOCAL.resources[key] = resource
+    return _LOCAL.resources[key]
+
+
+def reset():
+    """
+    Discards the clients of the pool, and the resources of the current thread
+    """
+    with _LOCK:
+        _CLIENTS.clear()
+    _LOCAL.resources = {}
@@ -3,9 +3,9 @@ Wrapper Class for AWS EC2 Service
 """
 import logging
 from datetime import datetime
-import boto3
 from botocore.exceptions import ClientError
 from aws_deployment_manager import constants
+from aws_deployment_manager import waiter
 from aws_deployment_manager.aws.aws_base import AwsBase
 
 LOG = logging.getLogger(__name__)
@@ -17,8 +17,8 @@ class AwsEC2Client(AwsBase):
     def __init__(self, config):
         AwsBase.__init__(self, config)
 
-        self.__client = boto3.client(constants.EC2_SERVICE, config=self.get_aws_client_config())
-        self.__resource = boto3.resource(constants.EC2_SERVICE, config=self.get_aws_client_config())
+        self.__client = self.create_client(constants.EC2_SERVICE)
+        self.__resource = self.create_resource(constants.EC2_SERVICE)
 
     def get_primary_cidr(self, vpcid):
         """
@@ -343,13 +343,13 @@ class AwsEC2Client(AwsBase):
         return response
 
     def __wait_until_snapshot_completed(self, snapshot_id):
-        snapshot_waiter = self.__client.get_waiter('snapshot_completed')
-        snapshot_waiter.wait(
-            SnapshotIds=[snapshot_id],
-            WaiterConfig={
-                'Delay': 60,
-                'MaxAttempts': 120
-            })
+        state = waiter.wait(
+            poll=lambda: self.__client.describe_snapshots(SnapshotIds=[snapshot_id])['Snapshots'][0]['State'],
+            until=lambda snapshot_state: snapshot_state in ['completed', 'error'],
+            description="ec2 snapshot {0}".format(snapshot_id),
+            backoff=waiter.EC2_SNAPSHOT)
+        if state == 'error':
+            raise Exception("Snapshot {0} failed".format(snapshot_id))
 
     def delete_ec2(self, instance_id):
         """Delete an EC2 Instance"""
@@ -3,14 +3,17 @@ Wrapper class for AWS EKS Service
 """
 
 import logging
-import time
-import boto3
 from botocore.exceptions import ClientError
 from aws_deployment_manager import constants
+from aws_deployment_manager import waiter
 from aws_deployment_manager.aws.aws_base import AwsBase
 
 LOG = logging.getLogger(__name__)
 
+EKS_UPDATE_FINAL_STATES = ['Failed', 'Cancelled', 'Successful']
+NODEGROUP_CREATE_FINAL_STATES = ['ACTIVE', 'CREATE_FAILED']
+NODEGROUP_DELETE_FINAL_STATES = ['DELETE_FAILED', 'DELETE_COMPLETE']
+
 
 class AwsEKSClient(AwsBase):
     """
@@ -20,10 +23,7 @@ class AwsEKSClient(AwsBase):
         AwsBase.__init__(self, config)
 
         # Initialize Cloudformation Client with AWS Region
-        self.__eks_client = boto3.client(
-            constants.EKS_SERVICE,
-            config=self.get_aws_client_config()
-        )
+        self.__eks_client = self.create_client(constants.EKS_SERVICE)
 
     def update_cluster_access_endpoints(self, cluster_name, enable_public_access, enable_private_access):
         """
@@ -49,10 +49,13 @@ class AwsEKSClient(AwsBase):
             update_status = response['update']['status']
 
             # Wait for update to complete
-            while update_status not in ['Failed', 'Cancelled', 'Successful']:
-                LOG.info("Update ID = {0}, Status = {1}".format(update_id, update_status))
-                time.sleep(30)
-                update_status = self.check_update_status(cluster_name=cluster_name, update_id=update_id)
+            LOG.info("Update ID = {0}, Status = {1}".format(update_id, update_status))
+            if update_status not in EKS_UPDATE_FINAL_STATES:
+                update_status = waiter.wait(
+                    poll=lambda: self.check_update_status(cluster_name=cluster_name, update_id=update_id),
+                    until=lambda status: status in EKS_UPDATE_FINAL_STATES,
+                    description="eks cluster update {0}".format(cluster_name),
+                    backoff=waiter.EKS_CLUSTER_UPDATE)
 
             LOG.info("Update complete. Status = {0}".format(update_status))
 
@@ -138,13 +141,12 @@ class AwsEKSClient(AwsBase):
             LOG.info("Waiting for Node Group {0} in EKS Cluster {1} to be Active".format(nodegroup_name, cluster_name))
             status = response['nodegroup']['status']
 
-            while status not in ['ACTIVE', 'CREATE_FAILED']:
-                LOG.info("Node Group Status = {0}".format(status))
-                time.sleep(30)
-                nodegroup_info = self.describe_nodegroup(cluster_name=cluster_name,
-                                                         nodegroup_name=nodegroup_name)
-                if nodegroup_info:
-                    status = nodegroup_info['nodegroup']['status']
+            if status not in NODEGROUP_CREATE_FINAL_STATES:
+                status = waiter.wait(
+                    poll=lambda: self.__get_nodegroup_status(cluster_name, nodegroup_name),
+                    until=lambda current_status: current_status in NODEGROUP_CREATE_FINAL_STATES,
+                    description="eks nodegroup create {0}".format(nodegroup_name),
+                    backoff=waiter.EKS_NODEGROUP)
 
             if status == 'ACTIVE':
                 LOG.info("Node Group {0} in EKS Cluster {1} is Active".format(nodegroup_name, cluster_name))
@@ -187,29 +189,12 @@ class AwsEKSClient(AwsBase):
             LOG.info("Waiting for Node Group {0} in EKS Cluster {1} to be deleted".format(nodegroup_name, cluster_name))
             status = response['nodegroup']['status']
 
-            while status not in ['DELETE_FAILED', 'DELETE_COMPLETE']:
-                try:
-                    LOG.info("Node Group Status = {0}".format(status))
-                    time.sleep(30)
-                    nodegroup_info = self.describe_nodegroup(cluster_name=cluster_name,
-                                                             nodegroup_name=nodegroup_name)
-                    if nodegroup_info:
-                        status = nodegroup_info['nodegroup']['status']
-                except ClientError as client_error:
-                    # When node group is deleted, describe_nodegroup function will raise exception.
-                    # This is the indication to know that node group has been deleted
-                    if client_error.response:
-                        message = str(client_error.response['Error']['Message']).lower()
-                        if 'no node group found' in message:
-                            status = 'DELETE_COMPLETE'
-                        else:
-                            raise Exception("Delete Node Group Failed for {0}. Error is - {1}".
-                                            format(nodegroup_name, client_error)) from client_error
-                    else:
-                        raise Exception("Delete Node Group Failed for {0}. Error is - {1}".
-                                        format(nodegroup_name, client_error)) from client_error
-                except Exception as exception:
-                    raise exception
+            if status not in NODEGROUP_DELETE_FINAL_STATES:
+                status = waiter.wait(
+                    poll=lambda: self.__get_deleted_nodegroup_status(cluster_name, nodegroup_name),
+                    until=lambda current_status: current_status in NODEGROUP_DELETE_FINAL_STATES,
+                    description="eks nodegroup delete {0}".format(nodegroup_name),
+                    backoff=waiter.EKS_NODEGROUP)
 
             if status == 'DELETE_COMPLETE':
                 LOG.info("Node Group {0} in EKS Cluster {1} is Deleted".format(nodegroup_name, cluster_name))
@@ -217,6 +202,37 @@ class AwsEKSClient(AwsBase):
 
         raise Exception("Failed to delete node group {0} in EKS Cluster {1}".format(nodegroup_name, cluster_name))
 
+    def __get_nodegroup_status(self, cluster_name, nodegroup_name):
+        """
+        Get the status of a node group in EKS Cluster
+        :param cluster_name: Name of EKS Cluster
+        :param nodegroup_name: Name of Node Group
+        :return: Status of the node group, None if unknown
+        """
+        nodegroup_info = self.describe_nodegroup(cluster_name=cluster_name, nodegroup_name=nodegroup_name)
+        if nodegroup_info:
+            return nodegroup_info['nodegroup']['status']
+        return None
+
+    def __get_deleted_nodegroup_status(self, cluster_name, nodegroup_name):
+        """
+        Get the status of a node group being deleted in EKS Cluster
+        :param cluster_name: Name of EKS Cluster
+        :param nodegroup_name: Name of Node Group
+        :return: Status of the node group, DELETE_COMPLETE once it is not found
+        """
+        try:
+            return self.__get_nodegroup_status(cluster_name, nodegroup_name)
+        except ClientError as client_error:
+            # When node group is deleted, describe_nodegroup function will raise exception.
+            # This is the indication to know that node group has been deleted
+            if client_error.response:
+                message = str(client_error.response['Error']['Message']).lower()
+                if 'no node group found' in message:
+                    return 'DELETE_COMPLETE'
+            raise Exception("Delete Node Group Failed for {0}. Error is - {1}".
+                            format(nodegroup_name, client_error)) from client_error
+
     def list_nodegroups(self, cluster_name):
         """
         List names of node groups in EKS Cluster
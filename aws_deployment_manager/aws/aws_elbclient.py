@@ -2,7 +2,6 @@
 Wrapper class for AWS ELB Service
 """
 import logging
-import boto3
 from aws_deployment_manager import constants
 from aws_deployment_manager.aws.aws_base import AwsBase
 
@@ -17,10 +16,7 @@ class AwsELBClient(AwsBase):
         AwsBase.__init__(self, config)
 
         # Initialize Cloudformation Client with AWS Region
-        self.__elb_client = boto3.client(
-            constants.ELB_SERVICE,
-            config=self.get_aws_client_config()
-        )
+        self.__elb_client = self.create_client(constants.ELB_SERVICE)
 
     def get_elb_hosted_zone(self, elb_dns_name, account_id):
         """
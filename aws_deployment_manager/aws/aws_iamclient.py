@@ -2,7 +2,6 @@
 Wrapper class for AWS IAM Service
 """
 import logging
-import boto3
 from aws_deployment_manager import constants
 from aws_deployment_manager.aws.aws_base import AwsBase
 
@@ -18,10 +17,7 @@ class AwsIAMClient(AwsBase):
         AwsBase.__init__(self, config)
 
         # Initialize Cloudformation Client with AWS Region
-        self.__iam_client = boto3.client(
-            constants.IAM_SERVICE,
-            config=self.get_aws_client_config()
-        )
+        self.__iam_client = self.create_client(constants.IAM_SERVICE)
 
     def create_open_id_connect_provider(self, oid_url, thumb_print, env_name):
         """
@@ -2,11 +2,11 @@
 Wrapper class for AWS Route53 Service
 """
 import logging
-import time
 import random
 import string
-import boto3
 from aws_deployment_manager import constants
+from aws_deployment_manager import errors
+from aws_deployment_manager import waiter
 from aws_deployment_manager.aws.aws_base import AwsBase
 from aws_deployment_manager.aws.aws_elbclient import AwsELBClient
 
@@ -21,10 +21,7 @@ class AwsR53Client(AwsBase):
         AwsBase.__init__(self, config)
 
         # Initialize Cloudformation Client with AWS Region
-        self.__r53_client = boto3.client(
-            constants.ROUTE53_SERVICE,
-            config=self.get_aws_client_config()
-        )
+        self.__r53_client = self.create_client(constants.ROUTE53_SERVICE)
 
         self.__aws_elb_client = AwsELBClient(config=config)
 
@@ -273,24 +270,14 @@ class AwsR53Client(AwsBase):
         Wait for a change to be INSYNC
         :param change_id: Change ID
         """
-        change_status = None
-        retry_count = 0
-
-        while change_status not in ['INSYNC']:
-            LOG.info("Checking status for change id {0}".format(change_id))
-            retry_count += 1
-            response = self.__r53_client.get_change(
-                Id=change_id
-            )
-
-            if 'ChangeInfo' in response:
-                change_status = response['ChangeInfo']['Status']
-                LOG.info("Status = {0}".format(change_status))
-                if change_status == 'INSYNC':
-                    break
-
-            if (change_status != 'INSYNC') and (retry_count > 10):
-                raise Exception("Change ID {0} still in PENDING state".format(change_id))
-            time.sleep(30)
+        LOG.info("Checking status for change id {0}".format(change_id))
+        try:
+            change_status = waiter.wait(
+                poll=lambda: self.__r53_client.get_change(Id=change_id).get('ChangeInfo', {}).get('Status'),
+                until=lambda status: status == 'INSYNC',
+                description="route53 change {0}".format(change_id),
+                backoff=waiter.ROUTE53_CHANGE)
+        except errors.WaitTimeoutError as timeout_error:
+            raise Exception("Change ID {0} still in PENDING state".format(change_id)) from timeout_error
 
         LOG.info("Change ID {0} is in state {1}".format(change_id, change_status))
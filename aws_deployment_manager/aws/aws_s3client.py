@@ -2,7 +2,6 @@
 Wrapper Class for AWS S3 Service
 """
 import logging
-import boto3
 from aws_deployment_manager import errors
 from aws_deployment_manager import constants
 from aws_deployment_manager.aws.aws_base import AwsBase
@@ -16,7 +15,7 @@ class AwsS3Client(AwsBase):
     """
     def __init__(self, config):
         AwsBase.__init__(self, config)
-        self.__s3client = boto3.client(constants.S3_SERVICE, config=self.get_aws_client_config())
+        self.__s3client = self.create_client(constants.S3_SERVICE)
 
     def create_bucket(self, bucket_name):
         """
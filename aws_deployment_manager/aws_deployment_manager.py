@@ -1,28 +1,21 @@
-"""This is the initial python script for the deployment-manager."""
+"""This is the initial python script for the deployment-manager.
 
+The command managers are imported by the commands that use them, so that starting the CLI, e.g. for
+--help, does not load boto3, docker and the other dependencies of the commands.
+"""
+# pylint: disable=import-outside-toplevel
+
+import os
 import sys
+import functools
 import logging
 import time
 import traceback
 from datetime import timedelta
 import getpass
 import click
-from aws_deployment_manager import utils, constants
+from aws_deployment_manager import utils, constants, timing, apimetrics, profiling
 from aws_deployment_manager.workdir import Workdir
-from aws_deployment_manager.commands.delete import DeleteManager
-from aws_deployment_manager.commands.install import InstallManager
-from aws_deployment_manager.commands.update import UpdateManager
-from aws_deployment_manager.commands.validate import ValidateManager
-from aws_deployment_manager.commands.generate import GenerateManager
-from aws_deployment_manager.commands.prepare import PrepareManager
-from aws_deployment_manager.commands.getconfig import GetconfigManager
-from aws_deployment_manager.commands.initialize import InitManager
-from aws_deployment_manager.commands.configure import ConfigureManager
-from aws_deployment_manager.commands.upgrade import UpgradeManager
-from aws_deployment_manager.commands.rollback import RollbackManager
-from aws_deployment_manager.commands.cleanup import CleanupManager
-from aws_deployment_manager.commands.backup import BackupManager
-from aws_deployment_manager.commands.image import ImageManager
 
 LOG = logging.getLogger(__name__)
 
@@ -112,6 +105,69 @@ def upgrade_kube_downscaler_option(func):
                           help='Enable the upgrade of kube-downscaler'
                           )(func)
 
+def trace_option(func):
+    """A decorator for the trace option command line argument."""
+    return click.option('-t', '--trace', type=click.BOOL, is_flag=True,
+                          required=False, default=False,
+                          help='Save a timeline of the command in Chrome trace format next to the log file'
+                          )(func)
+
+def fleet_directory_option(func):
+    """A decorator for the fleet directory command line argument."""
+    return click.option('-d', '--directory', type=click.Path(exists=True, file_okay=False),
+                        default=constants.WORKDIR_PATH, show_default=True,
+                        help='Directory with one working directory, holding a config.yaml, per IDUN environment'
+                        )(func)
+
+def fleet_command_option(func):
+    """A decorator for the command to run across the fleet command line argument."""
+    return click.option('-c', '--command', type=click.Choice(constants.FLEET_COMMANDS), required=True,
+                        help='Command to run across the environments'
+                        )(func)
+
+def max_workers_option(func):
+    """A decorator for the maximum number of environments processed at the same time command line argument."""
+    return click.option('-w', '--max-workers', type=click.IntRange(1), default=constants.FLEET_MAX_WORKERS,
+                        show_default=True, help='Maximum number of environments processed at the same time'
+                        )(func)
+
+def max_per_region_option(func):
+    """A decorator for the maximum number of environments of a region processed at the same time."""
+    return click.option('-m', '--max-per-region', type=click.IntRange(1),
+                        default=constants.FLEET_MAX_ENVIRONMENTS_PER_REGION, show_default=True,
+                        help='Maximum number of environments of a region processed at the same time'
+                        )(func)
+
+def service_host_option(func):
+    """A decorator for the host of the service command line argument."""
+    return click.option('-H', '--host', type=click.STRING, default=constants.SERVICE_HOST, show_default=True,
+                        help='Host the service listens on'
+                        )(func)
+
+def service_port_option(func):
+    """A decorator for the port of the service command line argument."""
+    return click.option('-P', '--port', type=click.IntRange(0, 65535), default=constants.SERVICE_PORT,
+                        show_default=True, help='Port the service listens on'
+                        )(func)
+
+def service_socket_option(func):
+    """A decorator for the Unix socket of the service command line argument."""
+    return click.option('-s', '--socket', 'socket_path', type=click.Path(dir_okay=False), required=False,
+                        default=None, help='Unix socket the service listens on, instead of the host and port'
+                        )(func)
+
+def profile_option(func):
+    """A decorator for the profile option command line argument, running the command under the profiler."""
+    @functools.wraps(func)
+    def profiled_command(*args, profile=None, **kwargs):
+        with profiling.profiled(profile):
+            return func(*args, **kwargs)
+    return click.option('--profile', type=click.Choice(profiling.MODES), required=False, default=None,
+                        envvar=constants.PROFILE_ENV_VAR, show_envvar=True,
+                        help='Profile the CPU time (cpu) or the memory allocations (mem) of the command '
+                             'and save the results next to the log file'
+                        )(profiled_command)
+
 
 
 
@@ -121,16 +177,19 @@ def cli():
 
 
 @cli.command()
+@profile_option
 @log_verbosity_option
 def init(verbosity):
     """Initialize AWS Deployment Service for IDUN Install"""
     utils.initialize_logging(verbosity=verbosity, working_directory=Workdir().workdir_path,
                                              logs_sub_directory=Workdir().logs_subdirectory,
                                              filename_postfix='init')
+    from aws_deployment_manager.commands.initialize import InitManager
     InitManager().init()
 
 
 @cli.command()
+@profile_option
 @log_verbosity_option
 @override_option
 def prepare(verbosity, override):
@@ -147,6 +206,7 @@ def prepare(verbosity, override):
 
     exit_code = 0
     try:
+        from aws_deployment_manager.commands.prepare import PrepareManager
         file_path = PrepareManager(override=override).prepare_config_file()
         LOG.info("IDUN Config Template file generate at {0}".format(file_path))
     except Exception as exception:
@@ -160,10 +220,12 @@ def prepare(verbosity, override):
         end_time = time.time()
         time_taken = end_time - start_time
         LOG.info('Time Taken: %s', timedelta(seconds=round(time_taken)))
+        report_timing(log_file_path, time_taken)
         sys.exit(exit_code)
 
 
 @cli.command()
+@profile_option
 @log_verbosity_option
 @environment_name_option
 @aws_region_option
@@ -178,6 +240,7 @@ def generate(verbosity, env, region):
 
     exit_code = 0
     try:
+        from aws_deployment_manager.commands.generate import GenerateManager
         GenerateManager(env_name=env, region=region).generate_config_file()
     except Exception as exception:
         LOG.debug(traceback.format_exc())
@@ -190,10 +253,12 @@ def generate(verbosity, env, region):
         end_time = time.time()
         time_taken = end_time - start_time
         LOG.info('Time Taken: %s', timedelta(seconds=round(time_taken)))
+        report_timing(log_file_path, time_taken)
         sys.exit(exit_code)
 
 
 @cli.command()
+@profile_option
 @log_verbosity_option
 def validate(verbosity):
     """Validate IDUN Configuration File"""
@@ -206,6 +271,7 @@ def validate(verbosity):
 
     exit_code = 0
     try:
+        from aws_deployment_manager.commands.validate import ValidateManager
         ValidateManager().validate_config()
     except Exception as exception:
         LOG.debug(traceback.format_exc())
@@ -218,15 +284,18 @@ def validate(verbosity):
         end_time = time.time()
         time_taken = end_time - start_time
         LOG.info('Time Taken: %s', timedelta(seconds=round(time_taken)))
+        report_timing(log_file_path, time_taken)
         sys.exit(exit_code)
 
 
 @cli.command()
+@profile_option
 @log_verbosity_option
 @yes_option
 @username_option
 @password_option
-def install(verbosity, yes, username, password):
+@trace_option
+def install(verbosity, yes, username, password, trace):
     """Install IDUN Infrastructure in AWS"""
     log_file_path = utils.initialize_logging(verbosity=verbosity, working_directory=Workdir().workdir_path,
                                              logs_sub_directory=Workdir().logs_subdirectory, filename_postfix='install')
@@ -236,6 +305,7 @@ def install(verbosity, yes, username, password):
 
     exit_code = 0
     try:
+        from aws_deployment_manager.commands.install import InstallManager
         question = "\nAre you sure you want to proceed with installation of IDUN Deployment"
         reply = check_and_ask_confirm_option(user_input=yes, question=question)
 
@@ -270,10 +340,14 @@ def install(verbosity, yes, username, password):
         end_time = time.time()
         time_taken = end_time - start_time
         LOG.info('Time Taken: %s', timedelta(seconds=round(time_taken)))
+        report_timing(log_file_path, time_taken)
+        if trace:
+            write_trace(log_file_path, 'install', start_time, time_taken)
         sys.exit(exit_code)
 
 
 @cli.command()
+@profile_option
 @log_verbosity_option
 @yes_option
 @namespace_option
@@ -288,6 +362,7 @@ def configure(verbosity, yes, namespace):
 
     exit_code = 0
     try:
+        from aws_deployment_manager.commands.configure import ConfigureManager
         question = "\nAre you sure you want to proceed with configuration of IDUN Deployment"
         reply = check_and_ask_confirm_option(user_input=yes, question=question)
 
@@ -309,14 +384,17 @@ def configure(verbosity, yes, namespace):
         end_time = time.time()
         time_taken = end_time - start_time
         LOG.info('Time Taken: %s', timedelta(seconds=round(time_taken)))
+        report_timing(log_file_path, time_taken)
         sys.exit(exit_code)
 
 
 @cli.command()
+@profile_option
 @log_verbosity_option
 @yes_option
 @upgrade_kube_downscaler_option
-def upgrade(verbosity, yes, upgrade_kube_downscaler):
+@trace_option
+def upgrade(verbosity, yes, upgrade_kube_downscaler, trace):
     """Upgrade IDUN AWS Infrastructure to latest K8S Version"""
     log_file_path = utils.initialize_logging(verbosity=verbosity, working_directory=Workdir().workdir_path,
                                              logs_sub_directory=Workdir().logs_subdirectory, filename_postfix='upgrade')
@@ -325,6 +403,7 @@ def upgrade(verbosity, yes, upgrade_kube_downscaler):
 
     exit_code = 0
     try:
+        from aws_deployment_manager.commands.upgrade import UpgradeManager
         config = utils.load_yaml(file_path=constants.CONFIG_FILE_PATH)
         question = "\nAre you sure you want to upgrade IDUN Deployment {0} in region {1}".\
             format(config[constants.ENVIRONMENT_NAME], config[constants.AWS_REGION])
@@ -347,10 +426,14 @@ def upgrade(verbosity, yes, upgrade_kube_downscaler):
         end_time = time.time()
         time_taken = end_time - start_time
         LOG.info('Time Taken: %s', timedelta(seconds=round(time_taken)))
+        report_timing(log_file_path, time_taken)
+        if trace:
+            write_trace(log_file_path, 'upgrade', start_time, time_taken)
         sys.exit(exit_code)
 
 
 @cli.command()
+@profile_option
 @log_verbosity_option
 @yes_option
 def rollback(verbosity, yes):
@@ -363,6 +446,7 @@ def rollback(verbosity, yes):
 
     exit_code = 0
     try:
+        from aws_deployment_manager.commands.rollback import RollbackManager
         config = utils.load_yaml(file_path=constants.CONFIG_FILE_PATH)
         question = "\nAre you sure you want to rollback IDUN Deployment {0} in region {1}".\
             format(config[constants.ENVIRONMENT_NAME], config[constants.AWS_REGION])
@@ -385,10 +469,12 @@ def rollback(verbosity, yes):
         end_time = time.time()
         time_taken = end_time - start_time
         LOG.info('Time Taken: %s', timedelta(seconds=round(time_taken)))
+        report_timing(log_file_path, time_taken)
         sys.exit(exit_code)
 
 
 @cli.command()
+@profile_option
 @log_verbosity_option
 @yes_option
 def cleanup(verbosity, yes):
@@ -401,6 +487,7 @@ def cleanup(verbosity, yes):
 
     exit_code = 0
     try:
+        from aws_deployment_manager.commands.cleanup import CleanupManager
         config = utils.load_yaml(file_path=constants.CONFIG_FILE_PATH)
         question = "\nAre you sure you want to cleanup IDUN Deployment {0} in region {1}".\
             format(config[constants.ENVIRONMENT_NAME], config[constants.AWS_REGION])
@@ -423,10 +510,12 @@ def cleanup(verbosity, yes):
         end_time = time.time()
         time_taken = end_time - start_time
         LOG.info('Time Taken: %s', timedelta(seconds=round(time_taken)))
+        report_timing(log_file_path, time_taken)
         sys.exit(exit_code)
 
 
 @cli.command()
+@profile_option
 @log_verbosity_option
 @yes_option
 def update(verbosity, yes):
@@ -439,6 +528,7 @@ def update(verbosity, yes):
 
     exit_code = 0
     try:
+        from aws_deployment_manager.commands.update import UpdateManager
         question = "\nAre you sure you want to proceed with upgrade of IDUN Deployment"
         reply = check_and_ask_confirm_option(user_input=yes, question=question)
 
@@ -458,15 +548,18 @@ def update(verbosity, yes):
         end_time = time.time()
         time_taken = end_time - start_time
         LOG.info('Time Taken: %s', timedelta(seconds=round(time_taken)))
+        report_timing(log_file_path, time_taken)
         sys.exit(exit_code)
 
 
 @cli.command()
+@profile_option
 @log_verbosity_option
 @environment_name_option
 @aws_region_option
 @yes_option
-def delete(verbosity, env, region, yes):
+@trace_option
+def delete(verbosity, env, region, yes, trace):
     """Delete IDUN Infrastructure in AWS"""
     log_file_path = utils.initialize_logging(verbosity=verbosity, working_directory=Workdir().workdir_path,
                                              logs_sub_directory=Workdir().logs_subdirectory, filename_postfix='delete')
@@ -476,6 +569,7 @@ def delete(verbosity, env, region, yes):
 
     exit_code = 0
     try:
+        from aws_deployment_manager.commands.delete import DeleteManager
         question = "\nAre you sure you want to delete IDUN Deployment {0} in region {1}".\
             format(env, region)
         reply = check_and_ask_confirm_option(user_input=yes, question=question)
@@ -497,10 +591,14 @@ def delete(verbosity, env, region, yes):
         end_time = time.time()
         time_taken = end_time - start_time
         LOG.info('Time Taken: %s', timedelta(seconds=round(time_taken)))
+        report_timing(log_file_path, time_taken)
+        if trace:
+            write_trace(log_file_path, 'delete', start_time, time_taken)
         sys.exit(exit_code)
 
 
 @cli.command()
+@profile_option
 @log_verbosity_option
 @environment_name_option
 @aws_region_option
@@ -516,6 +614,7 @@ def getconfig(verbosity, env, region):
 
     exit_code = 0
     try:
+        from aws_deployment_manager.commands.getconfig import GetconfigManager
         getconfig_manager = GetconfigManager(env_name=env, region=region)
         getconfig_manager.generate_k8s_config_file()
     except Exception as exception:
@@ -530,10 +629,12 @@ def getconfig(verbosity, env, region):
         end_time = time.time()
         time_taken = end_time - start_time
         LOG.info('Time Taken: %s', timedelta(seconds=round(time_taken)))
+        report_timing(log_file_path, time_taken)
         sys.exit(exit_code)
 
 
 @cli.command()
+@profile_option
 @log_verbosity_option
 @command_option
 def run(verbosity, command):
@@ -559,10 +660,12 @@ def run(verbosity, command):
         end_time = time.time()
         time_taken = end_time - start_time
         LOG.info('Time Taken: %s', timedelta(seconds=round(time_taken)))
+        report_timing(log_file_path, time_taken)
         sys.exit(exit_code)
 
 
 @cli.command()
+@profile_option
 @log_verbosity_option
 @yes_option
 @optional_parameters
@@ -577,6 +680,7 @@ def configurebackup(verbosity, params, yes):
 
     exit_code = 0
     try:
+        from aws_deployment_manager.commands.backup import BackupManager
         question = "\nAre you sure to proceed with backup Server configuration of IDUN Deployment"
         reply = check_and_ask_confirm_option(user_input=yes, question=question)
 
@@ -602,9 +706,32 @@ def configurebackup(verbosity, params, yes):
         end_time = time.time()
         time_taken = end_time - start_time
         LOG.info('Time Taken: %s', timedelta(seconds=round(time_taken)))
+        report_timing(log_file_path, time_taken)
         sys.exit(exit_code)
 
 
+def report_timing(log_file_path, time_taken):
+    """
+    Logs the timing and AWS API call reports of the command and saves them next to its log file
+    :param log_file_path: Log file path relative to the working directory
+    :param time_taken: Wall time of the command in seconds
+    """
+    absolute_log_file_path = os.path.join(constants.WORKDIR_PATH, log_file_path)
+    timing.report(absolute_log_file_path, time_taken)
+    apimetrics.report(absolute_log_file_path)
+
+
+def write_trace(log_file_path, command, start_time, time_taken):
+    """
+    Saves the timeline of the command in Chrome trace format next to its log file
+    :param log_file_path: Log file path relative to the working directory
+    :param command: Name of the command
+    :param start_time: Start time of the command, seconds since the epoch
+    :param time_taken: Wall time of the command in seconds
+    """
+    timing.write_chrome_trace(os.path.join(constants.WORKDIR_PATH, log_file_path), command, start_time, time_taken)
+
+
 def check_and_ask_confirm_option(user_input, question):
     """
     Checks if confirmation has been provided as CLI argument. If not, ask user for input
@@ -658,6 +785,7 @@ def check_and_ask_password_option(password):
     return armdocker_pass
 
 @cli.command('image-push')
+@profile_option
 @log_verbosity_option
 @optional_aws_region_option
 @force_option
@@ -674,6 +802,7 @@ def image_push(verbosity, region, force):
 
     exit_code = 0
     try:
+        from aws_deployment_manager.commands.image import ImageManager
         image_manager = ImageManager(aws_image_region=region)
         image_manager.image(force)
     except Exception as exception:
@@ -684,6 +813,99 @@ def image_push(verbosity, region, force):
         exit_code = 1
     else:
         LOG.info('Push Image task completed successfully')
+    finally:
+        end_time = time.time()
+        time_taken = end_time - start_time
+        LOG.info('Time Taken: %s', timedelta(seconds=round(time_taken)))
+        report_timing(log_file_path, time_taken)
+        sys.exit(exit_code)
+
+
+@cli.command()
+@profile_option
+@log_verbosity_option
+@fleet_directory_option
+@fleet_command_option
+@max_workers_option
+@max_per_region_option
+@yes_option
+@upgrade_kube_downscaler_option
+@force_option
+def fleet(verbosity, directory, command, max_workers, max_per_region, yes, upgrade_kube_downscaler, force):
+    """Run a command across many IDUN environments concurrently"""
+    log_file_path = utils.initialize_logging(verbosity=verbosity, working_directory=directory,
+                                             logs_sub_directory=constants.LOGS_DIRECTORY_NAME,
+                                             filename_postfix='fleet')
+    LOG.info('IDUN fleet {0} started in {1}'.format(command, directory))
+    LOG.info('Logging to %s', log_file_path)
+    start_time = time.time()
+
+    exit_code = 0
+    try:
+        from aws_deployment_manager.commands import fleet as fleet_command
+        fleet_manager = fleet_command.FleetManager(
+            fleet_path=directory, command=command, max_workers=max_workers, max_per_region=max_per_region,
+            options={'upgrade_kube_downscaler': upgrade_kube_downscaler, 'force': force})
+        reply = 'yes'
+        if command in ['upgrade', 'delete']:
+            question = "\nAre you sure you want to {0} the IDUN Deployments {1}".format(
+                command, ', '.join(environment['name'] for environment in fleet_manager.environments))
+            reply = check_and_ask_confirm_option(user_input=yes, question=question)
+
+        if reply in ['y', 'yes']:
+            results = fleet_manager.run()
+            fleet_command.log_results(results)
+            fleet_command.write_results(os.path.join(directory, log_file_path), results)
+            if any(result['status'] == fleet_command.STATUS_FAILED for result in results):
+                raise Exception("IDUN fleet {0} failed for some environments".format(command))
+        else:
+            LOG.info("Aborting fleet {0} operation...".format(command))
+    except Exception as exception:
+        LOG.error('IDUN fleet {0} failed with the following error'.format(command))
+        LOG.debug(traceback.format_exc())
+        LOG.error(exception, exc_info=True)
+        LOG.info('Please refer to the following log file for further output: %s', log_file_path)
+        exit_code = 1
+    else:
+        LOG.info('IDUN fleet {0} completed successfully'.format(command))
+    finally:
+        end_time = time.time()
+        time_taken = end_time - start_time
+        LOG.info('Time Taken: %s', timedelta(seconds=round(time_taken)))
+        timing.report(os.path.join(directory, log_file_path), time_taken)
+        sys.exit(exit_code)
+
+
+@cli.command()
+@profile_option
+@log_verbosity_option
+@fleet_directory_option
+@service_host_option
+@service_port_option
+@service_socket_option
+@max_workers_option
+def serve(verbosity, directory, host, port, socket_path, max_workers):
+    """Run the deployment service, running the commands of many IDUN environments submitted over HTTP"""
+    log_file_path = utils.initialize_logging(verbosity=verbosity, working_directory=directory,
+                                             logs_sub_directory=constants.LOGS_DIRECTORY_NAME,
+                                             filename_postfix='serve')
+    LOG.info('IDUN deployment service started in {0}'.format(directory))
+    LOG.info('Logging to %s', log_file_path)
+    start_time = time.time()
+
+    exit_code = 0
+    try:
+        from aws_deployment_manager.commands.serve import ServeManager
+        ServeManager(service_path=directory, max_environments=max_workers).serve(
+            host=host, port=port, socket_path=socket_path)
+    except Exception as exception:
+        LOG.error('IDUN deployment service failed with the following error')
+        LOG.debug(traceback.format_exc())
+        LOG.error(exception, exc_info=True)
+        LOG.info('Please refer to the following log file for further output: %s', log_file_path)
+        exit_code = 1
+    else:
+        LOG.info('IDUN deployment service stopped')
     finally:
         end_time = time.time()
         time_taken = end_time - start_time
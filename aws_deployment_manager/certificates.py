@@ -0,0 +1,79 @@
+"""
+This module computes the thumbprint of the OIDC identity provider of an EKS cluster, required by IAM:
+the SHA-1 fingerprint of the last certificate of the chain served by the host of its JSON Web Key Set.
+The chain is fetched with a single openssl s_client, as the ssl module of the Python of the image does
+not return it, and the fingerprint is computed in memory. Thumbprints are cached per issuer host for
+the life of the process.
+"""
+
+import hashlib
+import logging
+import re
+import shlex
+import ssl
+import threading
+from urllib.parse import urlparse
+import requests
+from aws_deployment_manager import constants
+from aws_deployment_manager import utils
+
+LOG = logging.getLogger(__name__)
+
+PEM_CERTIFICATE_PATTERN = re.compile(r'-----BEGIN CERTIFICATE-----.+?-----END CERTIFICATE-----', re.DOTALL)
+
+_LOCK = threading.Lock()
+_THUMBPRINTS = {}
+
+
+def get_certificate_chain(host, port=443):
+    """
+    Get the certificate chain served by a host. The chain is not verified, its thumbprint pins it.
+    :param host: Host name
+    :param port: Port
+    :return: DER certificates served by the host, leaf first
+    """
+    command = constants.COMMAND_GET_CERTIFICATE.format(shlex.quote(host), port)
+    command_output = utils.execute_command(command=command)
+    chain = [ssl.PEM_cert_to_DER_cert(pem) for pem in PEM_CERTIFICATE_PATTERN.findall(command_output)]
+    if not chain:
+        raise Exception("No certificate served by {0}:{1}".format(host, port))
+    return chain
+
+
+def get_fingerprint(der_certificate):
+    """
+    :param der_certificate: DER certificate
+    :return: SHA-1 fingerprint, in lower case hexadecimal without separators
+    """
+    return hashlib.sha1(der_certificate).hexdigest()
+
+
+def get_oidc_thumbprint(issuer_url):
+    """
+    Get the thumbprint of an OIDC identity provider, from the cache if it was computed for its host
+    :param issuer_url: URL of the OIDC issuer, e.g. https://oidc.eks.eu-west-1.amazonaws.com/id/0123
+    :return: SHA-1 fingerprint of the last certificate of the chain of the JSON Web Key Set host
+    """
+    issuer_host = urlparse(issuer_url).hostname
+    with _LOCK:
+        if issuer_host in _THUMBPRINTS:
+            LOG.info("Thumbprint of OIDC issuer {0} taken from cache".format(issuer_host))
+            return _THUMBPRINTS[issuer_host]
+
+    url = issuer_url + constants.OIDC_CONFIGURATION_PATH
+    response = requests.get(url, timeout=constants.TLS_CONNECT_TIMEOUT)
+    jwks_host = urlparse(response.json()['jwks_uri']).hostname
+    thumbprint = get_fingerprint(get_certificate_chain(jwks_host)[-1])
+    LOG.info("Thumbprint of OIDC issuer {0} = {1}".format(issuer_host, thumbprint))
+
+    with _LOCK:
+        _THUMBPRINTS[issuer_host] = thumbprint
+    return thumbprint
+
+
+def clear_cache():
+    """
+    Discards the cached thumbprints
+    """
+    with _LOCK:
+        _THUMBPRINTS.clear()
@@ -0,0 +1,116 @@
+"""
+This module provides the clock used by the commands to read the time and to sleep while waiting
+for AWS and Kubernetes.
+The real clock is used by default. A virtual clock can be set for tests and benchmarks: its sleeps
+return at once and move the time forward, so that waiters poll at full speed while the polls, the
+time waited and the deadlines stay the same as against a real deployment.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+LOG = logging.getLogger(__name__)
+
+
+class Clock:
+    """ Real clock """
+
+    def time(self):
+        """
+        :return: Current time, seconds since the epoch
+        """
+        return time.time()
+
+    def monotonic(self):
+        """
+        :return: Monotonic time in seconds, to measure durations
+        """
+        return time.perf_counter()
+
+    def sleep(self, seconds):
+        """
+        Sleeps
+        :param seconds: Seconds to sleep
+        """
+        time.sleep(seconds)
+
+    async def sleep_async(self, seconds):
+        """
+        Sleeps on the event loop
+        :param seconds: Seconds to sleep
+        """
+        await asyncio.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    """
+    Clock running ahead of the real clock by the time slept. Sleeping returns at once.
+    The sleeps are shared by all threads, as the waits of stages running in parallel would overlap.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__offset = 0.0
+        self.sleeps = []
+
+    def time(self):
+        return time.time() + self.__offset
+
+    def monotonic(self):
+        return time.perf_counter() + self.__offset
+
+    def sleep(self, seconds):
+        with self.__lock:
+            self.__offset += seconds
+            self.sleeps.append(seconds)
+
+    async def sleep_async(self, seconds):
+        self.sleep(seconds)
+        # Let the other coroutines run, as a real sleep would
+        await asyncio.sleep(0)
+
+    @property
+    def slept(self):
+        """
+        :return: Total seconds slept
+        """
+        with self.__lock:
+            return sum(self.sleeps)
+
+
+_CLOCK = Clock()
+
+
+def get_clock():
+    """
+    :return: Clock in use
+    """
+    return _CLOCK
+
+
+def set_clock(clock):
+    """
+    Sets the clock in use
+    :param clock: Clock, the real clock if None
+    :return: Previous clock
+    """
+    global _CLOCK  # pylint: disable=global-statement
+    previous = _CLOCK
+    _CLOCK = clock or Clock()
+    return previous
+
+
+@contextmanager
+def use_clock(clock):
+    """
+    Context manager setting the clock in use for the enclosed block
+    :param clock: Clock
+    """
+    previous = set_clock(clock)
+    try:
+        yield clock
+    finally:
+        set_clock(previous)
@@ -0,0 +1,153 @@
+"""
+This module maintains the local cache of the manifests of the Amazon VPC CNI plugin, so that install and
+upgrade do not download them from GitHub every time, and environments without internet access need not.
+Manifests are kept in content-addressed file caches keyed by the plugin version. The cache built into the
+image is looked up before the cache of the workdir, which receives the manifests downloaded on a miss.
+"""
+
+# pylint: disable=import-outside-toplevel
+import logging
+import os
+import tempfile
+from aws_deployment_manager import constants
+from aws_deployment_manager import filecache
+from aws_deployment_manager import utils
+
+LOG = logging.getLogger(__name__)
+
+MANIFEST_SUFFIX = ".yaml"
+
+
+def get_digest(content):
+    """
+    :param content: Manifest, as bytes
+    :return: SHA-256 hex digest
+    """
+    return filecache.get_digest(content)
+
+
+def read_cached(cache_dir, version, expected_digest=None):
+    """
+    Reads a manifest from a cache
+    :param cache_dir: Cache directory
+    :param version: Version of the CNI plugin
+    :param expected_digest: SHA-256 pinned for the version, if any
+    :return: Manifest, as bytes, or None if it is not cached or does not match its digest
+    """
+    path = filecache.lookup(cache_dir, version, MANIFEST_SUFFIX, expected_digest)
+    if path is None:
+        return None
+    with open(path, 'rb') as manifest_file:
+        return manifest_file.read()
+
+
+def store(cache_dir, version, content):
+    """
+    Stores a manifest in a cache
+    :param cache_dir: Cache directory
+    :param version: Version of the CNI plugin
+    :param content: Manifest, as bytes
+    :return: SHA-256 of the manifest
+    """
+    return filecache.store(cache_dir, version, content, MANIFEST_SUFFIX)
+
+
+def download(version):
+    """
+    Downloads the manifest of a version from GitHub
+    :param version: Version of the CNI plugin
+    :return: Manifest, as bytes
+    """
+    import wget
+    url = constants.CNI_MANIFEST_URL.format(version)
+    LOG.info("Downloading CNI Plugin manifest {0}".format(url))
+    file_descriptor, path = tempfile.mkstemp(suffix='.yaml', dir=constants.TEMPORARY_DIR)
+    os.close(file_descriptor)
+    try:
+        wget.download(url, path)
+        with open(path, 'rb') as manifest_file:
+            return manifest_file.read()
+    finally:
+        os.remove(path)
+
+
+def _download_checked(version, expected_digest):
+    """
+    Downloads the manifest of a version, checking it against its pinned digest
+    :param version: Version of the CNI plugin
+    :param expected_digest: SHA-256 pinned for the version, if any
+    :return: Manifest, as bytes
+    """
+    content = download(version)
+    if expected_digest is not None and get_digest(content) != expected_digest:
+        raise Exception("CNI Plugin manifest v{0} downloaded has SHA-256 {1}, expected {2}".format(
+            version, get_digest(content), expected_digest))
+    return content
+
+
+def get_manifest(version, expected_digest=None):
+    """
+    Gets the manifest of a version from the caches, downloading it on a miss
+    :param version: Version of the CNI plugin
+    :param expected_digest: SHA-256 pinned for the version, if any
+    :return: Manifest
+    """
+    version = str(version)
+    for cache_dir in [constants.CNI_MANIFEST_IMAGE_CACHE_DIR, constants.CNI_MANIFEST_CACHE_DIR]:
+        content = read_cached(cache_dir, version, expected_digest)
+        if content is not None:
+            LOG.info("CNI Plugin manifest v{0} taken from cache {1}".format(version, cache_dir))
+            return content.decode('utf-8')
+
+    try:
+        content = _download_checked(version, expected_digest)
+    except Exception as exception:
+        raise Exception("CNI Plugin manifest v{0} is not cached and could not be downloaded: {1}".format(
+            version, exception)) from exception
+
+    try:
+        store(constants.CNI_MANIFEST_CACHE_DIR, version, content)
+    except OSError as exception:
+        LOG.warning("Failed to cache CNI Plugin manifest v{0}: {1}".format(version, exception))
+    return content.decode('utf-8')
+
+
+def set_region(manifest, region):
+    """
+    Points the images of a manifest to the ECR registry of a region
+    :param manifest: Manifest
+    :param region: AWS Region
+    :return: Manifest for the region
+    """
+    return manifest.replace(constants.CNI_MANIFEST_REGION, region)
+
+
+def prefetch(cache_dir, eks_versions_path=None, require_pins=False):
+    """
+    Caches the manifests of the CNI plugin versions of all the supported Kubernetes versions, e.g. in the image
+    :param cache_dir: Cache directory
+    :param eks_versions_path: Path of the EKS versions template, the one of the templates directory if None
+    :param require_pins: If True, fails when a version has no SHA-256 pinned in the EKS versions template,
+                         giving the digest of its manifest downloaded now to be reviewed and pinned
+    :return: Versions of the CNI plugin cached
+    """
+    eks_versions_path = eks_versions_path or os.path.join(constants.TEMPLATES_DIR, constants.TEMPLATE_EKS_VERSIONS)
+    eks_versions = utils.load_yaml(file_path=eks_versions_path)
+    pins = {}
+    for add_on_versions in eks_versions.values():
+        version = str(add_on_versions[constants.CNI_PLUGIN])
+        if pins.get(version) is None:
+            pins[version] = add_on_versions.get(constants.CNI_PLUGIN_SHA256)
+
+    unpinned = [version for version, expected_digest in pins.items() if expected_digest is None]
+    if require_pins and unpinned:
+        raise Exception("CNI Plugin manifests not pinned in {0}, check and pin their {1}: {2}".format(
+            eks_versions_path, constants.CNI_PLUGIN_SHA256,
+            ", ".join("v{0} downloaded with {1}".format(version, get_digest(download(version)))
+                      for version in unpinned)))
+
+    for version, expected_digest in pins.items():
+        if read_cached(cache_dir, version, expected_digest) is None:
+            store(cache_dir, version, _download_checked(version, expected_digest))
+            LOG.info("Cached CNI Plugin manifest v{0} in {1}".format(version, cache_dir))
+    return list(pins)
@@ -1,16 +1,14 @@
 """
 This module acts as base class for commands and contains common functions
 """
+import asyncio
+import functools
 import logging
 import os
 import datetime
-import re
 import string
 import random
 
-import urllib.error
-import wget
-
 from aws_deployment_manager.aws.aws_s3client import AwsS3Client
 from aws_deployment_manager.aws.aws_cfclient import AwsCFClient
 from aws_deployment_manager.aws.aws_ec2client import AwsEC2Client
@@ -18,9 +16,17 @@ from aws_deployment_manager.aws.aws_r53client import AwsR53Client
 from aws_deployment_manager.aws.aws_iamclient import AwsIAMClient
 from aws_deployment_manager.aws.aws_eksclient import AwsEKSClient
 from aws_deployment_manager.aws.aws_asgclient import AwsASGClient
+from aws_deployment_manager import aio
+from aws_deployment_manager import clock
+from aws_deployment_manager import cnimanifest
+from aws_deployment_manager import helmcharts
+from aws_deployment_manager import helmreleases
+from aws_deployment_manager import helmrunner
 from aws_deployment_manager import utils
 from aws_deployment_manager import constants
+from aws_deployment_manager import timing
 from aws_deployment_manager import stagelog
+from aws_deployment_manager.stagescheduler import StageScheduler
 
 LOG = logging.getLogger(__name__)
 
@@ -92,32 +98,27 @@ class Base:
         self.ingest_service_account_name = constants.INGEST_SA_NAME__DEFUALT
 
 
-        # Get Primary VPC CIDR
-        self.primary_vpc_cidr = self.aws_ec2client.get_primary_cidr(vpcid=self.vpcid)
-
-        # Get Availability Zones for Private Subnets
-        self.control_plane_subnet_01_az = self.aws_ec2client.get_subnet_availability_zone(
-            subnet_id=self.control_plane_subnet_01_id)
-        self.control_plane_subnet_02_az = self.aws_ec2client.get_subnet_availability_zone(
-            subnet_id=self.control_plane_subnet_02_id)
-
-        self.worker_node_subnet_01_az = self.aws_ec2client.get_subnet_availability_zone(
-            subnet_id=self.worker_node_subnet_01_id)
+        # Get Primary VPC CIDR, and Availability Zones and Route Table IDs for Private Subnets, concurrently
+        subnet_ids = [self.control_plane_subnet_01_id, self.control_plane_subnet_02_id, self.worker_node_subnet_01_id]
         if self.num_of_subnets == 2:
-            self.worker_node_subnet_02_az = self.aws_ec2client.get_subnet_availability_zone(
-                subnet_id=self.worker_node_subnet_02_id)
-
-        # Get Route Table IDs for Private Subnets
-        self.control_plane_subnet_rt_01_id = self.aws_ec2client.get_route_table_ids(
-            subnet_id=self.control_plane_subnet_01_id)
-        self.control_plane_subnet_rt_02_id = self.aws_ec2client.get_route_table_ids(
-            subnet_id=self.control_plane_subnet_02_id)
-
-        self.worker_node_subnet_rt_01_id = self.aws_ec2client.get_route_table_ids(
-            subnet_id=self.worker_node_subnet_01_id)
+            subnet_ids.append(self.worker_node_subnet_02_id)
+        results = self.run_concurrently(
+            functools.partial(self.aws_ec2client.get_primary_cidr, vpcid=self.vpcid),
+            *[functools.partial(self.aws_ec2client.get_subnet_availability_zone, subnet_id=subnet_id)
+              for subnet_id in subnet_ids],
+            *[functools.partial(self.aws_ec2client.get_route_table_ids, subnet_id=subnet_id)
+              for subnet_id in subnet_ids])
+        self.primary_vpc_cidr = results[0]
+        subnet_azs = results[1:len(subnet_ids) + 1]
+        subnet_rt_ids = results[len(subnet_ids) + 1:]
+
+        self.control_plane_subnet_01_az, self.control_plane_subnet_02_az, self.worker_node_subnet_01_az = \
+            subnet_azs[:3]
+        self.control_plane_subnet_rt_01_id, self.control_plane_subnet_rt_02_id, self.worker_node_subnet_rt_01_id = \
+            subnet_rt_ids[:3]
         if self.num_of_subnets == 2:
-            self.worker_node_subnet_rt_02_id = self.aws_ec2client.get_route_table_ids(
-                subnet_id=self.worker_node_subnet_02_id)
+            self.worker_node_subnet_02_az = subnet_azs[3]
+            self.worker_node_subnet_rt_02_id = subnet_rt_ids[3]
 
         # Get Hostnamess from Config
         self.hosted_zone_name = str(self.config[constants.PRIVATE_DOMAIN_NAME])
@@ -146,8 +147,10 @@ class Base:
         self.kube_proxy_version = eks_versions[self.k8sversion][constants.KUBE_PROXY]
         self.core_dns_version = eks_versions[self.k8sversion][constants.CORE_DNS]
         self.cni_plugin_version = eks_versions[self.k8sversion][constants.CNI_PLUGIN]
+        self.cni_plugin_sha256 = eks_versions[self.k8sversion].get(constants.CNI_PLUGIN_SHA256)
         self.auto_scaler_version = eks_versions[self.k8sversion][constants.AUTO_SCALER]
         self.aws_lb_controller_version = eks_versions[self.k8sversion][constants.AWS_LB_CONTROLLER]
+        self.aws_lb_controller_chart_version = eks_versions[self.k8sversion][constants.AWS_LB_CONTROLLER_CHART]
 
         LOG.info("Add On Kube Proxy Version = {0}".format(self.kube_proxy_version))
         LOG.info("Add On Core DNS Version = {0}".format(self.core_dns_version))
@@ -184,7 +187,7 @@ class Base:
 
     def _get_aws_registry_map(self):
         # AWS_ECR_URL="${AWS_ACCOUNT_ID}.dkr.ecr.${AWS_REGION}.amazonaws.com"
-        registry_id = utils.get_aws_ecr_registry_id()
+        registry_id = utils.get_aws_ecr_registry_id(region=self.aws_region)
         AWS_ECR_URL=f"{registry_id}.dkr.ecr.{self.aws_region}.amazonaws.com"
         self.aws_ecr_registry = AWS_ECR_URL
         return dict(
@@ -383,16 +386,18 @@ class Base:
 
         return stage_executed
 
-    def update_stage_state(self, stage, state):
+    def update_stage_state(self, stage, state, duration=None):
         """
         Updates state of a stage in stage log
         :param stage: Name of stage
         :param state: State of stage (started/finished)
+        :param duration: Duration in seconds of the stage, when finished
         """
 
         stagelog.write_to_stage_log(log_path=self.stage_log_path,
                                     stage=stage,
-                                    state=state)
+                                    state=state,
+                                    duration=duration)
 
     def execute_stage(self, func, stage):
         """
@@ -408,14 +413,54 @@ class Base:
         LOG.info("Started Executing stage {0}".format(stage))
         LOG.info("*************************************************")
         self.update_stage_state(stage=stage, state=constants.STAGE_STARTED)
+        start_time = clock.get_clock().monotonic()
 
         # Execute the function
-        func()
+        with timing.timed(stage, timing.CATEGORY_STAGE):
+            self.run_stage_function(func)
 
+        duration = clock.get_clock().monotonic() - start_time
         LOG.info("*************************************************")
-        LOG.info("Finished Executing stage {0}".format(stage))
+        LOG.info("Finished Executing stage {0} in {1}".format(stage, datetime.timedelta(seconds=round(duration))))
         LOG.info("*************************************************")
-        self.update_stage_state(stage=stage, state=constants.STAGE_FINISHED)
+        self.update_stage_state(stage=stage, state=constants.STAGE_FINISHED, duration=duration)
+
+    @staticmethod
+    def run_stage_function(func):
+        """
+        Run the function of a stage, on an event loop of the asyncio core if it is a coroutine function
+        :param func: Function, or coroutine function, without arguments
+        """
+        if asyncio.iscoroutinefunction(func):
+            aio.run(func())
+        else:
+            func()
+
+    @staticmethod
+    def run_concurrently(*operations):
+        """
+        Run independent blocking operations concurrently on the asyncio core and wait for all of them.
+        Coroutine stages await groups of operations with aio.gather instead.
+        :param operations: Functions without arguments, e.g. functools.partial of AWS wrapper methods
+        :return: List of the results, in the order of the operations
+        """
+        return aio.run_concurrently(*operations)
+
+    def execute_stages(self, stages, max_workers=None):
+        """
+        Execute stages concurrently according to their dependencies
+        :param stages: List of stagescheduler.Stage
+        :param max_workers: Maximum number of stages running at the same time
+        """
+        def execute(stage):
+            if stage.resumable:
+                self.execute_stage(func=stage.func, stage=stage.name)
+            else:
+                with timing.timed(stage.name, timing.CATEGORY_STAGE):
+                    self.run_stage_function(stage.func)
+
+        scheduler = StageScheduler(execute=execute, max_workers=max_workers or constants.STAGE_MAX_WORKERS)
+        scheduler.run(stages)
 
     def create_node_group(self, desired_size=None):
         """
@@ -481,43 +526,37 @@ class Base:
         Update the CNI Plugin during install and upgrade
         """
         LOG.info("Updating CNI Plugin...")
-        file = "aws-k8s-cni.yaml"
-        url = f"https://raw.githubusercontent.com/aws/amazon-vpc-cni-k8s/v{self.cni_plugin_version}/config/master/aws" \
-              f"-k8s-cni.yaml"
-        try:
-            wget.download(url, file)
-        except urllib.error.HTTPError as error:
-            LOG.error("Update CNI Plugin failed...Bad CNI version\n", error)
-        else:
-            region_old = 'us-west-2'
-            region_new = self.aws_region
-
-            with open(file, "r") as sources:
-                lines = sources.readlines()
-            with open(file, "w") as sources:
-                for line in lines:
-                    sources.write(re.sub(region_old, region_new, line))
-            LOG.info("Applying CNI Plugin via manifest {0}".format(file))
-            command = constants.COMMAND_KUBECTL_APPLY.format(file, constants.KUBECONFIG_PATH)
-            utils.execute_command(command=command)
-            command = constants.COMMAND_ENABLE_CUSTOM_CNI_CONFIG.format(constants.KUBECONFIG_PATH)
-            utils.execute_command(command=command)
-            LOG.info("Updated CNI Plugin")
+        manifest = cnimanifest.get_manifest(version=self.cni_plugin_version,
+                                            expected_digest=self.cni_plugin_sha256)
+        file = os.path.join(constants.TEMPORARY_DIR, constants.CNI_MANIFEST_NAME)
+        utils.write_file(file, cnimanifest.set_region(manifest, self.aws_region))
+
+        LOG.info("Applying CNI Plugin via manifest {0}".format(file))
+        command = constants.COMMAND_KUBECTL_APPLY.format(file, constants.KUBECONFIG_PATH)
+        utils.execute_command(command=command)
+        command = constants.COMMAND_ENABLE_CUSTOM_CNI_CONFIG.format(constants.KUBECONFIG_PATH)
+        utils.execute_command(command=command)
+        LOG.info("Updated CNI Plugin")
 
     def install_or_upgrade_aws_lb_controller(self):
         """
-        Install AWS LB controller using Helm. In case it is already installed it will upgrade.
+        Install AWS LB controller using Helm. In case it is already installed it will upgrade,
+        unless it is deployed with the same chart and values.
         """
-        LOG.info("Updating aws loadbalancer controller help repo in {0}".format(self.cluster_name))
-        LOG.info("Adding ALB controller Repo in Helm...")
-        command = constants.COMMAND_ALB_CONTROLLER_REPO_ADD
-        utils.execute_command(command=command)
+        chart = helmcharts.get_chart(constants.HELM_CHART_ALB_CONTROLLER, self.aws_lb_controller_chart_version)
 
-        LOG.info("Installing/Updating aws loadbalancer controller in {0}".format(self.cluster_name))
         eks_cluster_name = self.outputs[constants.EKS_CLUSTER_NAME]
+        settings = (eks_cluster_name, self.aws_region, self.aws_lb_controller_version)
+        digest = helmreleases.get_release_digest(chart, constants.COMMAND_INSTALL_ALB_CONTROLLER, *settings)
+        if helmreleases.is_up_to_date(constants.HELM_CHART_ALB_CONTROLLER, constants.NAMESPACE_KUBE_SYSTEM,
+                                      self.aws_lb_controller_chart_version, digest):
+            LOG.info("aws loadbalancer controller is up to date in {0}, skipping upgrade".format(self.cluster_name))
+            return
+
+        LOG.info("Installing/Updating aws loadbalancer controller in {0}".format(self.cluster_name))
         command = constants.COMMAND_INSTALL_ALB_CONTROLLER.format(
-            eks_cluster_name, self.aws_region, self.aws_lb_controller_version, constants.KUBECONFIG_PATH)
-        utils.execute_command(command=command)
+            *settings, constants.KUBECONFIG_PATH, chart, helmreleases.get_description(digest))
+        helmrunner.execute_command(command=command)
         LOG.info("Installed/Upgraded aws loadbalancer controller in {0}".format(self.cluster_name))
 
     def create_or_update_idun_stack(self):
@@ -605,16 +644,23 @@ class Base:
         """
         LOG.info("Deploying AWS EBS CSI Controller in EKS Cluster {0}".format(self.cluster_name))
 
-        LOG.info("Adding AWs EBS CSI Controller Repo in Helm...")
-        utils.execute_command(command=constants.CSI_HELM_REPO_ADD)
+        chart = helmcharts.get_chart(constants.HELM_CHART_CSI_DRIVER, constants.CSI_DRIVER_CHART_VERSION)
 
-        # Install AWS EBS CSI Controller
-        LOG.info("Installing AWS EBS CSI Controller...")
+        # Install AWS EBS CSI Controller, unless it is deployed with the same chart and values
         subs = {
             "CSI_CONTROLLER_ROLE_ARN": self.cfout[self.csi_controller_stack_name][constants.CSI_CONTROLLER_ROLE_ARN],
             **self.registry_map
         }
-        utils.exec_cmd(constants.CSI_HELM_UPGRADE_INSTALL,constants.TEMPLATE_CSI_VALUES,subs)
+        values_path = utils.render_template(constants.TEMPLATE_CSI_VALUES, subs)
+        digest = helmreleases.get_release_digest(chart, constants.CSI_HELM_UPGRADE_INSTALL,
+                                                 utils.read_file(values_path))
+        if helmreleases.is_up_to_date(constants.HELM_CHART_CSI_DRIVER, constants.NAMESPACE_KUBE_SYSTEM,
+                                      constants.CSI_DRIVER_CHART_VERSION, digest):
+            LOG.info("AWS EBS CSI Controller is up to date, skipping upgrade")
+        else:
+            LOG.info("Installing AWS EBS CSI Controller...")
+            helmrunner.execute_command(command=constants.CSI_HELM_UPGRADE_INSTALL.format(
+                values_path, constants.KUBECONFIG_PATH, chart, helmreleases.get_description(digest)))
 
         # Create Storage Class
         utils.kubectl_apply(constants.TEMPLATE_GP3_STORAGE_CLASS,
@@ -3,14 +3,14 @@ This module implements Configure command
 """
 import logging
 import os
-import json
-import time
-import re
-import tempfile
-import requests
 from aws_deployment_manager.commands.base import Base
+from aws_deployment_manager.stagescheduler import Stage
+from aws_deployment_manager import certificates
+from aws_deployment_manager import helmcharts
+from aws_deployment_manager import helmrunner
 from aws_deployment_manager import utils
 from aws_deployment_manager import constants
+from aws_deployment_manager import readiness
 
 LOG = logging.getLogger(__name__)
 
@@ -44,33 +44,29 @@ class ConfigureManager(Base):
         if constants.EKS_CLUSTER_NAME in self.outputs:
             self.cluster_name = str(self.outputs[constants.EKS_CLUSTER_NAME])
 
-            # Deploy NGINX Controller with front end private network load balancer
-            self.execute_stage(func=self._deploy_nginx_controller,
-                               stage=constants.CONFIGURE_STAGE_DEPLOY_NGINX_CONTROLLER)
-
-            # Create AWS LB controller Service Account
-            self.execute_stage(func=self._create_service_account_alb,
-                               stage=constants.CONFIGURE_STAGE_CREATE_SA_ALB_CONTROLLER)
-
-            # Install AWS LB controller
-            self.execute_stage(func=self.install_or_upgrade_aws_lb_controller,
-                               stage=constants.CONFIGURE_STAGE_INSTALL_ALB_CONTROLLER)
-
-            # Created Private Hosted Zone and update records
-            self.execute_stage(func=self._create_hosted_zone,
-                               stage=constants.CONFIGURE_STAGE_CREATED_HOSTED_ZONE)
-
-            # Deploy autoscaler with webidentity service account role
-            self.execute_stage(func=self._deploy_cluster_autoscaler,
-                               stage=constants.CONFIGURE_STAGE_DEPLOY_AUTO_SCALER)
-
-            # Deploy kube-downscaler
-            self.execute_stage(func=self.install_or_upgrade_kube_downscaler,
-                               stage=constants.CONFIGURE_STAGE_DEPLOY_KUBE_DOWNSCALER)
-
-            # Deploy Prometheus
-            self.execute_stage(func=self._deploy_prometheus,
-                               stage=constants.CONFIGURE_STAGE_DEPLOY_PROMETHEUS)
+            self.execute_stages([
+                # Deploy NGINX Controller with front end private network load balancer
+                Stage(constants.CONFIGURE_STAGE_DEPLOY_NGINX_CONTROLLER, self._deploy_nginx_controller),
+                # Create AWS LB controller Service Account
+                Stage(constants.CONFIGURE_STAGE_CREATE_SA_ALB_CONTROLLER, self._create_service_account_alb),
+                # Install AWS LB controller, after the NGINX Controller Service has been created so that the
+                # controller webhooks do not take over its load balancer
+                helmrunner.release_stage(constants.CONFIGURE_STAGE_INSTALL_ALB_CONTROLLER,
+                                         constants.HELM_CHART_ALB_CONTROLLER, self.install_or_upgrade_aws_lb_controller,
+                                         depends_on=[constants.CONFIGURE_STAGE_DEPLOY_NGINX_CONTROLLER,
+                                                     constants.CONFIGURE_STAGE_CREATE_SA_ALB_CONTROLLER]),
+                # Created Private Hosted Zone and update records, needs the NGINX Controller load balancer
+                Stage(constants.CONFIGURE_STAGE_CREATED_HOSTED_ZONE, self._create_hosted_zone,
+                      depends_on=[constants.CONFIGURE_STAGE_DEPLOY_NGINX_CONTROLLER]),
+                # Deploy autoscaler with webidentity service account role
+                Stage(constants.CONFIGURE_STAGE_DEPLOY_AUTO_SCALER, self._deploy_cluster_autoscaler),
+                # Deploy kube-downscaler
+                Stage(constants.CONFIGURE_STAGE_DEPLOY_KUBE_DOWNSCALER, self.install_or_upgrade_kube_downscaler),
+                # Deploy Prometheus, its ingress is validated by the NGINX Controller admission webhook
+                helmrunner.release_stage(constants.CONFIGURE_STAGE_DEPLOY_PROMETHEUS, constants.HELM_CHART_PROMETHEUS,
+                                         self._deploy_prometheus,
+                                         depends_on=[constants.CONFIGURE_STAGE_DEPLOY_NGINX_CONTROLLER]),
+            ])
 
             LOG.info("IDUN Configuration done")
         else:
@@ -85,9 +81,9 @@ class ConfigureManager(Base):
         LOG.info("Deploying NGINX Controller in EKS Cluster {0}".format(self.cluster_name))
         utils.kubectl_apply(constants.TEMPLATE_NGINX_CONTROLLER,self.registry_map)
 
-        # Wait for 3 mins for Ingress Controller to setup
         LOG.info("Waiting for NGINX Controller to come up properly...")
-        time.sleep(180)
+        readiness.wait_for_rollout(constants.NGINX_CONTROLLER_NAME, constants.NAMESPACE_NGINX,
+                                   constants.KUBECONFIG_PATH)
 
         LOG.info("Deployed NGINX Controller")
 
@@ -97,11 +93,8 @@ class ConfigureManager(Base):
         :return: External IP of Load Balancer
         """
         LOG.info("Getting external IP for Ingress Controller Service in cluster {0}".format(self.cluster_name))
-        command = constants.COMMAND_GET_INGRESS_CONTROLLER_EXTERNAL_IP.format(constants.KUBECONFIG_PATH)
-        command_output = utils.execute_command(command)
-
-        json_obj = json.loads(command_output)
-        external_ip = json_obj['status']['loadBalancer']['ingress'][0]['hostname']
+        external_ip = readiness.wait_for_load_balancer(constants.NGINX_CONTROLLER_NAME, constants.NAMESPACE_NGINX,
+                                                       constants.KUBECONFIG_PATH)
         LOG.info("External IP for Ingress Controller Service = {0}".format(external_ip))
         return external_ip
 
@@ -249,38 +242,7 @@ class ConfigureManager(Base):
         return role_arn
 
     def _get_thumb_print(self, cluster_oid_url):
-        url = cluster_oid_url + '/' + '.well-known/openid-configuration'
-        response = requests.get(url)
-        response_jwks = response.json()['jwks_uri'].split('/')[2]
-        response_jwks_str = json.dumps(response_jwks)
-        command = constants.COMMAND_GET_CERTIFICATE.format(response_jwks_str, response_jwks_str)
-        command_output = utils.execute_command(command=command)
-        temp_filename = tempfile.mktemp()
-        certificate = tempfile.mktemp()
-        with open(temp_filename, 'w') as file:
-            file.write(command_output)
-
-        start_pattern = '^[-]+BEGIN CERTIFICATE[-]+'
-        end_pattern = '^[-]+END CERTIFICATE[-]+'
-        with open(temp_filename) as file:
-            match = False
-            newfile = None
-            for line in file:
-                if re.match(start_pattern, line):
-                    match = True
-                    newfile = open(certificate, 'w')
-                    newfile.write(line)
-                elif re.match(end_pattern, line):
-                    match = False
-                    newfile.write(line)
-                    newfile.close()
-                elif match:
-                    newfile.write(line)
-
-        command = constants.COMMAND_GET_FINGERPRINT.format(certificate)
-        command_output = utils.execute_command(command)
-        thumb_print = ''.join(command_output.split('=')[1].split(':'))
-        return thumb_print.strip().lower()
+        return certificates.get_oidc_thumbprint(cluster_oid_url)
 
     def _deploy_prometheus(self):
         """
@@ -288,9 +250,7 @@ class ConfigureManager(Base):
         """
         LOG.info("Deploying Prometheus in EKS Cluster {0}".format(self.cluster_name))
 
-        LOG.info("Adding Prometheus Repo in Helm...")
-        command = constants.COMMAND_PROMETHEUS_REPO_ADD.format(constants.KUBECONFIG_PATH)
-        utils.execute_command(command=command)
+        chart = helmcharts.get_chart(constants.HELM_CHART_PROMETHEUS, constants.PROMETHEUS_CHART_VERSION)
 
         # Create Namespace
         LOG.info("Creating Prometheus Namespace...")
@@ -299,7 +259,9 @@ class ConfigureManager(Base):
         # Install Prometheus
         LOG.info("Installing Prometheus...")
         prometheus_values, subs = self.__get_values_and_substitutions(constants.TEMPLATE_PROMETHEUS_VALUES)
-        utils.exec_cmd(constants.COMMAND_INSTALL_PROMETHEUS,prometheus_values,subs)
+        values_path = utils.render_template(prometheus_values, subs)
+        helmrunner.execute_command(command=constants.COMMAND_INSTALL_PROMETHEUS.format(
+            values_path, constants.KUBECONFIG_PATH, chart))
 
         # Deploy Prometheus Ingress
         if 'prometheus' not in self.config[constants.HOSTNAMES]:
@@ -0,0 +1,183 @@
+"""
+This module implements the 'fleet' command, which runs a command across many IDUN environments.
+The fleet directory holds one working directory per environment, each with its own config.yaml.
+Every environment runs in a separate process of a pool, with its working directory, kubeconfig and
+temporary files relocated to its own directory, and with a limited number of environments per region.
+"""
+
+import json
+import logging
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from aws_deployment_manager import constants
+from aws_deployment_manager import timing
+from aws_deployment_manager.commands.runner import discover_environments, run_environment, STATUS_FAILED
+
+LOG = logging.getLogger(__name__)
+
+TABLE_COLUMNS = ['ENVIRONMENT', 'REGION', 'COMMAND', 'STATUS', 'TIME', 'LOG FILE / ERROR']
+
+
+class FleetManager:
+    """ Main Class for 'fleet' command """
+
+    def __init__(self, fleet_path, command, max_workers=constants.FLEET_MAX_WORKERS,
+                 max_per_region=constants.FLEET_MAX_ENVIRONMENTS_PER_REGION, options=None):
+        if command not in constants.FLEET_COMMANDS:
+            raise Exception("Command {0} can not be run across a fleet. Please select a command from {1}".
+                            format(command, constants.FLEET_COMMANDS))
+        self.fleet_path = str(fleet_path)
+        self.command = command
+        self.max_workers = max_workers
+        self.max_per_region = max_per_region
+        self.options = options or {}
+        self.environments = self.discover_environments()
+
+    def discover_environments(self):
+        """
+        Finds the working directories of the environments in the fleet directory
+        :return: list of environments, with their name, region and working directory
+        """
+        environments = discover_environments(self.fleet_path)
+        if not environments:
+            raise Exception("No environment found in {0}. Each environment needs its own directory "
+                            "with a config.yaml file".format(self.fleet_path))
+        LOG.info("Found {0} environments in {1}".format(len(environments), self.fleet_path))
+        return environments
+
+    def run(self):
+        """
+        Runs the command across the environments
+        :return: list of results, one per environment, in the order of the environments
+        """
+        LOG.info("Running {0} across {1} environments, {2} at a time and at most {3} per region".format(
+            self.command, len(self.environments), self.max_workers, self.max_per_region))
+        pending = list(self.environments)
+        running = {}
+        running_per_region = Counter()
+        results = {}
+
+        # Spawned workers start from a clean interpreter, without the logging and the clients of this process
+        with ProcessPoolExecutor(max_workers=self.max_workers,
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            while pending or running:
+                for environment in list(pending):
+                    if len(running) >= self.max_workers:
+                        break
+                    if running_per_region[environment['region']] >= self.max_per_region:
+                        continue
+                    LOG.info("Starting {0} of {1} in region {2}".format(
+                        self.command, environment['name'], environment['region']))
+                    try:
+                        future = executor.submit(run_environment, self.command, environment['workdir'],
+                                                 self.options)
+                    except BrokenProcessPool as exception:
+                        # A worker process died, the pool does not run anything anymore
+                        LOG.error("The worker processes are broken, {0} environments are not run: {1}".format(
+                            len(pending), exception))
+                        for not_run in pending:
+                            results[not_run['workdir']] = self.__get_failed_result(
+                                not_run, "Not run, the worker processes are broken: {0}".format(exception))
+                        pending.clear()
+                        break
+                    pending.remove(environment)
+                    running_per_region[environment['region']] += 1
+                    running[future] = environment
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    environment = running.pop(future)
+                    running_per_region[environment['region']] -= 1
+                    result = self.__get_result(future, environment)
+                    results[environment['workdir']] = result
+                    LOG.info("Finished {0} of {1}: {2}".format(self.command, environment['name'], result['status']))
+
+        return [results[environment['workdir']] for environment in self.environments]
+
+    def __get_result(self, future, environment):
+        """
+        Gets the result of an environment, also when its worker process died
+        :param future: Future of the environment
+        :param environment: Environment
+        :return: Result of the environment
+        """
+        try:
+            result = future.result()
+        except Exception as exception:
+            return self.__get_failed_result(environment, "Worker process failed: {0}".format(exception))
+        result.update({
+            'environment': environment['name'],
+            'region': environment['region'],
+            'command': self.command,
+            'workdir': environment['workdir']
+        })
+        return result
+
+    def __get_failed_result(self, environment, error):
+        """
+        :param environment: Environment
+        :param error: Error of the environment
+        :return: Result of an environment whose command did not run to its end
+        """
+        return {
+            'status': STATUS_FAILED,
+            'time_taken': None,
+            'log_file': None,
+            'error': error,
+            'environment': environment['name'],
+            'region': environment['region'],
+            'command': self.command,
+            'workdir': environment['workdir']
+        }
+
+
+def format_results(results):
+    """
+    Formats the results of the fleet as a table
+    :param results: Results of the environments
+    :return: Lines of the table
+    """
+    rows = [TABLE_COLUMNS]
+    for result in results:
+        time_taken = result['time_taken']
+        rows.append([
+            result['environment'],
+            str(result['region']),
+            result['command'],
+            result['status'],
+            str(timedelta(seconds=round(time_taken))) if time_taken is not None else '-',
+            result['error'] if result['status'] == STATUS_FAILED else result['log_file']
+        ])
+    widths = [max(len(row[column]) for row in rows) for column in range(len(TABLE_COLUMNS) - 1)]
+    return ['  '.join([cell.ljust(width) for cell, width in zip(row, widths)] + [row[-1]]) for row in rows]
+
+
+def log_results(results):
+    """
+    Logs the results of the fleet as a table
+    :param results: Results of the environments
+    """
+    LOG.info("================================================================================================")
+    for line in format_results(results):
+        LOG.info(line)
+    failed = [result for result in results if result['status'] == STATUS_FAILED]
+    LOG.info("{0} environments succeeded, {1} failed".format(len(results) - len(failed), len(failed)))
+    LOG.info("================================================================================================")
+
+
+def write_results(log_file_path, results):
+    """
+    Saves the results of the fleet next to the log file of the fleet
+    :param log_file_path: Absolute path of the log file
+    :param results: Results of the environments
+    :return: Path of the results file
+    """
+    results_path = timing.get_report_path(log_file_path, postfix=constants.FLEET_RESULTS_FILE_POSTFIX)
+    with open(results_path, 'w') as results_file:
+        json.dump(results, results_file, indent=2)
+    LOG.info("Fleet results saved to {0}".format(results_path))
+    return results_path
@@ -4,13 +4,14 @@ This module implements 'image' command
 
 import logging
 import base64
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import docker
-import boto3
 
 from aws_deployment_manager.commands.base import Base
+from aws_deployment_manager.aws import aws_clientpool
 from aws_deployment_manager import constants
-from aws_deployment_manager import utils
-from aws_deployment_manager import yamlhelper
+from aws_deployment_manager import imageinventory
 
 LOG = logging.getLogger(__name__)
 
@@ -24,8 +25,7 @@ class ImageManager(Base):
             # override of self.aws_region from config.yaml (see Base.__init__)
             self.aws_region = aws_image_region
 
-        session = boto3.Session(region_name=self.aws_region)
-        self._ecr = session.client('ecr')
+        self._ecr = aws_clientpool.get_client(constants.ECR_SERVICE, self.aws_region)
 
         self._docker_client = docker.from_env(timeout=int(600))
 
@@ -37,10 +37,8 @@ class ImageManager(Base):
             LOG.info("To force the execution use the command line parameter --force.")
             return
 
-        _generate_templates_from_helm_charts()
-        images = yamlhelper.get_image_from_template(
-            foldername=constants.TEMPLATES_DIR,
-            blacklist=constants.TEMPLATE_BLACKLIST)
+        images = imageinventory.get_images(templates_dir=constants.TEMPLATES_DIR,
+                                           blacklist=constants.TEMPLATE_BLACKLIST)
         LOG.info(f'Found {len(images)} images')
         self._create_repo_in_aws_ecr_if_required(images)
         ecn_images = _substitute_registry(images, self._get_ecn_registry_map())
@@ -48,7 +46,10 @@ class ImageManager(Base):
         LOG.info(f'ecn_images={ecn_images}')
         LOG.info(f'aws_images={aws_images}')
         self._login_ecr(self.aws_ecr_registry, self._ecr)
-        self._push_images(ecn_images, aws_images)
+        pushed_digests = self._push_images(ecn_images, aws_images)
+        imageinventory.record_image_digests(
+            {image: pushed_digests[aws_image] for image, aws_image in zip(images, aws_images)
+             if aws_image in pushed_digests})
         self._docker_client.close()
 
 
@@ -61,7 +62,11 @@ class ImageManager(Base):
 
 
     def _push_images(self, ecn_images, aws_images):
-        """Push images to ECR registry"""
+        """
+        Push images to ECR registry
+        :return: dictionary of pushed image to its digest, as reported by the registry
+        """
+        digests = {}
         for ecn_image, aws_image in zip(ecn_images,aws_images):
             LOG.info(f"Image to pull:  {ecn_image}")
             LOG.info(f"Image to push:  {aws_image}")
@@ -71,26 +76,91 @@ class ImageManager(Base):
             LOG.debug('Output of the docker push command')
             for line in output:
                 LOG.debug(line)
+                if isinstance(line, dict) and 'Digest' in line.get('aux', {}):
+                    digests[aws_image] = line['aux']['Digest']
             LOG.info("Image successfully processed")
         LOG.info("All images has been pulled and pushed")
+        return digests
 
 
     def _create_repo_in_aws_ecr_if_required(self, images):
-        for img in images:
-            repo_name = _extract_repo_name(img)
-            create_repo = False
-            try:
-                LOG.info(f'Check if repo {repo_name} already exist in AWS')
-                self._ecr.describe_repositories(repositoryNames=[repo_name])
-            except Exception as exception:
+        """
+        Makes sure a repository exists in ECR for every image, with scan-on-push and the lifecycle policy.
+        Existing repositories are listed once. The missing ones are created, and the existing ones updated,
+        concurrently in the same pass.
+        :param images: list of image references found in the templates
+        """
+        wanted = {_extract_repo_name(img) for img in images}
+        existing = self._list_ecr_repositories()
+        missing = sorted(wanted - set(existing))
+        LOG.info(f'{len(wanted)} repos required, {len(missing)} to be created in AWS')
+
+        errors = []
+        workers = min(constants.ECR_MAX_WORKERS, len(wanted)) or 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self._create_ecr_repository, repo_name): repo_name
+                       for repo_name in missing}
+            futures.update({executor.submit(self._update_ecr_repository, repo_name, existing[repo_name]): repo_name
+                            for repo_name in sorted(wanted & set(existing))})
+            for future in as_completed(futures):
                 try:
-                    if exception.response['Error']['Code'] == 'RepositoryNotFoundException':
-                        create_repo = True
-                except:
-                    raise exception
-            if create_repo:
-                LOG.info(f'Create repo {repo_name} in AWS')
-                self._ecr.create_repository(repositoryName=repo_name)
+                    future.result()
+                except Exception as exception:
+                    LOG.error(f'Failed to set up repo {futures[future]} in AWS: {exception}')
+                    errors.append(futures[future])
+        if errors:
+            raise Exception(f'Failed to set up the following repos in AWS: {", ".join(sorted(errors))}')
+
+    def _list_ecr_repositories(self):
+        """
+        Lists all the ECR repositories of the registry with a single paginated call
+        :return: dictionary of repository name to its scan-on-push setting
+        """
+        repositories = {}
+        paginator = self._ecr.get_paginator('describe_repositories')
+        for page in paginator.paginate():
+            for repository in page['repositories']:
+                scan_config = repository.get('imageScanningConfiguration', {})
+                repositories[repository['repositoryName']] = scan_config.get('scanOnPush', False)
+        return repositories
+
+    def _create_ecr_repository(self, repo_name):
+        """
+        Creates a single ECR repository and applies its lifecycle policy
+        :param repo_name: name of the repository
+        """
+        LOG.info(f'Create repo {repo_name} in AWS')
+        try:
+            self._ecr.create_repository(
+                repositoryName=repo_name,
+                imageScanningConfiguration={'scanOnPush': constants.ECR_SCAN_ON_PUSH})
+        except self._ecr.exceptions.RepositoryAlreadyExistsException:
+            # Another run may have created it since the listing
+            LOG.info(f'Repo {repo_name} already created in AWS')
+        self._ecr.put_lifecycle_policy(
+            repositoryName=repo_name,
+            lifecyclePolicyText=json.dumps(constants.ECR_LIFECYCLE_POLICY))
+
+    def _update_ecr_repository(self, repo_name, scan_on_push):
+        """
+        Enables scan-on-push on an existing ECR repository and applies its lifecycle policy, when they are not set
+        :param repo_name: name of the repository
+        :param scan_on_push: current scan-on-push setting of the repository
+        """
+        if scan_on_push != constants.ECR_SCAN_ON_PUSH:
+            LOG.info(f'Enable scan on push for repo {repo_name}')
+            self._ecr.put_image_scanning_configuration(
+                repositoryName=repo_name,
+                imageScanningConfiguration={'scanOnPush': constants.ECR_SCAN_ON_PUSH})
+        try:
+            policy = json.loads(self._ecr.get_lifecycle_policy(repositoryName=repo_name)['lifecyclePolicyText'])
+        except self._ecr.exceptions.LifecyclePolicyNotFoundException:
+            policy = None
+        if policy != constants.ECR_LIFECYCLE_POLICY:
+            LOG.info(f'Apply the lifecycle policy to repo {repo_name}')
+            self._ecr.put_lifecycle_policy(
+                repositoryName=repo_name,
+                lifecyclePolicyText=json.dumps(constants.ECR_LIFECYCLE_POLICY))
 
 
 def _image_as_dict(image_str):
@@ -99,35 +169,6 @@ def _image_as_dict(image_str):
     return dict(repository=repository, tag=tag)
 
 
-def _generate_templates_from_helm_charts():
-
-    helm_charts = [
-        {
-            "name": "prometheus",
-            "repo": constants.COMMAND_PROMETHEUS_HELM_REPO_ADD,
-            "val":  constants.TEMPLATE_PROMETHEUS_VALUES,
-            "tmpl": constants.COMMAND_GET_PROMETHEUS_TEMPLATE,
-            "yaml": constants.TEMPLATE_PROMETHEUS_TEMPORARY
-        },
-        {
-            "name": "csi-driver",
-            "repo": constants.CSI_HELM_REPO_ADD,
-            "val":  constants.TEMPLATE_CSI_VALUES,
-            "tmpl": constants.CSI_HELM_TEMPLATE ,
-            "yaml": constants.TEMPLATE_CSI_TEMPORARY
-        }
-    ];
-    for chart in helm_charts:
-        utils.execute_command(command=chart['repo'])
-        command = chart['tmpl'].format(constants.TEMPLATES_DIR + '/' + chart['val'])
-        template = utils.execute_command(command=command)
-
-        filename = constants.TEMPLATES_DIR + '/' + chart['yaml']
-        with open(filename, 'w') as template_file:
-            template_file.write(template)
-        LOG.info("Compiled the templates for {0} and created the file {1}".format(chart['name'], filename))
-
-
 def _extract_repo_name(img):
     indexes = [x[0] for x in enumerate(img) if x[1]=='/' or x[1]==':']
     index_of_the_first_slash = indexes[0] + 1
@@ -1,13 +1,15 @@
 """
 This module implements Install command
 """
+import functools
 import logging
 import os
-import time
 from packaging.version import Version
 from aws_deployment_manager.commands.base import Base
+from aws_deployment_manager.stagescheduler import Stage
 from aws_deployment_manager import utils
 from aws_deployment_manager import constants
+from aws_deployment_manager import readiness
 
 LOG = logging.getLogger(__name__)
 
@@ -42,93 +44,135 @@ class InstallManager(Base):
             # Upload Template URLs to S3 Bucket
             self.upload_templates()
 
-            # Create IDUN Base VPC Stack
-            self.execute_stage(func=self._create_base_vpc_stack,
-                               stage=constants.INSTALL_STAGE_CREATE_BASE_VPC_STACK)
+            self.execute_stages(self._get_install_stages())
+
+            LOG.info("SUCCESS - Created IDUN AWS Stack")
+        except Exception as exception:
+            raise exception
 
+    def _get_install_stages(self):
+        """
+        Install stages and their dependencies
+        :return: List of Stage
+        """
+        csi_supported = Version(self.k8sversion) > Version('1.22')
+        base_stacks = [constants.INSTALL_STAGE_UPDATE_ENDPOINT_SEC_GR]
+        cluster_stacks = [constants.INSTALL_STAGE_CREATE_ALB_CONTROLLER_STACK]
+        stages = [
+            # Create IDUN Base VPC Stack
+            Stage(constants.INSTALL_STAGE_CREATE_BASE_VPC_STACK, self._create_base_vpc_stack),
             # Update Endpoint Security Group
-            self.execute_stage(func=self._update_endpoint_security_group,
-                               stage=constants.INSTALL_STAGE_UPDATE_ENDPOINT_SEC_GR)
+            Stage(constants.INSTALL_STAGE_UPDATE_ENDPOINT_SEC_GR, self._update_endpoint_security_group,
+                  depends_on=[constants.INSTALL_STAGE_CREATE_BASE_VPC_STACK]),
+        ]
 
-            if not self.is_ecn_connected:
-                # Create IDUN Base Additional Resources Stack
-                self.execute_stage(func=self._create_base_additional_stack,
-                       stage=constants.INSTALL_STAGE_CREATE_BASE_ADD_STACK)
+        if not self.is_ecn_connected:
+            # Create IDUN Base Additional Resources Stack
+            stages.append(Stage(constants.INSTALL_STAGE_CREATE_BASE_ADD_STACK, self._create_base_additional_stack,
+                                depends_on=[constants.INSTALL_STAGE_CREATE_BASE_VPC_STACK]))
+            base_stacks.append(constants.INSTALL_STAGE_CREATE_BASE_ADD_STACK)
 
+        stages += [
             # Create IDUN Stack
-            self.execute_stage(func=self.create_or_update_idun_stack,
-                               stage=constants.INSTALL_STAGE_CREATE_IDUN_INFRA_STACK)
-
-            if not self.is_ecn_connected:
-                # Create IDUN Infrastructure Additional Resources Stack
-                self.execute_stage(func=self.create_or_update_idun_additional_stack,
-                       stage=constants.INSTALL_STAGE_CREATE_IDUN_ADDIT_STACK)
-
+            Stage(constants.INSTALL_STAGE_CREATE_IDUN_INFRA_STACK, self.create_or_update_idun_stack,
+                  depends_on=base_stacks),
             # Get IDUN Stack Output
-            self.outputs = self.get_idun_stack_outputs()
-            self.cluster_name = str(self.outputs[constants.EKS_CLUSTER_NAME])
-
+            Stage(constants.INSTALL_STEP_GET_IDUN_OUTPUTS, self._load_idun_stack_outputs,
+                  depends_on=[constants.INSTALL_STAGE_CREATE_IDUN_INFRA_STACK], resumable=False),
             # Create IDUN ALB Controller Stack
-            self.execute_stage(func=self.create_or_update_alb_controller_stack,
-                               stage=constants.INSTALL_STAGE_CREATE_ALB_CONTROLLER_STACK)
-
-            if Version(self.k8sversion) > Version('1.22'):
-                # Create IDUN CSI Controller Stack
-                self.execute_stage(func=self.create_or_update_csi_controller_stack,
-                                   stage=constants.INSTALL_STAGE_CREATE_CSI_CONTROLLER_STACK)
-
+            Stage(constants.INSTALL_STAGE_CREATE_ALB_CONTROLLER_STACK, self.create_or_update_alb_controller_stack,
+                  depends_on=[constants.INSTALL_STEP_GET_IDUN_OUTPUTS]),
+        ]
+
+        if not self.is_ecn_connected:
+            # Create IDUN Infrastructure Additional Resources Stack
+            stages.append(Stage(constants.INSTALL_STAGE_CREATE_IDUN_ADDIT_STACK,
+                                self.create_or_update_idun_additional_stack,
+                                depends_on=[constants.INSTALL_STEP_GET_IDUN_OUTPUTS]))
+            cluster_stacks.append(constants.INSTALL_STAGE_CREATE_IDUN_ADDIT_STACK)
+
+        if csi_supported:
+            # Create IDUN CSI Controller Stack
+            stages.append(Stage(constants.INSTALL_STAGE_CREATE_CSI_CONTROLLER_STACK,
+                                self.create_or_update_csi_controller_stack,
+                                depends_on=[constants.INSTALL_STEP_GET_IDUN_OUTPUTS]))
+            cluster_stacks.append(constants.INSTALL_STAGE_CREATE_CSI_CONTROLLER_STACK)
+
+        stages += [
             # Generate Kube Config for Admin User
-            self._generate_kube_config_for_admin()
-
-            LOG.info("Waiting for EKS Control Plane to come up properly...")
-            time.sleep(30)
-
+            Stage(constants.INSTALL_STEP_GENERATE_KUBECONFIG, self._generate_kube_config_and_wait,
+                  depends_on=[constants.INSTALL_STEP_GET_IDUN_OUTPUTS], resumable=False),
             # Update Config Map with SAML Admin Role
-            self.execute_stage(func=self._update_k8s_config_map,
-                               stage=constants.INSTALL_STAGE_UPDATE_K8S_CONFIG_MAP)
-
+            Stage(constants.INSTALL_STAGE_UPDATE_K8S_CONFIG_MAP, self._update_k8s_config_map,
+                  depends_on=[constants.INSTALL_STEP_GENERATE_KUBECONFIG]),
             # Enable Private Endpoint Access for EKS Cluster
-            self.execute_stage(func=self._change_cluster_private_public_access,
-                               stage=constants.INSTALL_STAGE_CHANGE_CLUSTER_ACCESS)
-
+            Stage(constants.INSTALL_STAGE_CHANGE_CLUSTER_ACCESS, self._change_cluster_private_public_access,
+                  depends_on=[constants.INSTALL_STAGE_UPDATE_K8S_CONFIG_MAP]),
             # Update CNI Version
-            self.execute_stage(func=self.update_cni_plugin,
-                               stage=constants.INSTALL_STAGE_UPDATE_CNI_VERSION)
-
+            Stage(constants.INSTALL_STAGE_UPDATE_CNI_VERSION, self.update_cni_plugin,
+                  depends_on=[constants.INSTALL_STAGE_CHANGE_CLUSTER_ACCESS]),
             # Enable Custom CNI Config
-            self.execute_stage(func=self._enable_custom_cni_config,
-                               stage=constants.INSTALL_STAGE_ENABLE_CNI_CONFIG)
+            Stage(constants.INSTALL_STAGE_ENABLE_CNI_CONFIG, self._enable_custom_cni_config,
+                  depends_on=[constants.INSTALL_STAGE_UPDATE_CNI_VERSION]),
+            # Create and Apply ENI Config files for POD Subnets, the ENIConfig CRD comes with the CNI plugin
+            Stage(constants.INSTALL_STAGE_CREATE_ENI_CONFIG, self._create_eni_config,
+                  depends_on=[constants.INSTALL_STAGE_UPDATE_CNI_VERSION]),
+            # Update ENI Config Label, sets env on the same daemonset as the custom CNI config
+            Stage(constants.INSTALL_STAGE_SET_ENI_LABEL, self._set_eni_config_label,
+                  depends_on=[constants.INSTALL_STAGE_ENABLE_CNI_CONFIG]),
+            # Deploy Calico CNI
+            Stage(constants.INSTALL_STAGE_DEPLOY_CALICO_CNI, self._deploy_calico,
+                  depends_on=[constants.INSTALL_STAGE_CREATE_ENI_CONFIG, constants.INSTALL_STAGE_SET_ENI_LABEL]),
+        ]
+
+        if csi_supported:
+            # Deploy EBS CSI Controller
+            storage_stage = Stage(constants.INSTALL_STAGE_DEPLOY_EBS_CSI_CONTROLLER, self._deploy_ebs_csi_storage,
+                                  depends_on=[constants.INSTALL_STAGE_CHANGE_CLUSTER_ACCESS,
+                                              constants.INSTALL_STAGE_CREATE_CSI_CONTROLLER_STACK])
+        else:
+            # Create GP2 Default Storage Class
+            storage_stage = Stage(constants.INSTALL_STAGE_CREATE_DEFAULT_STORAGE, self._create_gp2_default_storage,
+                                  depends_on=[constants.INSTALL_STAGE_CHANGE_CLUSTER_ACCESS])
+        stages.append(storage_stage)
 
-            # Create and Apply ENI Config files for POD Subnets
-            self.execute_stage(func=self._create_eni_config,
-                               stage=constants.INSTALL_STAGE_CREATE_ENI_CONFIG)
+        # Create Node Group
+        stages.append(Stage(constants.INSTALL_STAGE_CREATE_NODE_GROUP, self.create_node_group,
+                            depends_on=[constants.INSTALL_STAGE_DEPLOY_CALICO_CNI, storage_stage.name,
+                                        *cluster_stacks]))
+        return stages
 
-            # Update ENI Config Label
-            self.execute_stage(func=self._set_eni_config_label,
-                               stage=constants.INSTALL_STAGE_SET_ENI_LABEL)
+    def _load_idun_stack_outputs(self):
+        """
+        Load IDUN Stack Output, needed by all the stages after the IDUN stack
+        """
+        self.outputs = self.get_idun_stack_outputs()
+        self.cluster_name = str(self.outputs[constants.EKS_CLUSTER_NAME])
 
-            # Deploy Calico CNI
-            self.execute_stage(func=self._deploy_calico,
-                               stage=constants.INSTALL_STAGE_DEPLOY_CALICO_CNI)
-
-            self._delete_storage_class(constants.STORAGE_CLASS_NAME_GP2)
-            self._delete_storage_class(constants.STORAGE_CLASS_NAME_GP3)
-            if Version(self.k8sversion) > Version('1.22'):
-                # Deploy EBS CSI Controller
-                self.execute_stage(func=self.deploy_ebs_csi_controller,
-                                   stage=constants.INSTALL_STAGE_DEPLOY_EBS_CSI_CONTROLLER)
-            else:
-                # Create GP2 Default Storage Class
-                self.execute_stage(func=self._create_gp2_storage_class,
-                                   stage=constants.INSTALL_STAGE_CREATE_DEFAULT_STORAGE)
+    def _generate_kube_config_and_wait(self):
+        """
+        Generate Kube Config for Admin User and wait for the EKS Control Plane
+        """
+        self._generate_kube_config_for_admin()
 
-            # Create Node Group
-            self.execute_stage(func=self.create_node_group,
-                               stage=constants.INSTALL_STAGE_CREATE_NODE_GROUP)
+        LOG.info("Waiting for EKS Control Plane to come up properly...")
+        readiness.wait_for_api_server(constants.KUBECONFIG_PATH)
 
-            LOG.info("SUCCESS - Created IDUN AWS Stack")
-        except Exception as exception:
-            raise exception
+    def _deploy_ebs_csi_storage(self):
+        """
+        Replace the default storage classes with the EBS CSI Controller one
+        """
+        self._delete_storage_class(constants.STORAGE_CLASS_NAME_GP2)
+        self._delete_storage_class(constants.STORAGE_CLASS_NAME_GP3)
+        self.deploy_ebs_csi_controller()
+
+    def _create_gp2_default_storage(self):
+        """
+        Replace the default storage classes with the GP2 one
+        """
+        self._delete_storage_class(constants.STORAGE_CLASS_NAME_GP2)
+        self._delete_storage_class(constants.STORAGE_CLASS_NAME_GP3)
+        self._create_gp2_storage_class()
 
     def post_install(self):
         """
@@ -138,19 +182,18 @@ class InstallManager(Base):
         self.outputs = self.get_idun_stack_outputs()
 
         if constants.EKS_CLUSTER_NAME in self.outputs:
-            # Create namespaces
-            utils.create_namespace(namespace=constants.NAMESPACE_K8S_DASHBOARD)
-            utils.create_namespace(namespace=constants.NAMESPACE_NGINX)
-            utils.create_namespace(namespace=constants.NAMESPACE_KUBE_SYSTEM)
-
-            # Create Armdocker Secret to pull images
-            self._create_armdocker_secret(namespace=constants.NAMESPACE_K8S_DASHBOARD)
-            self._create_armdocker_secret(namespace=constants.NAMESPACE_NGINX)
-            self._create_armdocker_secret(namespace=constants.NAMESPACE_KUBE_SYSTEM)
+            # Create namespaces with the Armdocker Secret to pull images
+            namespaces = [constants.NAMESPACE_K8S_DASHBOARD, constants.NAMESPACE_NGINX,
+                          constants.NAMESPACE_KUBE_SYSTEM]
+            stages = [Stage(constants.INSTALL_STEP_SETUP_NAMESPACE.format(namespace),
+                            functools.partial(self._setup_namespace, namespace), resumable=False)
+                      for namespace in namespaces]
 
             # Deploy K8S Dashbord
-            self.execute_stage(func=self._setup_k8s_dashboard,
-                               stage=constants.INSTALL_STAGE_SETUP_K8S_DASHBOARD)
+            stages.append(Stage(constants.INSTALL_STAGE_SETUP_K8S_DASHBOARD, self._setup_k8s_dashboard,
+                                depends_on=[constants.INSTALL_STEP_SETUP_NAMESPACE.format(
+                                    constants.NAMESPACE_K8S_DASHBOARD)]))
+            self.execute_stages(stages)
 
             # Generate Kubeconfig files as output
             LOG.info("K8S Config File generated at {0}".format(constants.KUBECONFIG_PATH))
@@ -442,6 +485,14 @@ class InstallManager(Base):
         self.aws_ec2client.apply_eks_tags_to_subnet(subnet_id=self.control_plane_subnet_02_id)
         LOG.info("Applied EKS Tags to Private Subnet IDs in VPC...")
 
+    def _setup_namespace(self, namespace):
+        """
+        Create namespace and the Armdocker Secret in it
+        :param namespace: Name of namespace
+        """
+        utils.create_namespace(namespace=namespace)
+        self._create_armdocker_secret(namespace=namespace)
+
     def _create_armdocker_secret(self, namespace):
         """
         Create Secret for Armdocker or pulling images
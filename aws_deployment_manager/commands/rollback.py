@@ -2,9 +2,9 @@
 This module implements Rollback command
 """
 import logging
-import time
 from aws_deployment_manager import utils
 from aws_deployment_manager import constants
+from aws_deployment_manager import timing
 from aws_deployment_manager.commands.base import Base
 
 LOG = logging.getLogger(__name__)
@@ -134,7 +134,7 @@ class RollbackManager(Base):
             LOG.info("Draining node {0}".format(node))
             utils.drain_node(node_name=node, kubeconfig_path=constants.KUBECONFIG_PATH)
             LOG.info("Wait 1 minute before draining next node...")
-            time.sleep(60)
+            timing.sleep(60, reason="wait between node drains")
 
         LOG.info("All nodes drained...")
 
@@ -0,0 +1,184 @@
+"""
+This module runs the commands on an environment, in a worker process dedicated to environments.
+An environment is a working directory holding its own config.yaml. The working directory paths are
+process wide, so a worker process runs the commands of a single environment at a time.
+"""
+# pylint: disable=import-outside-toplevel
+
+import logging
+import os
+import tempfile
+import time
+import traceback
+from datetime import timedelta
+from pathlib import Path
+
+from aws_deployment_manager import apimetrics
+from aws_deployment_manager import constants
+from aws_deployment_manager import timing
+from aws_deployment_manager import utils
+from aws_deployment_manager import workdir
+
+LOG = logging.getLogger(__name__)
+
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+
+
+def discover_environments(environments_path):
+    """
+    Finds the working directories of the environments in a directory
+    :param environments_path: Directory with one working directory, holding a config.yaml, per environment
+    :return: list of environments, with their name, region and working directory
+    """
+    environments = []
+    for config_file_path in sorted(Path(environments_path).glob('*/config.yaml')):
+        environment_workdir = config_file_path.parent
+        try:
+            config = utils.load_yaml(file_path=str(config_file_path))
+        except Exception as exception:
+            LOG.warning("Unable to read {0}: {1}".format(config_file_path, exception))
+            config = None
+        if not isinstance(config, dict):
+            config = {}
+        environments.append({
+            'name': str(config.get(constants.ENVIRONMENT_NAME) or environment_workdir.name),
+            'region': config.get(constants.AWS_REGION),
+            'workdir': str(environment_workdir)
+        })
+    return environments
+
+
+def run_environment(command, workdir_path, options, log_postfix=None):
+    """
+    Runs a command on an environment, in a worker process
+    :param command: Name of the command
+    :param workdir_path: Working directory of the environment
+    :param options: Options of the command
+    :param log_postfix: Postfix of the log file name, the command by default
+    :return: Result of the command
+    """
+    start_time = time.time()
+    _isolate_environment(workdir_path)
+    log_file_path = utils.initialize_logging(verbosity=0, working_directory=workdir_path,
+                                             logs_sub_directory=constants.LOGS_DIRECTORY_NAME,
+                                             filename_postfix=log_postfix or command.replace('-', '_'))
+    LOG.info('IDUN {0} started in {1}'.format(command, workdir_path))
+    result = {'status': STATUS_SUCCEEDED, 'log_file': os.path.join(workdir_path, log_file_path), 'error': None}
+    try:
+        COMMANDS[command](options)
+    except Exception as exception:
+        LOG.debug(traceback.format_exc())
+        LOG.error(exception, exc_info=True)
+        result.update({'status': STATUS_FAILED, 'error': str(exception)})
+    else:
+        LOG.info('IDUN {0} completed successfully'.format(command))
+    finally:
+        time_taken = time.time() - start_time
+        LOG.info('Time Taken: %s', timedelta(seconds=round(time_taken)))
+        timing.report(result['log_file'], time_taken)
+        apimetrics.report(result['log_file'])
+        result['time_taken'] = time_taken
+    return result
+
+
+def _isolate_environment(workdir_path):
+    """
+    Moves every file the commands write, and the logging, to the working directory of the environment.
+    The AWS clients of the process are kept, so that the following commands find them warm.
+    :param workdir_path: Working directory of the environment
+    """
+    workdir.relocate(workdir_path)
+    temporary_dir = Path(workdir_path) / 'tmp'
+    temporary_dir.mkdir(parents=True, exist_ok=True)
+    constants.TEMPORARY_DIR = str(temporary_dir)
+    tempfile.tempdir = str(temporary_dir)
+    os.environ['KUBECONFIG'] = constants.KUBECONFIG_PATH
+    # Downloads of the commands land in the current directory
+    os.chdir(workdir_path)
+
+    root_logger = logging.getLogger('')
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    timing.reset()
+    apimetrics.reset()
+
+
+def _validate(_options):
+    """Validates the configuration of the environment"""
+    from aws_deployment_manager.commands.validate import ValidateManager
+    if not ValidateManager().validate_config():
+        raise Exception("Configuration File not valid")
+
+
+def _install(_options):
+    """Installs the environment, with the Armdocker credentials of the environment variables"""
+    from aws_deployment_manager.commands.install import InstallManager
+    armdocker_user = os.environ.get(constants.ARMDOCKER_USERNAME_ENV_VAR)
+    armdocker_pass = os.environ.get(constants.ARMDOCKER_PASSWORD_ENV_VAR)
+    if not armdocker_user or not armdocker_pass:
+        raise Exception("The environment variables {0} and {1} must hold the Armdocker credentials".format(
+            constants.ARMDOCKER_USERNAME_ENV_VAR, constants.ARMDOCKER_PASSWORD_ENV_VAR))
+    utils.test_docker_registry_login(constants.ARMDOCKER_REGISTRY_URL, armdocker_user, armdocker_pass)
+    install_manager = InstallManager(armdocker_user, armdocker_pass)
+    install_manager.pre_install()
+    install_manager.install()
+    install_manager.post_install()
+
+
+def _configure(options):
+    """Configures the environment for the namespace of the options"""
+    from aws_deployment_manager.commands.configure import ConfigureManager
+    if not options.get('namespace'):
+        raise Exception("The namespace option is required to configure the environment")
+    ConfigureManager(options['namespace']).configure()
+
+
+def _upgrade(options):
+    """Upgrades the environment"""
+    from aws_deployment_manager.commands.upgrade import UpgradeManager
+    UpgradeManager().upgrade(options.get('upgrade_kube_downscaler', False))
+
+
+def _rollback(_options):
+    """Rolls the environment back"""
+    from aws_deployment_manager.commands.rollback import RollbackManager
+    RollbackManager().rollback()
+
+
+def _cleanup(_options):
+    """Cleans the environment up after an upgrade"""
+    from aws_deployment_manager.commands.cleanup import CleanupManager
+    CleanupManager().cleanup()
+
+
+def _update(_options):
+    """Updates the environment"""
+    from aws_deployment_manager.commands.update import UpdateManager
+    UpdateManager().update()
+
+
+def _image_push(options):
+    """Pushes the images to the ECR of the environment"""
+    from aws_deployment_manager.commands.image import ImageManager
+    ImageManager().image(options.get('force', False))
+
+
+def _delete(_options):
+    """Deletes the environment"""
+    from aws_deployment_manager.commands.delete import DeleteManager
+    config = utils.load_yaml(file_path=constants.CONFIG_FILE_PATH)
+    DeleteManager(env_name=config[constants.ENVIRONMENT_NAME], region=config[constants.AWS_REGION]).delete()
+
+
+COMMANDS = {
+    'validate': _validate,
+    'install': _install,
+    'configure': _configure,
+    'upgrade': _upgrade,
+    'rollback': _rollback,
+    'cleanup': _cleanup,
+    'update': _update,
+    'image-push': _image_push,
+    'delete': _delete
+}
@@ -0,0 +1,427 @@
+"""
+This module implements the 'serve' command, a long running deployment service.
+The service directory holds one working directory, with its own config.yaml, per environment, like a fleet.
+Jobs are submitted over a local HTTP API, on a TCP port or a Unix socket, and kept in a SQLite queue.
+Each environment has a worker process of its own, started by its first job and kept for the following
+ones, so that their AWS clients and caches are warm. An environment runs one job at a time.
+
+API:
+    GET  /health                              Status of the service
+    GET  /environments                        Environments of the service directory
+    GET  /jobs[?environment=<name>]           Latest jobs
+    POST /jobs                                Submits {"environment": ..., "command": ..., "options": {...}}
+    GET  /jobs/<id>                           Job
+    GET  /jobs/<id>/log[?offset=N&follow=1]   Log of the job, streamed until the job finishes with follow
+"""
+
+import functools
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socketserver
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+from aws_deployment_manager import clock
+from aws_deployment_manager import constants
+from aws_deployment_manager import errors
+from aws_deployment_manager import jobqueue
+from aws_deployment_manager.commands import runner
+
+LOG = logging.getLogger(__name__)
+
+
+class ServeManager:
+    """ Main Class for 'serve' command """
+
+    def __init__(self, service_path, max_environments=constants.SERVICE_MAX_ENVIRONMENTS):
+        self.service_path = str(service_path)
+        self.max_environments = max_environments
+        self.queue = jobqueue.JobQueue(os.path.join(self.service_path, constants.SERVICE_DATABASE_NAME))
+        self.queue.recover()
+        self.__executors = {}
+        self.__running = {}
+        self.__lock = threading.Lock()
+        self.__wakeup = threading.Event()
+        self.__stopped = threading.Event()
+        self.__dispatcher = None
+
+    def get_environments(self):
+        """
+        Finds the environments of the service directory, which may change while the service runs
+        :return: list of environments, with their name, region and working directory
+        """
+        return runner.discover_environments(self.service_path)
+
+    def get_environment(self, name):
+        """
+        :param name: Name of the environment
+        :return: Environment
+        """
+        for environment in self.get_environments():
+            if environment['name'] == name:
+                return environment
+        raise errors.ServiceNotFoundError("Environment {0} not found in {1}".format(name, self.service_path))
+
+    def get_running_jobs(self):
+        """
+        :return: IDs of the jobs running in the worker processes
+        """
+        with self.__lock:
+            return sorted(self.__running)
+
+    def submit_job(self, environment, command, options=None):
+        """
+        Queues a job
+        :param environment: Name of the environment
+        :param command: Name of the command
+        :param options: Options of the command
+        :return: Job
+        """
+        if command not in constants.SERVICE_COMMANDS:
+            raise errors.ServiceRequestError("Command {0} is not supported by the service. Please select a command "
+                                             "from {1}".format(command, constants.SERVICE_COMMANDS))
+        if options is not None and not isinstance(options, dict):
+            raise errors.ServiceRequestError("The options of a job must be an object")
+        self.get_environment(environment)
+        job = self.queue.submit(environment, command, options)
+        self.__wakeup.set()
+        return job
+
+    def get_job(self, job_id):
+        """
+        :param job_id: ID of the job
+        :return: Job
+        """
+        job = self.queue.get(job_id)
+        if job is None:
+            raise errors.ServiceNotFoundError("Job {0} not found".format(job_id))
+        return job
+
+    def get_job_log_path(self, job):
+        """
+        :param job: Job
+        :return: Path of the log file of the job, None if the job has not started logging
+        """
+        if job['log_file']:
+            return job['log_file']
+        try:
+            environment = self.get_environment(job['environment'])
+        except errors.ServiceNotFoundError:
+            return None
+        log_files = sorted(Path(environment['workdir'], constants.LOGS_DIRECTORY_NAME).glob(
+            '*_{0}.log'.format(_get_log_postfix(job))))
+        return str(log_files[-1]) if log_files else None
+
+    def start(self):
+        """
+        Starts running the queued jobs
+        """
+        self.__stopped.clear()
+        self.__dispatcher = threading.Thread(target=self.__dispatch, name='service-dispatcher', daemon=True)
+        self.__dispatcher.start()
+
+    def stop(self, wait=True):
+        """
+        Stops running the queued jobs
+        :param wait: Waits for the running jobs to finish
+        """
+        self.__stopped.set()
+        self.__wakeup.set()
+        if self.__dispatcher is not None:
+            self.__dispatcher.join()
+        with self.__lock:
+            executors = list(self.__executors.values())
+            self.__executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=wait)
+        if wait:
+            self.queue.close()
+
+    def serve(self, host=constants.SERVICE_HOST, port=constants.SERVICE_PORT, socket_path=None):
+        """
+        Runs the service until it is interrupted or terminated
+        :param host: Host of the TCP server
+        :param port: Port of the TCP server
+        :param socket_path: Path of the Unix socket, used instead of the TCP server if set
+        """
+        server = create_server(self, host=host, port=port, socket_path=socket_path)
+        LOG.info("IDUN deployment service listening on {0}".format(
+            socket_path or "http://{0}:{1}".format(*server.server_address)))
+
+        def terminate(signal_number, _frame):
+            LOG.info("Stopping the service after signal {0}".format(signal_number))
+            # serve_forever has to be stopped from another thread
+            threading.Thread(target=server.shutdown).start()
+        signal.signal(signal.SIGTERM, terminate)
+
+        self.start()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            LOG.info("Stopping the service")
+        finally:
+            server.server_close()
+            LOG.info("Waiting for {0} running jobs to finish".format(len(self.get_running_jobs())))
+            self.stop()
+
+    def __dispatch(self):
+        """
+        Starts the queued jobs whose environment is free, while fewer than max_environments jobs run
+        """
+        while not self.__stopped.is_set():
+            self.__wakeup.wait(timeout=constants.SERVICE_POLL_INTERVAL)
+            self.__wakeup.clear()
+            while not self.__stopped.is_set() and len(self.get_running_jobs()) < self.max_environments:
+                job = self.queue.claim_next()
+                if job is None:
+                    break
+                self.__start_job(job)
+
+    def __start_job(self, job):
+        """
+        Runs a job in the worker process of its environment
+        :param job: Job
+        """
+        try:
+            environment = self.get_environment(job['environment'])
+        except errors.ServiceNotFoundError as exception:
+            self.queue.finish(job['id'], jobqueue.JOB_FAILED, error=str(exception))
+            return
+
+        LOG.info("Starting job {0}: {1} of {2}".format(job['id'], job['command'], job['environment']))
+        with self.__lock:
+            executor = self.__executors.get(environment['workdir'])
+            if executor is None:
+                # Spawned workers start from a clean interpreter, without the logging and the threads of the service
+                executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+                self.__executors[environment['workdir']] = executor
+            future = executor.submit(runner.run_environment, job['command'], environment['workdir'],
+                                     job['options'], _get_log_postfix(job))
+            self.__running[job['id']] = future
+        future.add_done_callback(functools.partial(self.__finish_job, job, environment['workdir']))
+
+    def __finish_job(self, job, workdir_path, future):
+        """
+        Records the result of a job
+        :param job: Job
+        :param workdir_path: Working directory of the environment
+        :param future: Future of the job
+        """
+        try:
+            result = future.result()
+        except Exception as exception:
+            result = {'status': runner.STATUS_FAILED, 'log_file': None,
+                      'error': "Worker process failed: {0}".format(exception)}
+            # The next job of the environment starts a new worker process
+            with self.__lock:
+                self.__executors.pop(workdir_path, None)
+        status = jobqueue.JOB_SUCCEEDED if result['status'] == runner.STATUS_SUCCEEDED else jobqueue.JOB_FAILED
+        self.queue.finish(job['id'], status, log_file=result['log_file'], error=result['error'])
+        with self.__lock:
+            self.__running.pop(job['id'], None)
+        self.__wakeup.set()
+
+
+def _get_log_postfix(job):
+    """
+    :param job: Job
+    :return: Postfix of the log file name of the job
+    """
+    return "{0}_job{1}".format(job['command'].replace('-', '_'), job['id'])
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """ Handler of the requests to the deployment service, whose manager is an attribute of the server """
+
+    server_version = "IdunDeploymentService"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handles GET requests"""
+        self.__handle(self.__get)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handles POST requests"""
+        self.__handle(self.__post)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Logs the requests to the log of the service"""
+        LOG.debug("Request: " + format, *args)
+
+    def __handle(self, handler):
+        """
+        Runs a request handler, answering errors with the matching status
+        :param handler: Request handler
+        """
+        url = urlparse(self.path)
+        path = [part for part in url.path.split('/') if part]
+        try:
+            handler(path, parse_qs(url.query))
+        except errors.ServiceNotFoundError as exception:
+            self.__send_json(404, {'error': str(exception)})
+        except errors.ServiceRequestError as exception:
+            self.__send_json(400, {'error': str(exception)})
+        except Exception as exception:
+            LOG.error("Request {0} {1} failed".format(self.command, self.path), exc_info=True)
+            self.__send_json(500, {'error': str(exception)})
+
+    def __get(self, path, query):
+        """
+        Handles GET requests
+        :param path: Parts of the path
+        :param query: Query parameters
+        """
+        manager = self.server.manager
+        if path == ['health']:
+            self.__send_json(200, {'status': 'ok', 'running_jobs': manager.get_running_jobs()})
+        elif path == ['environments']:
+            self.__send_json(200, manager.get_environments())
+        elif path == ['jobs']:
+            self.__send_json(200, manager.queue.list(environment=query.get('environment', [None])[0]))
+        elif len(path) == 2 and path[0] == 'jobs':
+            self.__send_json(200, manager.get_job(_parse_job_id(path[1])))
+        elif len(path) == 3 and path[0] == 'jobs' and path[2] == 'log':
+            self.__send_log(_parse_job_id(path[1]), _parse_offset(query.get('offset', ['0'])[0]),
+                            query.get('follow', ['0'])[0] in ['1', 'true', 'yes'])
+        else:
+            raise errors.ServiceNotFoundError("Path {0} not found".format(self.path))
+
+    def __post(self, path, _query):
+        """
+        Handles POST requests
+        :param path: Parts of the path
+        :param _query: Query parameters
+        """
+        if path != ['jobs']:
+            raise errors.ServiceNotFoundError("Path {0} not found".format(self.path))
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError as exception:
+            raise errors.ServiceRequestError("The body of the request is not valid JSON: {0}".format(exception))
+        if not isinstance(body, dict) or not body.get('environment') or not body.get('command'):
+            raise errors.ServiceRequestError("A job needs an environment and a command")
+        job = self.server.manager.submit_job(body['environment'], body['command'], body.get('options'))
+        self.__send_json(202, job)
+
+    def __send_log(self, job_id, offset, follow):
+        """
+        Sends the log of a job from an offset, and what it appends until the job finishes when followed
+        :param job_id: ID of the job
+        :param offset: Offset in bytes in the log file
+        :param follow: Streams the log until the job finishes
+        """
+        manager = self.server.manager
+        job = manager.get_job(job_id)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.end_headers()
+        while True:
+            # The status is read before the log, so that the lines of a finished job are all sent
+            job = manager.get_job(job_id)
+            log_path = manager.get_job_log_path(job)
+            if log_path is not None and os.path.exists(log_path):
+                with open(log_path, 'rb') as log_file:
+                    log_file.seek(offset)
+                    chunk = log_file.read()
+                if chunk:
+                    try:
+                        self.wfile.write(chunk)
+                        self.wfile.flush()
+                    except (BrokenPipeError, ConnectionResetError):
+                        LOG.debug("Client following the log of job {0} disconnected".format(job_id))
+                        return
+                    offset += len(chunk)
+            if not follow or job['status'] in jobqueue.FINISHED_STATES:
+                break
+            clock.get_clock().sleep(constants.SERVICE_POLL_INTERVAL)
+
+    def __send_json(self, status, body):
+        """
+        Sends a JSON response
+        :param status: HTTP status
+        :param body: Body of the response
+        """
+        content = json.dumps(body, indent=2).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def _parse_job_id(value):
+    """
+    :param value: Job ID from the path of a request
+    :return: Job ID
+    """
+    try:
+        return int(value)
+    except ValueError as exception:
+        raise errors.ServiceNotFoundError("Job {0} not found".format(value)) from exception
+
+
+def _parse_offset(value):
+    """
+    :param value: Offset in the log from the query of a request
+    :return: Offset in bytes
+    """
+    try:
+        offset = int(value)
+    except ValueError:
+        offset = -1
+    if offset < 0:
+        raise errors.ServiceRequestError("The offset {0} is not a number of bytes".format(value))
+    return offset
+
+
+class ServiceHTTPServer(ThreadingHTTPServer):
+    """ HTTP server of the service on TCP, handling each request in a thread """
+
+    def __init__(self, server_address, manager):
+        """
+        :param server_address: Host and port
+        :param manager: Service manager
+        """
+        self.manager = manager
+        super().__init__(server_address, ServiceRequestHandler)
+
+
+class ServiceUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """ HTTP server of the service on a Unix socket, handling each request in a thread """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, manager):
+        """
+        :param socket_path: Path of the Unix socket
+        :param manager: Service manager
+        """
+        self.manager = manager
+        super().__init__(socket_path, ServiceRequestHandler)
+
+    def get_request(self):
+        """Gives the clients of the Unix socket an address, which the request handler expects"""
+        request, _ = super().get_request()
+        return request, ('unix', 0)
+
+
+def create_server(manager, host=constants.SERVICE_HOST, port=constants.SERVICE_PORT, socket_path=None):
+    """
+    Creates the HTTP server of the service
+    :param manager: Service manager
+    :param host: Host of the TCP server
+    :param port: Port of the TCP server, a free port if 0
+    :param socket_path: Path of the Unix socket, used instead of the TCP server if set
+    :return: HTTP server
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        return ServiceUnixHTTPServer(str(socket_path), manager)
+    return ServiceHTTPServer((host, port), manager)
@@ -3,16 +3,17 @@ This module implements Upgrade command
 """
 
 import logging
-import re
-import time
 
 from packaging.version import Version
+from aws_deployment_manager import addons
+from aws_deployment_manager import aio
 from aws_deployment_manager import utils
 from aws_deployment_manager import constants
+from aws_deployment_manager import helmrunner
+from aws_deployment_manager import timing
 from aws_deployment_manager.commands.base import Base
 
 LOG = logging.getLogger(__name__)
-IMAGE_VERSION_PATTERN = r"\d+\.\d+\.\d+"
 
 
 class UpgradeManager(Base):
@@ -61,21 +62,14 @@ class UpgradeManager(Base):
             # Invoke Cloudformation Stack Update for IDUN_Infra_Additional
             self.create_or_update_idun_additional_stack()
 
-        # Invoke Cloudformation Stack Update for Stack Create for ALB Controller
         self.outputs = self.get_idun_stack_outputs()  # get the new values after stack update
-        self.create_or_update_alb_controller_stack()
-
-        # Update the AWS ALB Controller
-        self._update_aws_lb_controller()
 
+        # Update the AWS ALB Controller and the EBS CSI Controller, which touch disjoint namespaces and resources,
+        # concurrently with the Add Ons
+        operations = [helmrunner.HelmOperation(constants.HELM_CHART_ALB_CONTROLLER, self._update_aws_lb_controller)]
         if Version(self.k8sversion) > Version('1.22'):
-            # CUpdate IDUN CSI Controller Stack
-            self.create_or_update_csi_controller_stack()
-            # Deploy EBS CSI Controller
-            self.deploy_ebs_csi_controller()
-
-        # Update Add Ons
-        self._update_addons()
+            operations.append(helmrunner.HelmOperation(constants.HELM_CHART_CSI_DRIVER, self._update_csi_controller))
+        aio.run(aio.gather(aio.call(helmrunner.run, operations), self._update_addons()))
 
         # Update the kube-downscaler
         if upgrade_kube_downscaler:
@@ -189,59 +183,29 @@ class UpgradeManager(Base):
         """
         Upgrade AWS LB controller using Helm.
         """
+        # Invoke Cloudformation Stack Update for Stack Create for ALB Controller
+        self.create_or_update_alb_controller_stack()
 
         command=constants.COMMAND_INSTALL_TGB_CRD.format(constants.KUBECONFIG_PATH)
         utils.execute_command(command=command)
 
         self.install_or_upgrade_aws_lb_controller()
 
-    def _update_addons(self):
-        """ Update Add Ons """
-        ## The following line seems not used anywhere in this function. Can be deleted
-        # eks_versions_template = os.path.join(constants.TEMPLATES_DIR, constants.TEMPLATE_EKS_VERSIONS)
-        # eks_versions = utils.load_config(config_path=eks_versions_template)
-
-        # Update Kube Proxy Add On
-        command = constants.COMMAND_GET_KUBE_PROXY_IMAGE + " --kubeconfig " + constants.KUBECONFIG_PATH
-        kube_proxy_image, changed = _get_addon_image(name=constants.KUBE_PROXY,
-                                                        command=command,
-                                                        target_version=self.kube_proxy_version)
-        if changed:
-            LOG.info("Updating Kube Proxy...")
-            command = constants.COMMAND_SET_KUBE_PROXY_IMAGE.format(kube_proxy_image, constants.KUBECONFIG_PATH)
-            utils.execute_command(command=command)
-            LOG.info("Updated Kube Proxy")
-        else:
-            LOG.info("No change in image version of Kube proxy")
-
-        # Update Core DNS Add On
-        command = constants.COMMAND_GET_CORD_DNS_IMAGE + " --kubeconfig " + constants.KUBECONFIG_PATH
-        core_dns_image, changed = _get_addon_image(name=constants.CORE_DNS,
-                                                      command=command,
-                                                      target_version=self.core_dns_version)
-        if changed:
-            LOG.info("Updating Core DNS...")
-            command = constants.COMMAND_SET_CORE_DNS_IMAGE.format(core_dns_image, constants.KUBECONFIG_PATH)
-            utils.execute_command(command=command)
-            LOG.info("Updated Core DNS")
-        else:
-            LOG.info("No change in image version of Core DNS")
-
-        # Update Cluster Auto Scaler
-        command = constants.COMMAND_GET_AUTO_SCALER_IMAGE + " --kubeconfig " + constants.KUBECONFIG_PATH
-        auto_scaler_image, changed = _get_addon_image(name=constants.AUTO_SCALER,
-                                                         command=command,
-                                                         target_version=self.auto_scaler_version)
-        if changed:
-            LOG.info("Updating Cluster Auto Scaler...")
-            command = constants.COMMAND_SET_AUTO_SCALER_IMAGE.format(auto_scaler_image, constants.KUBECONFIG_PATH)
-            utils.execute_command(command=command)
-            LOG.info("Updated Auto Scaler")
-        else:
-            LOG.info("No change in image version for Cluster Auto Scaler")
-
-        # Update CNI Plugin Version
-        self.update_cni_plugin()
+    def _update_csi_controller(self):
+        """
+        Upgrade AWS EBS CSI Controller using Helm.
+        """
+        # Update IDUN CSI Controller Stack
+        self.create_or_update_csi_controller_stack()
+        # Deploy EBS CSI Controller
+        self.deploy_ebs_csi_controller()
+
+    async def _update_addons(self):
+        """ Update Add Ons, waiting for their rollouts, concurrently with the CNI Plugin """
+        add_ons = addons.get_add_ons(kube_proxy_version=self.kube_proxy_version,
+                                     core_dns_version=self.core_dns_version,
+                                     auto_scaler_version=self.auto_scaler_version)
+        await aio.gather(addons.update(add_ons, constants.KUBECONFIG_PATH), aio.call(self.update_cni_plugin))
 
     def _update_node_groups(self):
         """ Update Node Groups to new K8S version """
@@ -274,7 +238,7 @@ class UpgradeManager(Base):
             LOG.info("Draining node {0}".format(node))
             utils.drain_node(node_name=node, kubeconfig_path=constants.KUBECONFIG_PATH)
             LOG.info("Waiting 1 min before starting next drain...")
-            time.sleep(60)
+            timing.sleep(60, reason="wait between node drains")
         LOG.info("All nodes drained")
 
         # Wait for all PODs to come up properly
@@ -284,24 +248,3 @@ class UpgradeManager(Base):
             LOG.info("All PODS up and running")
         else:
             raise Exception("Few PODs have not come up properly")
-
-
-def _get_addon_image(name, command, target_version):
-    """
-    Get new image name for Add On
-    :param name: Name of Add On
-    :param command: Command to get current Image of Add On
-    :param target_version: Target Version of Image
-    :return: New Image URL
-    """
-    LOG.info("Getting image for add on {0}".format(name))
-    current_image = utils.execute_command(command=command)
-    LOG.info("Current Image = {0}".format(current_image))
-
-    target_image = re.sub(IMAGE_VERSION_PATTERN, target_version, current_image)
-    LOG.info("Target Image = {0}".format(target_image))
-
-    if current_image != target_image:
-        return target_image, True
-
-    return target_image, False
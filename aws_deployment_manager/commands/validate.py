@@ -16,6 +16,7 @@ class ValidateManager:
     def validate_config(self):
         """
         Validate the IDUN Configuration File
+        :return: True if the configuration is valid
         """
         LOG.info("Starting Config Validation...")
         configuration_valid, validation_errors = utils.validate_idun_config(config=self.__config)
@@ -28,3 +29,4 @@ class ValidateManager:
         else:
             LOG.info("Configuration File valid. 0 errors found")
         LOG.info("================================================================================================")
+        return configuration_valid
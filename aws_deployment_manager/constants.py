@@ -31,6 +31,7 @@ ARMDOCKER_USER = "Armdockeruser"
 ARMDOCKER_PASS = "Armdockerpass"
 NAMESPACE_K8S_DASHBOARD = "kubernetes-dashboard"
 NAMESPACE_NGINX = "ingress-nginx"
+NGINX_CONTROLLER_NAME = "ingress-nginx-controller"
 NAMESPACE_KUBE_SYSTEM = "kube-system"
 KUBE_DOWNSCALER = "KubeDownscaler"
 K8S_VERSION = "K8SVersion"
@@ -121,12 +122,39 @@ EC2_SERVICE = 'ec2'
 IAM_SERVICE = 'iam'
 ASG_SERVICE = "autoscaling"
 
+# AWS Clients
+AWS_MAX_POOL_CONNECTIONS = 32
+AWS_MAX_ATTEMPTS = 5
+AWS_RETRY_MODE = "adaptive"
+# Threads of the asyncio core running blocking AWS calls, within the connection pool of the clients
+AIO_MAX_WORKERS = 16
+
+# Fleet
+FLEET_COMMANDS = ["validate", "upgrade", "image-push", "delete"]
+# Maximum number of environments processed at the same time, in total and per region
+FLEET_MAX_WORKERS = 8
+FLEET_MAX_ENVIRONMENTS_PER_REGION = 2
+FLEET_RESULTS_FILE_POSTFIX = "_results.json"
+
+# Service
+SERVICE_COMMANDS = ["validate", "install", "configure", "upgrade", "rollback", "cleanup", "update", "image-push",
+                    "delete"]
+SERVICE_DATABASE_NAME = ".service_jobs.db"
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8080
+# Maximum number of environments running a job at the same time
+SERVICE_MAX_ENVIRONMENTS = 8
+# Seconds between checks of the queue, and of the log of a followed job
+SERVICE_POLL_INTERVAL = 1
+
 # General
 MONITORING_HOST = "MONITORING_HOST"
 NODEGROUP_NAME = "{0}-Node-Group-{1}-{2}"
 AMI_TYPE = "AL2_x86_64"
 ARMDOCKER_SECRET_NAME = "armdockersecret"
 ARMDOCKER_REGISTRY_URL = "armdocker.seli.gic.ericsson.se"
+ARMDOCKER_USERNAME_ENV_VAR = "ARMDOCKER_USERNAME"
+ARMDOCKER_PASSWORD_ENV_VAR = "ARMDOCKER_PASSWORD"
 CLUSTER_NAME_POSTFIX = "-EKS-Cluster"
 ELB_ARN = "arn:aws:elasticloadbalancing:{0}:{1}:loadbalancer/net/{2}"
 EKS_ROLE_ARN = "eks.amazonaws.com/role-arn=arn:aws:iam::{0}:role/{1}-AmazonEKSLoadBalancerControllerRole"
@@ -160,8 +188,10 @@ COMMAND_DELETE_STORAGECLASS = "kubectl delete storageclass {0} --kubeconfig {1}"
 COMMAND_CLUSTER_AUTOSCALER_SAFE_TO_EVICT = "kubectl -n kube-system annotate deployment.apps/cluster-autoscaler " \
                                            "cluster-autoscaler.kubernetes.io/safe-to-evict=\"false\" --overwrite " \
                                            "--kubeconfig {0}"
-COMMAND_GET_INGRESS_CONTROLLER_EXTERNAL_IP = "kubectl get svc -n ingress-nginx ingress-nginx-controller --output json" \
-                                             " --kubeconfig {0}"
+COMMAND_GET_API_SERVER_READY = "kubectl get --raw /readyz --kubeconfig {0}"
+COMMAND_GET_DEPLOYMENT_JSON = "kubectl get deployment {0} -n {1} --output json --kubeconfig {2}"
+COMMAND_GET_SERVICE_JSON = "kubectl get svc {0} -n {1} --output json --kubeconfig {2}"
+COMMAND_GET_WORKLOAD_JSON = "kubectl get {0} {1} -n {2} --output json --kubeconfig {3}"
 COMMAND_GET_NAMESPACES = "kubectl get namespace --kubeconfig {0}"
 COMMAND_GET_PVCS = "kubectl get pvc -n {0} --kubeconfig {1}"
 COMMAND_GET_HELM_DEPLOYMENTS = "helm ls -A --kubeconfig {0}"
@@ -180,8 +210,12 @@ COMMAND_DELETE_AUTOSCALER = "kubectl delete deployment.apps/cluster-autoscaler -
 COMMAND_GET_AUTOSCALER = "kubectl get deployment -l app=cluster-autoscaler -n kube-system --kubeconfig {0}"
 COMMAND_GET_DOWNSCALER = "kubectl get deployment -l application=kube-downscaler -n kube-system --kubeconfig {0}"
 COMMAND_DELETE_DOWNSCALER = "kubectl delete deployment.apps/kube-downscaler -n kube-system --kubeconfig {0}"
-COMMAND_GET_FINGERPRINT = "openssl x509 -in {0} -fingerprint -noout"
-COMMAND_GET_CERTIFICATE = "echo -n |openssl s_client -servername {0} -showcerts -connect {1}:443"
+COMMAND_GET_CERTIFICATE = "echo -n |openssl s_client -servername {0} -showcerts -connect {0}:{1}"
+
+# OIDC Identity Provider Thumbprint
+OIDC_CONFIGURATION_PATH = "/.well-known/openid-configuration"
+# Seconds to connect to the OIDC issuer and to the host of its JSON Web Key Set
+TLS_CONNECT_TIMEOUT = 10
 
 # IDUN Master Stack Output
 PRIVATE_SUBNET_IDS = "PrivateSubnetIds"
@@ -217,9 +251,13 @@ AUTOSCALER_IAM_POLICY = "{0}-AutoscalerPolicy"
 STAGE_STARTED = "started"
 STAGE_FINISHED = "finished"
 VALID_STATES = ["started", "finished"]
+# Maximum number of stages running at the same time
+STAGE_MAX_WORKERS = 4
 
 # Install Stages
 INSTALL_STAGE_LOG_PATH = "/workdir/.install_stage.log"
+IMAGE_INVENTORY_PATH = "/workdir/.image_inventory.json"
+IMAGE_INVENTORY_VERSION = 1
 INSTALL_STAGE_APPLY_EKS_TAGS = "install.apply.eks.tags"
 INSTALL_STAGE_CREATE_BASE_VPC_STACK = "install.create.vpc.stack"
 INSTALL_STAGE_CREATE_BASE_ADD_STACK = "install.create.additional.stack"
@@ -242,6 +280,11 @@ INSTALL_STAGE_DEPLOY_EBS_CSI_CONTROLLER = "install.deploy.csi.controller"
 INSTALL_STAGE_SETUP_NGINX_CONTROLLER = "install.setup.nginx.controller"
 INSTALL_STAGE_SETUP_HOSTED_ZONE = "install.setup.hosted.zone"
 
+# Install steps which always run, not recorded in the stage log
+INSTALL_STEP_GET_IDUN_OUTPUTS = "install.get.idun.outputs"
+INSTALL_STEP_GENERATE_KUBECONFIG = "install.generate.kubeconfig"
+INSTALL_STEP_SETUP_NAMESPACE = "install.setup.namespace.{0}"
+
 
 # Configure Stages
 CONFIGURE_STAGE_DEPLOY_NGINX_CONTROLLER = "configure.deploy.nginx.controller"
@@ -259,20 +302,12 @@ CORE_DNS = "CoreDNS"
 CNI_PLUGIN = "CNIPlugin"
 AUTO_SCALER = "AutoScaler"
 AWS_LB_CONTROLLER = "AWSLbController"
+AWS_LB_CONTROLLER_CHART = "AWSLbControllerChart"
 NODE_GROUPS_SECRET = "nodegroupssecret"
 COMMAND_GET_UNHEALTHY_PODS = "kubectl get pod -A --kubeconfig {0} | grep -v -e Run -e Compl -e Succ"
-COMMAND_GET_KUBE_PROXY_IMAGE = "kubectl get daemonset kube-proxy --namespace kube-system " \
-                               "-o=jsonpath='{$.spec.template.spec.containers[:1].image}'"
-COMMAND_SET_KUBE_PROXY_IMAGE = "kubectl set image daemonset.apps/kube-proxy -n kube-system kube-proxy={0} " \
-                               "--kubeconfig {1}"
-COMMAND_GET_CORD_DNS_IMAGE = "kubectl get deployment coredns --namespace kube-system " \
-                             "-o=jsonpath='{$.spec.template.spec.containers[:1].image}'"
-COMMAND_SET_CORE_DNS_IMAGE = "kubectl set image --namespace kube-system deployment.apps/coredns coredns={0} " \
-                             "--kubeconfig {1}"
-COMMAND_GET_AUTO_SCALER_IMAGE = "kubectl get deployment cluster-autoscaler --namespace kube-system " \
-                                "-o=jsonpath='{$.spec.template.spec.containers[:1].image}'"
-COMMAND_SET_AUTO_SCALER_IMAGE = "kubectl set image --namespace kube-system deployment.apps/cluster-autoscaler " \
-                                "cluster-autoscaler={0} --kubeconfig {1}"
+# Workloads of the add ons read at once, as kind/name, and image of one of their containers
+COMMAND_GET_ADD_ON_WORKLOADS = "kubectl get {0} --namespace kube-system --output json --kubeconfig {1}"
+COMMAND_SET_ADD_ON_IMAGE = "kubectl set image {0}/{1} {2}={3} --namespace kube-system --kubeconfig {4}"
 COMMAND_GET_NODES = "kubectl get no --kubeconfig {0}"
 COMMAND_CORDON_NODE = "kubectl cordon {0} --kubeconfig {1}"
 COMMAND_UNCORDON_NODE = "kubectl uncordon {0} --kubeconfig {1}"
@@ -292,35 +327,52 @@ COMMAND_STOP_CLUSTER_AUTOSCALER = "kubectl scale deploy cluster-autoscaler --rep
 COMMAND_START_CLUSTER_AUTOSCALER = "kubectl scale deploy cluster-autoscaler --replicas=1 -n kube-system " \
                                    "--kubeconfig {0}"
 
-# AWS EBS CSI Driver Setup
-CSI_HELM_REPO_ADD = \
-    "helm repo add aws-ebs-csi-driver https://kubernetes-sigs.github.io/aws-ebs-csi-driver"
+# Helm charts, pinned and installed from the archives of the chart caches
+HELM_CHART_ALB_CONTROLLER = "aws-load-balancer-controller"
+HELM_CHART_CSI_DRIVER = "aws-ebs-csi-driver"
+HELM_CHART_PROMETHEUS = "prometheus"
+HELM_CHART_REPOSITORIES = {
+    HELM_CHART_ALB_CONTROLLER: "https://aws.github.io/eks-charts",
+    HELM_CHART_CSI_DRIVER: "https://kubernetes-sigs.github.io/aws-ebs-csi-driver",
+    HELM_CHART_PROMETHEUS: "https://prometheus-community.github.io/helm-charts"
+}
+# The version of the AWS Load Balancer Controller chart follows the Kubernetes version, see eks_versions.yaml
+CSI_DRIVER_CHART_VERSION = "2.19.0"
+PROMETHEUS_CHART_VERSION = "18.1.1"
+# Charts cached in the image at build time, then pulled ones cached in the workdir
+HELM_CHART_IMAGE_CACHE_DIR = "/idun/charts"
+HELM_CHART_CACHE_DIR = "/workdir/.helm_charts"
+COMMAND_HELM_PULL = "helm pull {0} --repo {1} --version {2} --destination {3}"
+# Releases upgraded by the commands record the digest of their chart and values in their description
+COMMAND_HELM_STATUS = "helm status {0} --namespace {1} --output json --kubeconfig {2}"
+HELM_RELEASE_DIGEST_DESCRIPTION = "idun-release-digest={0}"
+# Helm processes of concurrent releases each use a HELM_CACHE_HOME of their release under this directory
+HELM_CACHE_DIR = "/workdir/.helm_cache"
+# Maximum number of Helm release operations running at the same time
+HELM_MAX_WORKERS = 4
 
+# AWS EBS CSI Driver Setup
 CSI_HELM_COMMAND = \
     "helm --namespace kube-system " \
     "{0} " \
-    "aws-ebs-csi-driver aws-ebs-csi-driver/aws-ebs-csi-driver --version='2.19.0' "
-CSI_HELM_TEMPLATE = CSI_HELM_COMMAND.format("template ") + "--values {0}"
-CSI_HELM_UPGRADE_INSTALL = CSI_HELM_COMMAND.format("upgrade --install") + "--values {0} --kubeconfig {1}"
+    "aws-ebs-csi-driver "
+CSI_HELM_TEMPLATE = CSI_HELM_COMMAND.format("template") + "{1} --values {0}"
+CSI_HELM_UPGRADE_INSTALL = CSI_HELM_COMMAND.format("upgrade --install") + "{2} --values {0} --kubeconfig {1} " \
+                                                                         "--description {3}"
 
 # Prometheus and Grafana Setup
 PROM_NAMESPACE='prometheus'
-COMMAND_PROMETHEUS_HELM_REPO_ADD = \
-    "helm repo add prometheus-community https://prometheus-community.github.io/helm-charts "
-COMMAND_PROMETHEUS_REPO_ADD = COMMAND_PROMETHEUS_HELM_REPO_ADD + "--kubeconfig {0}"
 COMMAND_GRAFANA_REPO_ADD = "helm repo add grafana https://grafana.github.io/helm-charts --kubeconfig {0}"
-COMMAND_GET_PROMETHEUS_TEMPLATE = "helm --namespace " + PROM_NAMESPACE + " template prometheus prometheus-community/prometheus " \
-                                  " --version='18.1.1' --values {0}"
-COMMAND_INSTALL_PROMETHEUS = "helm install prometheus prometheus-community/prometheus --namespace " + PROM_NAMESPACE + " " \
-                             " --values {0} --kubeconfig {1} --version='18.1.1'"
+COMMAND_GET_PROMETHEUS_TEMPLATE = "helm --namespace " + PROM_NAMESPACE + " template prometheus {1} --values {0}"
+COMMAND_INSTALL_PROMETHEUS = "helm install prometheus {2} --namespace " + PROM_NAMESPACE + " " \
+                             "--values {0} --kubeconfig {1}"
 
 # Calico CNI Setup
 COMMAND_INSTALL_CALICO = "kubectl apply --kubeconfig {0} -f {1}"
 
 #AWS Loadbalancer controller setup
-COMMAND_ALB_CONTROLLER_REPO_ADD = "helm repo add eks https://aws.github.io/eks-charts"
 COMMAND_INSTALL_ALB_CONTROLLER = \
-    "helm upgrade --install aws-load-balancer-controller eks/aws-load-balancer-controller " \
+    "helm upgrade --install aws-load-balancer-controller {4} " \
                                  "-n kube-system " \
                                  "--set clusterName={0} " \
                                  "--set serviceAccount.create=false " \
@@ -328,13 +380,24 @@ COMMAND_INSTALL_ALB_CONTROLLER = \
                                  "--set image.repository=602401143452.dkr.ecr.{" \
                                  "1}.amazonaws.com/amazon/aws-load-balancer-controller " \
                                  "--set image.tag={2} " \
-                                 "--kubeconfig {3}"
+                                 "--kubeconfig {3} " \
+                                 "--description {5}"
 COMMAND_UPGRADE_ALB_CONTROLLER=COMMAND_INSTALL_ALB_CONTROLLER
 COMMAND_INSTALL_TGB_CRD = 'kubectl --kubeconfig {0} apply -k ' \
                           '"github.com/aws/eks-charts/stable/aws-load-balancer-controller/crds?ref=master" '
 # COMMAND_INSTALL_TGB_CRD to install the TargetGroupBinding custom resource definitions:
 #     https://docs.aws.amazon.com/eks/latest/userguide/aws-load-balancer-controller.html
 
+# VPC CNI Plugin manifest
+CNI_PLUGIN_SHA256 = "CNIPluginSha256"
+CNI_MANIFEST_URL = "https://raw.githubusercontent.com/aws/amazon-vpc-cni-k8s/v{0}/config/master/aws-k8s-cni.yaml"
+CNI_MANIFEST_NAME = "aws-k8s-cni.yaml"
+# Region of the ECR registry of the images in the published manifest
+CNI_MANIFEST_REGION = "us-west-2"
+# Manifests cached in the image at build time, then downloaded ones cached in the workdir
+CNI_MANIFEST_IMAGE_CACHE_DIR = "/idun/cni-manifests"
+CNI_MANIFEST_CACHE_DIR = "/workdir/.cni_manifests"
+
 # Registry
 ARMDOCKER_RND="armdocker.rnd.ericsson.se"
 ARMDOCKER_GIC="armdocker.seli.gic.ericsson.se"
@@ -343,5 +406,29 @@ QUAY_REGISTRY="quay.io"
 DKRHUB_REGISTRY="docker.io"
 K8SGCR_REGISTRY="k8s.gcr.io"
 
+# ECR repository provisioning
+ECR_SERVICE = "ecr"
+ECR_MAX_WORKERS = 8
+ECR_SCAN_ON_PUSH = True
+ECR_UNTAGGED_IMAGES_EXPIRY_DAYS = 14
+ECR_LIFECYCLE_POLICY = {
+    "rules": [
+        {
+            "rulePriority": 1,
+            "description": "Expire untagged images",
+            "selection": {
+                "tagStatus": "untagged",
+                "countType": "sinceImagePushed",
+                "countUnit": "days",
+                "countNumber": ECR_UNTAGGED_IMAGES_EXPIRY_DAYS
+            },
+            "action": {"type": "expire"}
+        }
+    ]
+}
+
+# Profiling of the CLI commands
+PROFILE_ENV_VAR = "AWS_DEPLOYMENT_MANAGER_PROFILE"
+
 # Fix for test because LocalStack does not fully support EKS (cannot generate proper OIDC)
 DUMMY_REPLACEMENT='DUMMY1111111CLUSTER111111111OIDC'
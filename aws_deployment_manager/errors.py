@@ -23,3 +23,23 @@ class KubectlFailedError(Error):
 
 class AWSError(Error):
     """Exception raised when a kubectl command fails."""
+
+
+class ServiceError(Error):
+    """The base class for exceptions in the deployment service."""
+
+
+class ServiceNotFoundError(ServiceError):
+    """Exception raised when a job or an environment of the deployment service is not found."""
+
+
+class ServiceRequestError(ServiceError):
+    """Exception raised when a request to the deployment service is not valid."""
+
+
+class WaitTimeoutError(Error):
+    """Exception raised when a waiter gives up before the state it waits for is final."""
+
+    def __init__(self, message, state=None):
+        super().__init__(message)
+        self.state = state
@@ -0,0 +1,117 @@
+"""
+This module implements the content-addressed file caches of the artifacts downloaded by the commands,
+e.g. the VPC CNI manifests and the Helm charts.
+Files are stored under the SHA-256 of their content, with an index from their key to the digest, and are
+checked against their digest when looked up. Files and index are replaced atomically, so that processes
+sharing a cache never read a partially written file. The index is updated under a lock, against the threads
+of the process and against other processes, so that concurrent stores do not lose each other's entries.
+"""
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+
+LOG = logging.getLogger(__name__)
+
+INDEX_FILE_NAME = "index.json"
+INDEX_LOCK_FILE_NAME = "index.lock"
+
+_LOCK = threading.Lock()
+
+
+def get_digest(content):
+    """
+    :param content: Content, as bytes
+    :return: SHA-256 hex digest
+    """
+    return hashlib.sha256(content).hexdigest()
+
+
+def get_file_path(cache_dir, digest, suffix):
+    """
+    :param cache_dir: Cache directory
+    :param digest: SHA-256 of the file
+    :param suffix: Suffix of the file, e.g. its extension
+    :return: Path of the file in the cache
+    """
+    return os.path.join(cache_dir, digest + suffix)
+
+
+def _load_index(cache_dir):
+    """
+    :param cache_dir: Cache directory
+    :return: Digests of the cached files by key, empty if the index is missing or corrupted
+    """
+    try:
+        with open(os.path.join(cache_dir, INDEX_FILE_NAME), 'r') as index_file:
+            return json.load(index_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_atomically(path, content):
+    """
+    Writes a file through a temporary file, so that readers never see it partially written
+    :param path: Path of the file
+    :param content: Content, as bytes
+    """
+    tmp_path = "{0}.{1}.{2}.tmp".format(path, os.getpid(), threading.get_ident())
+    with open(tmp_path, 'wb') as tmp_file:
+        tmp_file.write(content)
+    os.replace(tmp_path, path)
+
+
+def lookup(cache_dir, key, suffix, expected_digest=None):
+    """
+    Looks a file up in a cache
+    :param cache_dir: Cache directory
+    :param key: Key of the file, e.g. a version
+    :param suffix: Suffix of the file, e.g. its extension
+    :param expected_digest: SHA-256 pinned for the key, if any
+    :return: Path of the file, or None if it is not cached or does not match its digest
+    """
+    digest = _load_index(cache_dir).get(key)
+    if digest is None:
+        return None
+    if expected_digest is not None and digest != expected_digest:
+        LOG.warning("{0} cached in {1} is not the pinned one".format(key, cache_dir))
+        return None
+    path = get_file_path(cache_dir, digest, suffix)
+    try:
+        with open(path, 'rb') as cached_file:
+            content = cached_file.read()
+    except OSError:
+        return None
+    if get_digest(content) != digest:
+        LOG.warning("{0} cached in {1} is corrupted".format(key, cache_dir))
+        return None
+    return path
+
+
+def store(cache_dir, key, content, suffix):
+    """
+    Stores a file in a cache
+    :param cache_dir: Cache directory
+    :param key: Key of the file, e.g. a version
+    :param content: Content, as bytes
+    :param suffix: Suffix of the file, e.g. its extension
+    :return: SHA-256 of the file
+    """
+    digest = get_digest(content)
+    os.makedirs(cache_dir, exist_ok=True)
+    _write_atomically(get_file_path(cache_dir, digest, suffix), content)
+    with _LOCK:
+        with open(os.path.join(cache_dir, INDEX_LOCK_FILE_NAME), "a") as lock_file:
+            # Lock against other processes, then read, update and replace the index
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                index = _load_index(cache_dir)
+                index[key] = digest
+                _write_atomically(os.path.join(cache_dir, INDEX_FILE_NAME),
+                                  json.dumps(index, indent=2, sort_keys=True).encode())
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    return digest
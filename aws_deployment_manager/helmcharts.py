@@ -0,0 +1,107 @@
+"""
+This module vendors the Helm charts of the components installed by the commands.
+Charts are pinned to a version and their archives are kept in content-addressed file caches: the cache built
+into the image is looked up before the cache of the workdir, which receives the charts pulled on a miss.
+The commands install, upgrade and render the local archives, so repositories are never added and their index
+is only downloaded when a pinned version is not cached yet.
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+from aws_deployment_manager import constants
+from aws_deployment_manager import filecache
+from aws_deployment_manager import helmrunner
+from aws_deployment_manager import utils
+
+LOG = logging.getLogger(__name__)
+
+CHART_SUFFIX = ".tgz"
+
+
+def get_chart_key(name, version):
+    """
+    :param name: Name of the chart
+    :param version: Version of the chart
+    :return: Key of the chart in the caches, the name of the archive pulled by helm without its extension
+    """
+    return "{0}-{1}".format(name, version)
+
+
+def pull(name, version):
+    """
+    Pulls the archive of a chart from its repository
+    :param name: Name of the chart, one of constants.HELM_CHART_REPOSITORIES
+    :param version: Version of the chart
+    :return: Archive, as bytes
+    """
+    destination = tempfile.mkdtemp(dir=constants.TEMPORARY_DIR)
+    try:
+        command = constants.COMMAND_HELM_PULL.format(name, constants.HELM_CHART_REPOSITORIES[name], version,
+                                                     destination)
+        helmrunner.execute_command(command=command)
+        with open(os.path.join(destination, get_chart_key(name, version) + CHART_SUFFIX), 'rb') as archive:
+            return archive.read()
+    finally:
+        shutil.rmtree(destination, ignore_errors=True)
+
+
+def get_chart(name, version):
+    """
+    Gets the archive of a chart from the caches, pulling it on a miss
+    :param name: Name of the chart, one of constants.HELM_CHART_REPOSITORIES
+    :param version: Version of the chart
+    :return: Path of the archive, to be installed or rendered by helm
+    """
+    key = get_chart_key(name, version)
+    for cache_dir in [constants.HELM_CHART_IMAGE_CACHE_DIR, constants.HELM_CHART_CACHE_DIR]:
+        path = filecache.lookup(cache_dir, key, CHART_SUFFIX)
+        if path is not None:
+            LOG.info("Helm chart {0} taken from cache {1}".format(key, cache_dir))
+            return path
+
+    LOG.info("Helm chart {0} is not cached, pulling it".format(key))
+    content = pull(name, version)
+    try:
+        digest = filecache.store(constants.HELM_CHART_CACHE_DIR, key, content, CHART_SUFFIX)
+        return filecache.get_file_path(constants.HELM_CHART_CACHE_DIR, digest, CHART_SUFFIX)
+    except OSError as exception:
+        LOG.warning("Failed to cache Helm chart {0}: {1}".format(key, exception))
+    path = os.path.join(constants.TEMPORARY_DIR, key + CHART_SUFFIX)
+    with open(path, 'wb') as archive:
+        archive.write(content)
+    return path
+
+
+def get_pinned_charts(eks_versions_path=None):
+    """
+    :param eks_versions_path: Path of the EKS versions template, the one of the templates directory if None
+    :return: Names and versions of the charts of all the supported Kubernetes versions
+    """
+    eks_versions_path = eks_versions_path or os.path.join(constants.TEMPLATES_DIR, constants.TEMPLATE_EKS_VERSIONS)
+    eks_versions = utils.load_yaml(file_path=eks_versions_path)
+    charts = [(constants.HELM_CHART_CSI_DRIVER, constants.CSI_DRIVER_CHART_VERSION),
+              (constants.HELM_CHART_PROMETHEUS, constants.PROMETHEUS_CHART_VERSION)]
+    for add_on_versions in eks_versions.values():
+        chart = (constants.HELM_CHART_ALB_CONTROLLER, str(add_on_versions[constants.AWS_LB_CONTROLLER_CHART]))
+        if chart not in charts:
+            charts.append(chart)
+    return charts
+
+
+def prefetch(cache_dir, eks_versions_path=None):
+    """
+    Caches the archives of the charts of all the supported Kubernetes versions, e.g. in the image
+    :param cache_dir: Cache directory
+    :param eks_versions_path: Path of the EKS versions template, the one of the templates directory if None
+    :return: Keys of the charts cached
+    """
+    keys = []
+    for name, version in get_pinned_charts(eks_versions_path):
+        key = get_chart_key(name, version)
+        if filecache.lookup(cache_dir, key, CHART_SUFFIX) is None:
+            filecache.store(cache_dir, key, pull(name, version), CHART_SUFFIX)
+            LOG.info("Cached Helm chart {0} in {1}".format(key, cache_dir))
+        keys.append(key)
+    return keys
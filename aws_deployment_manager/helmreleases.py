@@ -0,0 +1,69 @@
+"""
+This module checks the state of the Helm releases upgraded by the commands, so that upgrades changing nothing
+are skipped instead of rendering, diffing and waiting on the cluster.
+Every upgrade records the digest of the chart archive and of the values of the release in its description.
+A release is up to date when it is deployed with the pinned chart version and the same digest, which is read
+with a single helm status.
+"""
+
+import hashlib
+import json
+import logging
+from aws_deployment_manager import constants
+from aws_deployment_manager import helmrunner
+
+LOG = logging.getLogger(__name__)
+
+
+def get_release_digest(chart, *values):
+    """
+    :param chart: Path of the chart archive
+    :param values: Values of the release, e.g. the content of the rendered values file or the --set values
+    :return: SHA-256 hex digest of the chart archive and of the values
+    """
+    digest = hashlib.sha256()
+    with open(chart, 'rb') as archive:
+        digest.update(archive.read())
+    for value in values:
+        digest.update(b'\0')
+        digest.update(str(value).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def get_description(digest):
+    """
+    :param digest: Digest of the chart and values of a release
+    :return: Description of the release recording the digest
+    """
+    return constants.HELM_RELEASE_DIGEST_DESCRIPTION.format(digest)
+
+
+def get_deployed_release(release, namespace):
+    """
+    :param release: Name of the release
+    :param namespace: Namespace of the release
+    :return: Release as returned by helm status, or None if it is not installed or cannot be read
+    """
+    command = constants.COMMAND_HELM_STATUS.format(release, namespace, constants.KUBECONFIG_PATH)
+    try:
+        return json.loads(helmrunner.execute_command(command=command))
+    except Exception as exception:
+        LOG.info("Release {0} not found in namespace {1}: {2}".format(release, namespace, exception))
+        return None
+
+
+def is_up_to_date(release, namespace, version, digest):
+    """
+    :param release: Name of the release
+    :param namespace: Namespace of the release
+    :param version: Version of the chart to be deployed
+    :param digest: Digest of the chart and values to be deployed, see get_release_digest
+    :return: True if the release is deployed with the same chart version and digest
+    """
+    deployed_release = get_deployed_release(release, namespace)
+    if not isinstance(deployed_release, dict):
+        return False
+    info = deployed_release.get('info', {})
+    deployed_version = deployed_release.get('chart', {}).get('metadata', {}).get('version')
+    return info.get('status') == 'deployed' and deployed_version == str(version) and \
+        info.get('description') == get_description(digest)
@@ -0,0 +1,130 @@
+"""
+This module runs the operations of independent Helm releases concurrently, e.g. the upgrades of the AWS Load
+Balancer Controller and of the EBS CSI driver, which touch disjoint namespaces and resources.
+The helm processes of an operation run with a HELM_CACHE_HOME of their release, so that concurrent helm
+processes do not contend on the locks of a shared repository cache. An operation runs either in a stage,
+see release_stage, or with the operations of other releases, see run, which waits for all of them and
+collects their failures per release.
+"""
+
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from aws_deployment_manager import constants
+from aws_deployment_manager import utils
+from aws_deployment_manager.stagescheduler import Stage
+
+LOG = logging.getLogger(__name__)
+
+_CURRENT = threading.local()
+
+
+class HelmOperation:
+    """ An operation on a Helm release, e.g. its installation or upgrade """
+
+    def __init__(self, release, func):
+        """
+        :param release: Name of the release
+        :param func: Function running the operation, without arguments
+        """
+        self.release = release
+        self.func = func
+
+    def __repr__(self):
+        return "HelmOperation({0})".format(self.release)
+
+
+class HelmOperationsFailedError(Exception):
+    """ Raised when the operations of several releases have failed """
+
+    def __init__(self, failures):
+        self.failures = failures
+        super().__init__("; ".join("Release {0} failed: {1}".format(release, exception)
+                                   for release, exception in failures.items()))
+
+
+def get_cache_home(release):
+    """
+    :param release: Name of the release
+    :return: HELM_CACHE_HOME of the helm processes of the release
+    """
+    return os.path.join(constants.HELM_CACHE_DIR, release)
+
+
+def get_release():
+    """
+    :return: Name of the release of the operation running in this thread, None if there is none
+    """
+    return getattr(_CURRENT, 'release', None)
+
+
+def execute_command(command):
+    """
+    Execute a helm command, with the cache of the release of the running operation if any
+    :param command: Command to be executed
+    :return: Command Response
+    """
+    release = get_release()
+    if release is None:
+        return utils.execute_command(command=command)
+    return utils.execute_command(command=command, env=dict(os.environ, HELM_CACHE_HOME=get_cache_home(release)))
+
+
+def run_operation(operation):
+    """
+    Runs an operation in this thread, its helm commands using the cache of its release
+    :param operation: HelmOperation
+    :return: Result of the operation
+    """
+    previous_release = get_release()
+    _CURRENT.release = operation.release
+    try:
+        return operation.func()
+    finally:
+        _CURRENT.release = previous_release
+
+
+def run(operations, max_workers=None):
+    """
+    Runs the operations of independent releases concurrently and waits for all of them. As releases are
+    independent, the failure of an operation does not stop the others. A single failure is re-raised as is,
+    several are raised as HelmOperationsFailedError.
+    :param operations: List of HelmOperation, one per release
+    :param max_workers: Maximum number of operations running at the same time
+    :return: Results of the operations by release
+    """
+    releases = [operation.release for operation in operations]
+    duplicates = {release for release in releases if releases.count(release) > 1}
+    if duplicates:
+        raise Exception("Several operations on releases: {0}".format(", ".join(sorted(duplicates))))
+
+    with ThreadPoolExecutor(max_workers=max_workers or constants.HELM_MAX_WORKERS,
+                            thread_name_prefix='helm') as executor:
+        futures = {operation.release: executor.submit(run_operation, operation) for operation in operations}
+
+    failures = {}
+    for release, future in futures.items():
+        exception = future.exception()
+        if exception is not None:
+            LOG.error("Operation on release {0} failed: {1}".format(release, exception))
+            failures[release] = exception
+    if len(failures) == 1:
+        raise next(iter(failures.values()))
+    if failures:
+        raise HelmOperationsFailedError(failures)
+    return {release: future.result() for release, future in futures.items()}
+
+
+def release_stage(name, release, func, depends_on=(), resumable=True):
+    """
+    :param name: Name of stage
+    :param release: Name of the release of the stage
+    :param func: Function running the operation on the release, without arguments
+    :param depends_on: Names of the stages that must have finished before this one starts
+    :param resumable: If False the stage is not recorded in the stage log and always runs
+    :return: Stage running the operation with the cache of its release, concurrently with the other stages
+    """
+    return Stage(name, functools.partial(run_operation, HelmOperation(release, func)), depends_on=depends_on,
+                 resumable=resumable)
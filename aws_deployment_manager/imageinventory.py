@@ -0,0 +1,169 @@
+"""
+This module maintains the image inventory, a lockfile of the images referenced by the templates and the
+Helm charts, together with their digests once they have been pushed.
+The inventory is keyed by a hash of its inputs and rebuilt only when they change.
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from aws_deployment_manager import constants
+from aws_deployment_manager import helmcharts
+from aws_deployment_manager import utils
+from aws_deployment_manager import yamlhelper
+
+LOG = logging.getLogger(__name__)
+
+
+def get_helm_charts():
+    """
+    Returns the Helm charts whose rendered templates contribute images to the inventory
+    :return: list of chart descriptions
+    """
+    return [
+        {
+            "name": "prometheus",
+            "chart": constants.HELM_CHART_PROMETHEUS,
+            "version": constants.PROMETHEUS_CHART_VERSION,
+            "val": constants.TEMPLATE_PROMETHEUS_VALUES,
+            "tmpl": constants.COMMAND_GET_PROMETHEUS_TEMPLATE,
+            "yaml": constants.TEMPLATE_PROMETHEUS_TEMPORARY
+        },
+        {
+            "name": "csi-driver",
+            "chart": constants.HELM_CHART_CSI_DRIVER,
+            "version": constants.CSI_DRIVER_CHART_VERSION,
+            "val": constants.TEMPLATE_CSI_VALUES,
+            "tmpl": constants.CSI_HELM_TEMPLATE,
+            "yaml": constants.TEMPLATE_CSI_TEMPORARY
+        }
+    ]
+
+
+def compute_inventory_key(templates_dir, blacklist, helm_charts):
+    """
+    Computes the hash of the inputs of the inventory: the template files, the pinned chart versions
+    and the chart commands. Rendered chart outputs are not inputs and are excluded.
+    :param templates_dir: directory containing the templates
+    :param blacklist: list of template files to ignore
+    :param helm_charts: list of chart descriptions, see get_helm_charts
+    :return: hex digest
+    """
+    generated = {os.path.join(templates_dir, chart['yaml']) for chart in helm_charts}
+    digest = hashlib.sha256()
+    digest.update('version={0}\n'.format(constants.IMAGE_INVENTORY_VERSION).encode())
+    for chart in helm_charts:
+        digest.update('{0}|{1}|{2}|{3}\n'.format(chart['name'], chart['chart'], chart['version'],
+                                                chart['tmpl']).encode())
+    for filename in sorted(glob.glob(templates_dir + '/*.yaml')):
+        if filename in blacklist or filename in generated:
+            continue
+        digest.update(os.path.basename(filename).encode() + b'\0')
+        with open(filename, 'rb') as template_file:
+            digest.update(hashlib.sha256(template_file.read()).digest())
+    return digest.hexdigest()
+
+
+def load_image_inventory(path=None):
+    """
+    Loads the image inventory from file
+    :param path: path of the inventory file, defaults to constants.IMAGE_INVENTORY_PATH
+    :return: the inventory as dictionary, None if it does not exist or cannot be read
+    """
+    path = path or constants.IMAGE_INVENTORY_PATH
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as inventory_file:
+            inventory = json.load(inventory_file)
+    except (OSError, ValueError) as exception:
+        LOG.warning('Ignoring unreadable image inventory {0}: {1}'.format(path, exception))
+        return None
+    if not isinstance(inventory, dict) or 'key' not in inventory or 'images' not in inventory:
+        LOG.warning('Ignoring malformed image inventory {0}'.format(path))
+        return None
+    return inventory
+
+
+def save_image_inventory(inventory, path=None):
+    """
+    Writes the image inventory to file atomically
+    :param inventory: the inventory as dictionary
+    :param path: path of the inventory file, defaults to constants.IMAGE_INVENTORY_PATH
+    """
+    path = path or constants.IMAGE_INVENTORY_PATH
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as inventory_file:
+        json.dump(inventory, inventory_file, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def render_helm_charts(templates_dir, helm_charts):
+    """
+    Renders the vendored Helm charts into the templates directory, in parallel
+    :param templates_dir: directory containing the templates
+    :param helm_charts: list of chart descriptions, see get_helm_charts
+    """
+    def render(chart):
+        archive = helmcharts.get_chart(chart['chart'], chart['version'])
+        command = chart['tmpl'].format(templates_dir + '/' + chart['val'], archive)
+        template = utils.execute_command(command=command)
+        filename = templates_dir + '/' + chart['yaml']
+        with open(filename, 'w') as template_file:
+            template_file.write(template)
+        LOG.info("Compiled the templates for {0} and created the file {1}".format(chart['name'], filename))
+
+    with ThreadPoolExecutor(max_workers=len(helm_charts) or 1) as executor:
+        # list() re-raises the first failure
+        list(executor.map(render, helm_charts))
+
+
+def get_images(templates_dir=None, blacklist=None, path=None):
+    """
+    Returns the images referenced by the templates and the Helm charts, using the inventory
+    when its inputs are unchanged and rebuilding it otherwise
+    :param templates_dir: directory containing the templates
+    :param blacklist: list of template files to ignore
+    :param path: path of the inventory file, defaults to constants.IMAGE_INVENTORY_PATH
+    :return: sorted list of images
+    """
+    templates_dir = templates_dir or constants.TEMPLATES_DIR
+    blacklist = constants.TEMPLATE_BLACKLIST if blacklist is None else blacklist
+    path = path or constants.IMAGE_INVENTORY_PATH
+    helm_charts = get_helm_charts()
+    key = compute_inventory_key(templates_dir, blacklist, helm_charts)
+    inventory = load_image_inventory(path)
+    if inventory is not None and inventory['key'] == key:
+        LOG.info('Image inventory {0} is up to date'.format(path))
+        return inventory['images']
+
+    LOG.info('Image inventory {0} is missing or out of date, rebuilding it'.format(path))
+    render_helm_charts(templates_dir, helm_charts)
+    images = sorted(yamlhelper.get_image_from_template(foldername=templates_dir, blacklist=blacklist))
+    old_digests = inventory.get('digests', {}) if inventory is not None else {}
+    save_image_inventory({
+        'key': key,
+        'images': images,
+        'digests': {image: digest for image, digest in old_digests.items() if image in images}
+    }, path)
+    return images
+
+
+def record_image_digests(digests, path=None):
+    """
+    Records the digests of pushed images in the inventory
+    :param digests: dictionary of image to digest
+    :param path: path of the inventory file, defaults to constants.IMAGE_INVENTORY_PATH
+    """
+    path = path or constants.IMAGE_INVENTORY_PATH
+    inventory = load_image_inventory(path)
+    if inventory is None:
+        LOG.warning('No image inventory found at {0}, digests not recorded'.format(path))
+        return
+    inventory.setdefault('digests', {}).update(
+        {image: digest for image, digest in digests.items() if image in inventory['images']})
+    save_image_inventory(inventory, path)
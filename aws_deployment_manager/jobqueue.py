@@ -0,0 +1,162 @@
+"""
+This module implements the persistent job queue of the deployment service, in a SQLite database.
+Jobs run in submission order, with at most one running job per environment: a job is only claimed
+when no other job of its environment is running, so the queue also acts as the lock of the environments.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+LOG = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+FINISHED_STATES = [JOB_SUCCEEDED, JOB_FAILED]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    environment TEXT NOT NULL,
+    command TEXT NOT NULL,
+    options TEXT NOT NULL,
+    status TEXT NOT NULL,
+    submitted REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    log_file TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+_COLUMNS = ['id', 'environment', 'command', 'options', 'status', 'submitted', 'started', 'finished',
+            'log_file', 'error']
+
+
+class JobQueue:
+    """ Job queue stored in a SQLite database, shared by the threads of the service """
+
+    def __init__(self, database_path):
+        self.database_path = str(database_path)
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(self.database_path, check_same_thread=False, isolation_level=None)
+        with self.__lock:
+            self.__connection.executescript(_SCHEMA)
+
+    def submit(self, environment, command, options=None):
+        """
+        Adds a job at the end of the queue
+        :param environment: Name of the environment
+        :param command: Name of the command
+        :param options: Options of the command
+        :return: Job
+        """
+        with self.__lock:
+            cursor = self.__connection.execute(
+                "INSERT INTO jobs (environment, command, options, status, submitted) VALUES (?, ?, ?, ?, ?)",
+                (environment, command, json.dumps(options or {}), JOB_QUEUED, time.time()))
+            job_id = cursor.lastrowid
+        LOG.info("Job {0} queued: {1} of {2}".format(job_id, command, environment))
+        return self.get(job_id)
+
+    def claim_next(self):
+        """
+        Marks the oldest queued job whose environment has no running job as running
+        :return: Job, None if no job can run
+        """
+        with self.__lock:
+            self.__connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.__connection.execute(
+                    "SELECT {0} FROM jobs WHERE status = ? AND environment NOT IN "
+                    "(SELECT environment FROM jobs WHERE status = ?) ORDER BY id LIMIT 1".format(', '.join(_COLUMNS)),
+                    (JOB_QUEUED, JOB_RUNNING)).fetchone()
+                if row is not None:
+                    self.__connection.execute("UPDATE jobs SET status = ?, started = ? WHERE id = ?",
+                                              (JOB_RUNNING, time.time(), row[0]))
+                self.__connection.execute("COMMIT")
+            except Exception:
+                self.__connection.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = _to_job(row)
+        job['status'] = JOB_RUNNING
+        return job
+
+    def finish(self, job_id, status, log_file=None, error=None):
+        """
+        Records the end of a job
+        :param job_id: ID of the job
+        :param status: Final status of the job
+        :param log_file: Log file of the job
+        :param error: Error of a failed job
+        """
+        if status not in FINISHED_STATES:
+            raise Exception("Invalid final status {0} for job {1}".format(status, job_id))
+        with self.__lock:
+            self.__connection.execute("UPDATE jobs SET status = ?, finished = ?, log_file = ?, error = ? WHERE id = ?",
+                                      (status, time.time(), log_file, error, job_id))
+        LOG.info("Job {0} {1}".format(job_id, status))
+
+    def get(self, job_id):
+        """
+        :param job_id: ID of the job
+        :return: Job, None if there is no such job
+        """
+        with self.__lock:
+            row = self.__connection.execute("SELECT {0} FROM jobs WHERE id = ?".format(', '.join(_COLUMNS)),
+                                            (job_id,)).fetchone()
+        return _to_job(row) if row is not None else None
+
+    def list(self, environment=None, limit=100):
+        """
+        :param environment: Name of the environment, all environments if None
+        :param limit: Maximum number of jobs
+        :return: Latest jobs, newest first
+        """
+        query = "SELECT {0} FROM jobs".format(', '.join(_COLUMNS))
+        parameters = []
+        if environment is not None:
+            query += " WHERE environment = ?"
+            parameters.append(environment)
+        query += " ORDER BY id DESC LIMIT ?"
+        parameters.append(limit)
+        with self.__lock:
+            rows = self.__connection.execute(query, parameters).fetchall()
+        return [_to_job(row) for row in rows]
+
+    def recover(self):
+        """
+        Fails the jobs left running by a previous service that stopped, which unlocks their environments
+        :return: Number of jobs failed
+        """
+        with self.__lock:
+            cursor = self.__connection.execute(
+                "UPDATE jobs SET status = ?, finished = ?, error = ? WHERE status = ?",
+                (JOB_FAILED, time.time(), "The service stopped while the job was running", JOB_RUNNING))
+            recovered = cursor.rowcount
+        if recovered:
+            LOG.warning("{0} jobs interrupted by the previous stop of the service marked as failed".format(recovered))
+        return recovered
+
+    def close(self):
+        """
+        Closes the database
+        """
+        with self.__lock:
+            self.__connection.close()
+
+
+def _to_job(row):
+    """
+    :param row: Row of the jobs table
+    :return: Job as dictionary
+    """
+    job = dict(zip(_COLUMNS, row))
+    job['options'] = json.loads(job['options'])
+    return job
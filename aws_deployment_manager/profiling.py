@@ -0,0 +1,157 @@
+"""
+This module profiles a CLI command, either its CPU time with cProfile or its memory allocations
+with tracemalloc, and saves the results next to the log file of the command.
+"""
+
+import cProfile
+import io
+import logging
+import pstats
+import resource
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+LOG = logging.getLogger(__name__)
+
+MODE_CPU = "cpu"
+MODE_MEM = "mem"
+MODES = [MODE_CPU, MODE_MEM]
+
+TOP_ENTRIES = 25
+CPU_FILE_POSTFIX = ".pstats"
+MEM_FILE_POSTFIX = "_memory.txt"
+
+
+def get_log_file_path():
+    """
+    :return: Path of the log file of the command, None if logging to a file is not initialized
+    """
+    # The most recently added, as the root logger can have handlers from the caller, e.g. test runners
+    for handler in reversed(logging.getLogger('').handlers):
+        if isinstance(handler, logging.FileHandler):
+            return handler.baseFilename
+    return None
+
+
+def get_output_path(log_file_path, postfix):
+    """
+    :param log_file_path: Path of the log file of the command
+    :param postfix: Postfix replacing the extension of the log file
+    :return: Path of the profiling output next to it
+    """
+    path = Path(log_file_path)
+    return str(path.with_name(path.stem + postfix))
+
+
+class CpuProfiler:
+    """ cProfile of the calling thread and of the threads it starts, e.g. the stage workers """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__profilers = []
+
+    def __new_profiler(self):
+        profiler = cProfile.Profile()
+        with self.__lock:
+            self.__profilers.append(profiler)
+        profiler.enable()
+
+    def __start_thread(self, *_args):
+        # Called once on the first event of each new thread, enabling cProfile replaces this hook
+        self.__new_profiler()
+
+    def start(self):
+        """
+        Starts profiling
+        """
+        self.__new_profiler()
+        # From Python 3.12 a single cProfile already sees all threads
+        if sys.version_info < (3, 12):
+            threading.setprofile(self.__start_thread)
+
+    def stop(self, output_path):
+        """
+        Stops profiling, saves the merged statistics and logs the most expensive functions
+        :param output_path: Path of the .pstats file
+        """
+        threading.setprofile(None)
+        with self.__lock:
+            profilers = list(self.__profilers)
+        for profiler in profilers:
+            profiler.disable()
+        stream = io.StringIO()
+        stats = pstats.Stats(*profilers, stream=stream)
+        stats.dump_stats(output_path)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_ENTRIES)
+        LOG.debug(stream.getvalue())
+        LOG.info("CPU profile of {0} threads saved to {1}, open it with python -m pstats or snakeviz".format(
+            len(profilers), output_path))
+
+
+class MemoryProfiler:
+    """ tracemalloc of the Python allocations of the command """
+
+    @staticmethod
+    def start():
+        """
+        Starts tracing allocations
+        """
+        tracemalloc.start()
+
+    @staticmethod
+    def stop(output_path):
+        """
+        Stops tracing, saves the top allocations and the peak memory and logs a summary
+        :param output_path: Path of the text report
+        """
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>")
+        ])
+        # ru_maxrss is in kilobytes on Linux
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        lines = [
+            "Peak traced memory: {0:.1f} MiB".format(peak / 2 ** 20),
+            "Traced memory at exit: {0:.1f} MiB".format(current / 2 ** 20),
+            "Maximum resident set size: {0:.1f} MiB".format(max_rss / 2 ** 20),
+            "Top {0} allocations by line still held at exit:".format(TOP_ENTRIES)
+        ]
+        for statistic in snapshot.statistics('lineno')[:TOP_ENTRIES]:
+            lines.append("  {0}".format(statistic))
+        with open(output_path, 'w') as output_file:
+            output_file.write("\n".join(lines) + "\n")
+        LOG.info("Peak traced memory {0:.1f} MiB, maximum RSS {1:.1f} MiB, memory profile saved to {2}".format(
+            peak / 2 ** 20, max_rss / 2 ** 20, output_path))
+
+
+@contextmanager
+def profiled(mode):
+    """
+    Context manager profiling the enclosed block. The results are saved next to the log file when
+    the block exits, also on sys.exit. Profiling failures are logged and never raised.
+    :param mode: One of MODES, None to not profile
+    """
+    if mode is None:
+        yield
+        return
+
+    if mode == MODE_CPU:
+        profiler, postfix = CpuProfiler(), CPU_FILE_POSTFIX
+    else:
+        profiler, postfix = MemoryProfiler(), MEM_FILE_POSTFIX
+    profiler.start()
+    try:
+        yield
+    finally:
+        try:
+            # Next to the log file, or in the current directory if logging to a file is not initialized
+            log_file_path = get_log_file_path() or "aws_deployment_manager.log"
+            profiler.stop(get_output_path(log_file_path, postfix))
+        except Exception as exception:
+            LOG.warning("Failed to save the {0} profile: {1}".format(mode, exception))
@@ -0,0 +1,219 @@
+"""
+This module implements the readiness probes of the Kubernetes resources deployed by the commands.
+Each probe polls the cluster with kubectl through the waiter, returns as soon as its condition holds,
+and fails with the reason the resource is not ready when the deadline of its backoff is reached.
+"""
+
+import json
+import logging
+
+from aws_deployment_manager import constants
+from aws_deployment_manager import errors
+from aws_deployment_manager import timing
+from aws_deployment_manager import utils
+from aws_deployment_manager import waiter
+
+LOG = logging.getLogger(__name__)
+
+# The API server of a new EKS cluster usually answers within seconds of the kubeconfig generation
+API_SERVER = waiter.Backoff(first_delay=2, max_delay=10, timeout=300)
+DEPLOYMENT_ROLLOUT = waiter.Backoff(first_delay=5, factor=1.5, max_delay=15, timeout=600)
+# A daemonset rolls out one node after the other
+DAEMONSET_ROLLOUT = waiter.Backoff(first_delay=5, factor=1.5, max_delay=15, timeout=1200)
+# An AWS load balancer takes a few minutes to be provisioned
+LOAD_BALANCER = waiter.Backoff(first_delay=5, factor=1.5, max_delay=15, timeout=600)
+
+
+def _get_json(command):
+    """
+    Get a Kubernetes resource, which may not be readable yet
+    :param command: kubectl command printing the resource in JSON
+    :return: Resource, or None if kubectl failed
+    """
+    try:
+        return json.loads(utils.execute_command(command))
+    except Exception as exception:
+        LOG.debug("Resource not readable yet: {0}".format(exception))
+        return None
+
+
+def is_rollout_complete(deployment):
+    """
+    Tell whether a deployment rolled out, with the conditions of kubectl rollout status
+    :param deployment: Deployment resource
+    :return: True if all the replicas are updated and available
+    """
+    if deployment is None:
+        return False
+    status = deployment.get('status', {})
+    replicas = deployment.get('spec', {}).get('replicas', 1)
+    updated_replicas = status.get('updatedReplicas', 0)
+    return status.get('observedGeneration', 0) >= deployment.get('metadata', {}).get('generation', 1) and \
+        updated_replicas >= replicas and \
+        status.get('replicas', 0) <= updated_replicas and \
+        status.get('availableReplicas', 0) >= updated_replicas
+
+
+async def _get_json_async(command):
+    """
+    Get a Kubernetes resource from a coroutine, which may not be readable yet
+    :param command: kubectl command printing the resource in JSON
+    :return: Resource, or None if kubectl failed
+    """
+    try:
+        return json.loads(await utils.execute_command_async(command))
+    except Exception as exception:
+        LOG.debug("Resource not readable yet: {0}".format(exception))
+        return None
+
+
+def is_daemonset_rollout_complete(daemonset):
+    """
+    Tell whether a daemonset rolled out, with the conditions of kubectl rollout status
+    :param daemonset: DaemonSet resource
+    :return: True if the PODs of all the scheduled nodes are updated and available
+    """
+    if daemonset is None:
+        return False
+    status = daemonset.get('status', {})
+    desired = status.get('desiredNumberScheduled', 0)
+    return status.get('observedGeneration', 0) >= daemonset.get('metadata', {}).get('generation', 1) and \
+        status.get('updatedNumberScheduled', 0) >= desired and \
+        status.get('numberAvailable', 0) >= desired
+
+
+def is_workload_rollout_complete(workload):
+    """
+    Tell whether a deployment or a daemonset rolled out
+    :param workload: Deployment or DaemonSet resource
+    :return: True if it rolled out
+    """
+    if workload is not None and workload.get('kind') == 'DaemonSet':
+        return is_daemonset_rollout_complete(workload)
+    return is_rollout_complete(workload)
+
+
+def get_load_balancer_hostname(service):
+    """
+    Get the hostname of the load balancer of a service
+    :param service: Service resource
+    :return: Hostname, or IP, of the load balancer, or None if it is not provisioned
+    """
+    if service is None:
+        return None
+    for ingress in service.get('status', {}).get('loadBalancer', {}).get('ingress') or []:
+        address = ingress.get('hostname') or ingress.get('ip')
+        if address:
+            return address
+    return None
+
+
+def wait_for_api_server(kubeconfig_path, backoff=API_SERVER):
+    """
+    Wait for the Kubernetes API server to be reachable and ready
+    :param kubeconfig_path: Path to kubeconfig file
+    :param backoff: Backoff of the probes
+    """
+    command = constants.COMMAND_GET_API_SERVER_READY.format(kubeconfig_path)
+
+    def poll():
+        try:
+            return utils.execute_command(command).strip()
+        except Exception as exception:
+            LOG.debug("API server not ready yet: {0}".format(exception))
+            return None
+
+    try:
+        waiter.wait(poll=poll, until=lambda ready: ready == 'ok', description="Kubernetes API server",
+                    backoff=backoff, category=timing.CATEGORY_SLEEP,
+                    format_state=lambda ready: 'ready' if ready == 'ok' else 'not reachable')
+    except errors.WaitTimeoutError as exception:
+        raise Exception("Kubernetes API server not reachable after {0}s with kubeconfig {1}".format(
+            backoff.timeout, kubeconfig_path)) from exception
+    LOG.info("Kubernetes API server is ready")
+
+
+def wait_for_rollout(deployment_name, namespace, kubeconfig_path, backoff=DEPLOYMENT_ROLLOUT):
+    """
+    Wait for all the replicas of a deployment to be updated and available
+    :param deployment_name: Name of the deployment
+    :param namespace: Namespace of the deployment
+    :param kubeconfig_path: Path to kubeconfig file
+    :param backoff: Backoff of the probes
+    """
+    command = constants.COMMAND_GET_DEPLOYMENT_JSON.format(deployment_name, namespace, kubeconfig_path)
+
+    def format_deployment(deployment):
+        if deployment is None:
+            return 'not found'
+        status = deployment.get('status', {})
+        return "{0}/{1} replicas available".format(status.get('availableReplicas', 0),
+                                                    deployment.get('spec', {}).get('replicas', 1))
+
+    try:
+        waiter.wait(poll=lambda: _get_json(command), until=is_rollout_complete,
+                    description="rollout of deployment {0}/{1}".format(namespace, deployment_name),
+                    backoff=backoff, category=timing.CATEGORY_SLEEP, format_state=format_deployment)
+    except errors.WaitTimeoutError as exception:
+        raise Exception("Deployment {0} in namespace {1} not rolled out after {2}s: {3}. "
+                        "Check the events of its PODs".format(deployment_name, namespace, backoff.timeout,
+                                                               format_deployment(exception.state))) from exception
+    LOG.info("Deployment {0} in namespace {1} is rolled out".format(deployment_name, namespace))
+
+
+async def wait_for_workload_rollout(kind, name, namespace, kubeconfig_path, backoff=None):
+    """
+    Wait for a deployment or a daemonset to roll out, from a coroutine, e.g. to wait for several in parallel
+    :param kind: Kind of the workload, deployment or daemonset
+    :param name: Name of the workload
+    :param namespace: Namespace of the workload
+    :param kubeconfig_path: Path to kubeconfig file
+    :param backoff: Backoff of the probes, the one of the kind if None
+    """
+    backoff = backoff or (DAEMONSET_ROLLOUT if kind == 'daemonset' else DEPLOYMENT_ROLLOUT)
+    command = constants.COMMAND_GET_WORKLOAD_JSON.format(kind, name, namespace, kubeconfig_path)
+
+    def format_workload(workload):
+        if workload is None:
+            return 'not found'
+        status = workload.get('status', {})
+        if workload.get('kind') == 'DaemonSet':
+            return "{0}/{1} PODs updated and available".format(
+                min(status.get('updatedNumberScheduled', 0), status.get('numberAvailable', 0)),
+                status.get('desiredNumberScheduled', 0))
+        return "{0}/{1} replicas available".format(status.get('availableReplicas', 0),
+                                                    workload.get('spec', {}).get('replicas', 1))
+
+    try:
+        await waiter.wait_async(poll=lambda: _get_json_async(command), until=is_workload_rollout_complete,
+                                description="rollout of {0} {1}/{2}".format(kind, namespace, name),
+                                backoff=backoff, category=timing.CATEGORY_SLEEP, format_state=format_workload)
+    except errors.WaitTimeoutError as exception:
+        raise Exception("{0} {1} in namespace {2} not rolled out after {3}s: {4}. "
+                        "Check the events of its PODs".format(kind.capitalize(), name, namespace, backoff.timeout,
+                                                               format_workload(exception.state))) from exception
+    LOG.info("{0} {1} in namespace {2} is rolled out".format(kind.capitalize(), name, namespace))
+
+
+def wait_for_load_balancer(service_name, namespace, kubeconfig_path, backoff=LOAD_BALANCER):
+    """
+    Wait for the load balancer of a service to be provisioned
+    :param service_name: Name of the service
+    :param namespace: Namespace of the service
+    :param kubeconfig_path: Path to kubeconfig file
+    :param backoff: Backoff of the probes
+    :return: Hostname, or IP, of the load balancer
+    """
+    command = constants.COMMAND_GET_SERVICE_JSON.format(service_name, namespace, kubeconfig_path)
+    try:
+        service = waiter.wait(poll=lambda: _get_json(command), until=get_load_balancer_hostname,
+                              description="load balancer of service {0}/{1}".format(namespace, service_name),
+                              backoff=backoff, category=timing.CATEGORY_SLEEP,
+                              format_state=lambda resource: get_load_balancer_hostname(resource) or 'pending')
+    except errors.WaitTimeoutError as exception:
+        raise Exception("Load balancer of service {0} in namespace {1} not provisioned after {2}s, "
+                        "status.loadBalancer.ingress is empty. Check the events of the service".format(
+                            service_name, namespace, backoff.timeout)) from exception
+    hostname = get_load_balancer_hostname(service)
+    LOG.info("Load balancer of service {0} in namespace {1} = {2}".format(service_name, namespace, hostname))
+    return hostname
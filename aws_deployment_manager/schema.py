@@ -1,43 +1,63 @@
-# pylint: skip-file
-{
+"""
+Schema of the IDUN configuration file, and its validator.
+The rules across parameters run in the same validation pass as the schema, through check_with.
+"""
+
+import ipaddress
+import re
+
+from cerberus import Validator
+
+from aws_deployment_manager import constants
+
+K8S_VERSION_PATTERN = re.compile(r'^\d+\.\d+$')
+
+SCHEMA = {
     'EnvironmentName': {
         'required': True,
         'type': 'string',
-        'regex': '^\S*$'
+        'regex': r'^\S*$',
+        'check_with': 'mandatory'
     },
     'AWSRegion': {
         'required': True,
         'type': 'string',
-        'regex': '^\S*$'
+        'regex': r'^\S*$',
+        'check_with': 'supported_region'
     },
     'K8SVersion': {
         'required': True,
         'type': 'string',
-        'regex': '^\S*$'
+        'regex': r'^\S*$',
+        'check_with': 'k8s_version'
     },
     'VPCID': {
         'required': True,
         'type': 'string',
-        'regex': '^\S*$'
+        'regex': r'^\S*$'
     },
     'ControlPlaneSubnetIds': {
         'required': True,
         'type': 'string',
-        'regex': '^\S*$'
+        'regex': r'^\S*$',
+        'check_with': 'control_plane_subnets'
     },
     'WorkerNodeSubnetIds': {
         'required': True,
         'type': 'string',
-        'regex': '^\S*$'
+        'regex': r'^\S*$',
+        'check_with': 'worker_node_subnets'
     },
     'SecondaryVpcCIDR': {
         'required': True,
         'type': 'string',
-        'regex': '^\S*$'
+        'regex': r'^\S*$',
+        'check_with': ['mandatory', 'cidr']
     },
     'NodeInstanceType': {
         'required': True,
-        'type': 'string'
+        'type': 'string',
+        'check_with': 'mandatory'
     },
     'BackupInstanceType': {
         'required': True,
@@ -55,7 +75,7 @@
     },
     'BackupPass': {
         'required': True,
-         'type': 'string',
+        'type': 'string',
     },
     'DiskSize': {
         'required': True,
@@ -78,19 +98,20 @@
     'SshKeyPairName': {
         'required': True,
         'type': 'string',
-        'regex': '^\S*$'
+        'regex': r'^\S*$'
     },
-    'PrivateDomainName' : {
+    'PrivateDomainName': {
         'required': True,
         'type': 'string',
-        'regex': '^\S*$'
+        'regex': r'^\S*$',
+        'check_with': 'mandatory'
     },
     'Hostnames': {
         'type': 'dict',
         'required': True,
         'valuesrules': {
             'type': 'string',
-            'regex': '^\S*$'
+            'regex': r'^\S*$'
         }
     },
     'KubeDownscaler': {
@@ -101,4 +122,61 @@
         'required': True,
         'type': 'boolean'
     }
-}
\ No newline at end of file
+}
+
+
+class ConfigValidator(Validator):
+    """
+    Validator of the IDUN configuration file.
+    Schema errors are reported by cerberus in errors, errors of the rules across parameters in config_errors.
+    A validator is not thread safe, as it keeps the state of the last validation.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.config_errors = []
+
+    def validate(self, document, *args, **kwargs):
+        """
+        Validates a configuration
+        :param document: Configuration
+        :return: True if the configuration is valid
+        """
+        self.config_errors = []
+        schema_valid = super().validate(document, *args, **kwargs)
+        return schema_valid and not self.config_errors
+
+    def _check_with_mandatory(self, field, value):
+        if not str(value).strip():
+            self.config_errors.append("Missing Mandatory Parameter - {0}".format(field))
+
+    def _check_with_supported_region(self, _field, value):
+        if value not in constants.SUPPORTED_REGIONS:
+            self.config_errors.append("Region {0} is not supported. Please select region from {1}".
+                                      format(value, constants.SUPPORTED_REGIONS))
+
+    def _check_with_worker_node_subnets(self, _field, value):
+        subnet_ids = value.split(",")
+        if len(subnet_ids) > 2 or len(subnet_ids) < 1:
+            self.config_errors.append("Minimum 1 and Maximum 2 Worker Node Subnet IDs to be provided. {0} provided".
+                                      format(len(subnet_ids)))
+
+    def _check_with_control_plane_subnets(self, _field, value):
+        subnet_ids = value.split(",")
+        if len(subnet_ids) != 2:
+            self.config_errors.append("2 Control Plane Subnet IDs to be provided. {0} provided".
+                                      format(len(subnet_ids)))
+
+    def _check_with_cidr(self, field, value):
+        if not value.strip():
+            return
+        try:
+            ipaddress.ip_network(value, strict=False)
+        except ValueError:
+            self.config_errors.append("Parameter {0} must be a CIDR block, e.g. 100.64.0.0/16. {1} provided".
+                                      format(field, value))
+
+    def _check_with_k8s_version(self, field, value):
+        if not K8S_VERSION_PATTERN.match(value):
+            self.config_errors.append("Parameter {0} must be a K8S version, e.g. 1.24. {1} provided".
+                                      format(field, value))
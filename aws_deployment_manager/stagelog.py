@@ -1,27 +1,150 @@
-""" This module handles reading and writing into stage log """
-
+""" This module handles reading and writing into stage log
+
+The stage log is a journal with one JSON record per line, holding the stage, its state, a timestamp,
+the duration of finished stages, the attempt number, the host and the version of the tool.
+Lines in the legacy 'stage::state' format are still read.
+Each process keeps an index of the latest state of the stages, loaded once and then updated by
+reading only the lines appended since the previous lookup.
+"""
+
+import datetime
+import fcntl
+import json
 import os
+import socket
+import threading
 from aws_deployment_manager import constants
 
 DELIMITER = "::"
 
+# Bytes at the start of the file used to detect that it has been replaced or rewritten
+_SIGNATURE_SIZE = 256
+
+_LOCK = threading.Lock()
+_INDEXES = {}
+
+
+class _StageIndex:
+    """ Latest state and attempt count of each stage, as read up to an offset of the stage log """
+
+    def __init__(self):
+        self.offset = 0
+        self.inode = None
+        self.signature = b""
+        self.states = {}
+        self.attempts = {}
+        self.records = []
+
+    def add(self, record):
+        """
+        Adds a record read from the stage log
+        :param record: Record as dictionary
+        """
+        stage = record['stage']
+        if record['state'] not in constants.VALID_STATES:
+            return
+        self.states[stage] = record['state']
+        if record['state'] == constants.STAGE_STARTED:
+            self.attempts[stage] = record.get('attempt') or self.attempts.get(stage, 0) + 1
+        self.records.append(record)
+
 
-def write_to_stage_log(log_path, stage, state):
+def _parse_line(line):
+    """
+    Parses a line of the stage log
+    :param line: Line in JSON or legacy format
+    :return: Record as dictionary, None if the line is not valid
+    """
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+        return record if isinstance(record, dict) and 'stage' in record and 'state' in record else None
+    temp = line.split(DELIMITER)
+    if len(temp) < 2:
+        return None
+    return {'stage': temp[0], 'state': temp[1]}
+
+
+def _get_index(log_path):
+    """
+    Returns the index of the stage log, reading the lines appended since the last call.
+    Must be called holding _LOCK.
+    :param log_path: Path to stage log file
+    :return: _StageIndex
+    """
+    key = os.path.abspath(log_path)
+    index = _INDEXES.get(key)
+    try:
+        file = open(log_path, "rb")
+    except FileNotFoundError:
+        _INDEXES.pop(key, None)
+        return _StageIndex()
+
+    with file:
+        stat = os.fstat(file.fileno())
+        if index is not None:
+            signature = file.read(len(index.signature))
+            if index.inode != stat.st_ino or stat.st_size < index.offset or signature != index.signature:
+                index = None
+        if index is None:
+            index = _StageIndex()
+            index.inode = stat.st_ino
+            _INDEXES[key] = index
+
+        file.seek(index.offset)
+        data = file.read()
+        # Only complete lines, a concurrent writer may be half way through one
+        data = data[:data.rfind(b"\n") + 1]
+        for line in data.decode("utf-8", errors="replace").splitlines():
+            record = _parse_line(line)
+            if record is not None:
+                index.add(record)
+        index.offset += len(data)
+        if len(index.signature) < _SIGNATURE_SIZE:
+            file.seek(0)
+            index.signature = file.read(min(index.offset, _SIGNATURE_SIZE))
+    return index
+
+
+def write_to_stage_log(log_path, stage, state, duration=None):
     """
     Updates stage log with new phase and state
     :param log_path: Path to stage log file
     :param stage: Stage Name
     :param state: State of phase (started/finished)
+    :param duration: Duration in seconds of the stage, when finished
     :return: Nothing. Throws exception in case of any failure
     """
 
     if state not in constants.VALID_STATES:
         raise Exception("Invalid state {0} passed for stage {1}".format(state, stage))
 
-    line = DELIMITER.join([stage, state])
-    with open(log_path, "a") as file:
-        file.write(line)
-        file.write("\n")
+    with _LOCK:
+        with open(log_path, "a") as file:
+            # Lock against other processes, then bring the index up to date to number the attempt
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            try:
+                attempts = _get_index(log_path).attempts.get(stage, 0)
+                record = {
+                    'stage': stage,
+                    'state': state,
+                    'ts': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds'),
+                    'attempt': attempts + 1 if state == constants.STAGE_STARTED else max(attempts, 1),
+                    'host': socket.gethostname(),
+                    'version': constants.VERSION
+                }
+                if duration is not None:
+                    record['duration'] = round(duration, 3)
+                file.write(json.dumps(record) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+            finally:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
 
 
 def get_all_stages(log_path):
@@ -30,23 +153,8 @@ def get_all_stages(log_path):
     :param log_path: Path to stage log file
     :return: Dict with key as stage and latest state
     """
-    stage_map = {}
-
-    if not os.path.exists(log_path):
-        return stage_map
-
-    with open(log_path, "r") as file:
-        lines = file.readlines()
-
-    for line in lines:
-        if line.strip():
-            temp = line.strip().split(DELIMITER)
-            stage = temp[0]
-            state = temp[1]
-            if state in constants.VALID_STATES:
-                stage_map[stage] = state
-
-    return stage_map
+    with _LOCK:
+        return dict(_get_index(log_path).states)
 
 
 def get_stage(log_path, stage_name):
@@ -56,22 +164,15 @@ def get_stage(log_path, stage_name):
     :param stage_name: Name of stage
     :return: Stage State (started/finished). If stage does not exist, None is returned
     """
-    if not os.path.exists(log_path):
-        return None
+    with _LOCK:
+        return _get_index(log_path).states.get(stage_name)
 
-    stage_map = {}
 
-    with open(log_path, "r") as file:
-        lines = file.readlines()
-
-    for line in lines:
-        if line:
-            temp = line.split(DELIMITER)
-            stage = temp[0]
-            state = temp[1]
-            stage_map[stage] = state
-
-    if stage_name in stage_map:
-        return stage_map[stage_name]
-
-    return None
+def get_stage_records(log_path):
+    """
+    Reads stage log and returns all its records. Records from legacy lines only have stage and state.
+    :param log_path: Path to stage log file
+    :return: List of records as dictionaries, oldest first
+    """
+    with _LOCK:
+        return [dict(record) for record in _get_index(log_path).records]
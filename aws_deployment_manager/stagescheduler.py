@@ -0,0 +1,122 @@
+"""
+This module implements a scheduler running stages according to their dependencies
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+LOG = logging.getLogger(__name__)
+
+
+class Stage:
+    """ A unit of work with the names of the stages it depends on """
+
+    def __init__(self, name, func, depends_on=(), resumable=True):
+        """
+        :param name: Name of stage, used in the stage log when resumable
+        :param func: Function executing the stage
+        :param depends_on: Names of the stages that must have finished before this one starts
+        :param resumable: If False the stage is not recorded in the stage log and always runs,
+                          e.g. for steps loading state needed by the following stages
+        """
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.resumable = resumable
+
+    def __repr__(self):
+        return "Stage({0})".format(self.name)
+
+
+class StageFailedError(Exception):
+    """ Raised when one or more stages have failed """
+
+    def __init__(self, failures, not_started):
+        self.failures = failures
+        self.not_started = not_started
+        message = "; ".join("Stage {0} failed: {1}".format(name, exception)
+                            for name, exception in failures.items())
+        if not_started:
+            message += ". Stages not started: {0}".format(", ".join(not_started))
+        super().__init__(message)
+
+
+def validate_stages(stages):
+    """
+    Checks that stage names are unique, dependencies exist and there are no cycles
+    :param stages: List of Stage
+    :return: Nothing. Throws exception in case of invalid graph
+    """
+    names = [stage.name for stage in stages]
+    duplicates = {name for name in names if names.count(name) > 1}
+    if duplicates:
+        raise Exception("Duplicate stages: {0}".format(", ".join(sorted(duplicates))))
+
+    for stage in stages:
+        unknown = [dependency for dependency in stage.depends_on if dependency not in names]
+        if unknown:
+            raise Exception("Stage {0} depends on unknown stages: {1}".format(stage.name, ", ".join(unknown)))
+
+    remaining = {stage.name: set(stage.depends_on) for stage in stages}
+    while remaining:
+        ready = [name for name, dependencies in remaining.items() if not dependencies]
+        if not ready:
+            raise Exception("Cyclic dependency between stages: {0}".format(", ".join(sorted(remaining))))
+        for name in ready:
+            del remaining[name]
+        for dependencies in remaining.values():
+            dependencies.difference_update(ready)
+
+
+class StageScheduler:
+    """ Runs stages concurrently as soon as their dependencies have finished """
+
+    def __init__(self, execute, max_workers):
+        """
+        :param execute: Function called with each Stage to run it
+        :param max_workers: Maximum number of stages running at the same time
+        """
+        self.__execute = execute
+        self.__max_workers = max(1, max_workers)
+
+    def run(self, stages):
+        """
+        Runs all stages. When a stage fails no further stage is started and the running ones are
+        waited for. A single failure is re-raised as is, several are raised as StageFailedError.
+        :param stages: List of Stage, in their preferred start order
+        """
+        validate_stages(stages)
+        pending = list(stages)
+        finished = set()
+        failures = {}
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.__max_workers, thread_name_prefix='stage') as executor:
+            while pending or running:
+                if not failures:
+                    for stage in [stage for stage in pending if finished.issuperset(stage.depends_on)]:
+                        if len(running) >= self.__max_workers:
+                            break
+                        pending.remove(stage)
+                        running[executor.submit(self.__execute, stage)] = stage
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    exception = future.exception()
+                    if exception is None:
+                        finished.add(stage.name)
+                    else:
+                        LOG.error("Stage {0} failed: {1}".format(stage.name, exception))
+                        failures[stage.name] = exception
+
+        if failures:
+            not_started = [stage.name for stage in pending]
+            if not_started:
+                LOG.error("Stages not started: {0}".format(", ".join(not_started)))
+            if len(failures) == 1:
+                # Keep the original exception, as when stages ran one after the other
+                raise next(iter(failures.values()))
+            raise StageFailedError(failures, not_started)
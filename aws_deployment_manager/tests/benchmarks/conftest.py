@@ -0,0 +1,158 @@
+"""
+Sets up the offline environment of the benchmarks: a work directory with a configuration file,
+an in-memory AWS behind every botocore client, fake kubectl, helm and aws executables, a fake Docker
+client and a virtual clock, so that the waits of the commands take no time.
+"""
+
+import os
+import shutil
+
+import botocore.session
+import docker
+import pytest
+import wget
+
+from aws_deployment_manager import clock
+from aws_deployment_manager import constants
+from aws_deployment_manager.aws import aws_clientpool
+from aws_deployment_manager.tests.benchmarks.fakes import FakeAws, FakeDockerClient
+
+ENVIRONMENT_NAME = "idun-bench"
+REGION = "eu-west-1"
+VPC_ID = "vpc-0bench"
+SUBNET_IDS = ["subnet-0bench1", "subnet-0bench2", "subnet-0bench3"]
+K8S_VERSION = "1.24"
+INSTANCE_TYPE = "m5.2xlarge"
+LATENCY_ENV_VAR = "BENCHMARK_AWS_LATENCY_MS"
+DEFAULT_LATENCY_MS = 5
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_TEMPLATES_DIR = os.path.join(BENCHMARKS_DIR, '..', '..', '..', 'templates')
+CNI_MANIFEST = """apiVersion: apps/v1
+kind: DaemonSet
+metadata:
+  name: aws-node
+spec:
+  template:
+    spec:
+      containers:
+        - image: 602401143452.dkr.ecr.us-west-2.amazonaws.com/amazon-k8s-cni:v1.12.6
+"""
+
+
+def write_config_file(path):
+    """
+    Writes the configuration file of the benchmarked environment
+    :param path: Path of the configuration file
+    """
+    content = f'''
+EnvironmentName: {ENVIRONMENT_NAME}
+AWSRegion: {REGION}
+VPCID: {VPC_ID}
+ControlPlaneSubnetIds: {SUBNET_IDS[0]},{SUBNET_IDS[1]}
+WorkerNodeSubnetIds: {SUBNET_IDS[1]},{SUBNET_IDS[2]}
+SecondaryVpcCIDR: 100.64.0.0/16
+DisablePublicAccess: False
+NodeInstanceType: {INSTANCE_TYPE}
+DiskSize: 20
+MinNodes: 2
+MaxNodes: 10
+SshKeyPairName: bench-keypair
+PrivateDomainName: idunaas.ericsson.se
+K8SVersion: '{K8S_VERSION}'
+KubeDownscaler: true
+BackupInstanceType: t3.medium
+BackupAmiId: ami00a40405a13c972f4
+BackupDisk: 50
+BackupPass: pass
+Hostnames:
+  so: so.eo.idunaas.ericsson.se
+  pf: pf.eo.idunaas.ericsson.se
+  iam: iam.eo.idunaas.ericsson.se
+  uds: uds.eo.idunaas.ericsson.se
+  dashboard: dashboard.eo.idunaas.ericsson.se
+'''
+    with open(path, 'w') as file:
+        file.write(content)
+
+
+@pytest.fixture
+def virtual_clock():
+    """
+    :return: VirtualClock in use during the test
+    """
+    with clock.use_clock(clock.VirtualClock()) as virtual:
+        yield virtual
+
+
+@pytest.fixture
+def fake_aws(monkeypatch):
+    """
+    :return: FakeAws answering the calls of every botocore client created during the test
+    """
+    latency = float(os.environ.get(LATENCY_ENV_VAR, DEFAULT_LATENCY_MS)) / 1000
+    fake = FakeAws(region=REGION, subnet_ids=SUBNET_IDS, latency=latency)
+    create_client = botocore.session.Session.create_client
+
+    def create_fake_client(self, *args, **kwargs):
+        client = create_client(self, *args, **kwargs)
+        fake.register(client)
+        return client
+
+    monkeypatch.setattr(botocore.session.Session, "create_client", create_fake_client)
+    # Clients of the pool created by other tests would not answer with this fake
+    aws_clientpool.reset()
+    yield fake
+    aws_clientpool.reset()
+
+
+@pytest.fixture
+def docker_client(monkeypatch):
+    """
+    :return: FakeDockerClient returned by docker.from_env
+    """
+    client = FakeDockerClient()
+    monkeypatch.setattr(docker, "from_env", lambda **kwargs: client)
+    return client
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch, fake_aws, docker_client, virtual_clock):
+    """
+    Points the commands to a temporary work directory with a configuration file and a copy of the
+    templates, and puts the fake executables first in the PATH
+    :return: Path of the work directory
+    """
+    templates_dir = tmp_path / "templates"
+    shutil.copytree(REPO_TEMPLATES_DIR, str(templates_dir))
+    logs_dir = tmp_path / constants.LOGS_DIRECTORY_NAME
+    logs_dir.mkdir()
+    write_config_file(str(tmp_path / "config.yaml"))
+
+    monkeypatch.setattr(constants, "WORKDIR_PATH", str(tmp_path))
+    monkeypatch.setattr(constants, "CONFIG_FILE_PATH", str(tmp_path / "config.yaml"))
+    monkeypatch.setattr(constants, "LOGS_DIRECTORY_PATH", str(logs_dir))
+    monkeypatch.setattr(constants, "KUBECONFIG_PATH", str(tmp_path / "config"))
+    monkeypatch.setattr(constants, "TEMPLATES_DIR", str(templates_dir))
+    monkeypatch.setattr(constants, "TEMPLATE_BLACKLIST", [str(templates_dir / "ubuntu-deploy.yaml")])
+    monkeypatch.setattr(constants, "INSTALL_STAGE_LOG_PATH", str(tmp_path / ".install_stage.log"))
+    monkeypatch.setattr(constants, "IMAGE_INVENTORY_PATH", str(tmp_path / ".image_inventory.json"))
+    monkeypatch.setattr(constants, "CNI_MANIFEST_IMAGE_CACHE_DIR", str(tmp_path / "cni-manifests"))
+    monkeypatch.setattr(constants, "CNI_MANIFEST_CACHE_DIR", str(tmp_path / ".cni_manifests"))
+    monkeypatch.setattr(constants, "HELM_CHART_IMAGE_CACHE_DIR", str(tmp_path / "charts"))
+    monkeypatch.setattr(constants, "HELM_CHART_CACHE_DIR", str(tmp_path / ".helm_charts"))
+    monkeypatch.setattr(constants, "TEMPORARY_DIR", str(tmp_path))
+
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "benchmark")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "benchmark")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", REGION)
+    monkeypatch.setenv("PATH", os.path.join(BENCHMARKS_DIR, "bin") + os.pathsep + os.environ.get("PATH", ""))
+    monkeypatch.chdir(tmp_path)
+
+    def download(url, out=None, **kwargs):
+        with open(out, 'w') as file:
+            file.write(CNI_MANIFEST)
+        return out
+
+    monkeypatch.setattr(wget, "download", download)
+    return tmp_path
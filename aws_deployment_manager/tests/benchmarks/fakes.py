@@ -0,0 +1,436 @@
+"""
+Local stand-ins for the services used by the commands: an in-memory AWS answering the API calls of
+every botocore client, and a Docker client.
+"""
+
+import base64
+import hashlib
+import itertools
+import threading
+import time
+import uuid
+
+from botocore.awsrequest import AWSResponse
+
+from aws_deployment_manager import constants
+from aws_deployment_manager import utils
+
+ACCOUNT_ID = "123456789012"
+VPC_CIDR = "10.0.0.0/16"
+OIDC_ID = "EXAMPLED539D4633E53DE1B71EXAMPLE"
+PRIVATE_DOMAIN_NAME = "idunaas.ericsson.se"
+
+
+class FakeAwsError(Exception):
+    """ Error response of the fake AWS """
+
+    def __init__(self, code, message, status_code=400):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.status_code = status_code
+
+
+class FakeAws:
+    """
+    In-memory AWS answering the calls of botocore clients through their before-call event.
+    Resources being created, updated or deleted stay in progress for a number of polls, so that
+    the waiters of the commands poll as they do against AWS.
+    Operations without a handler succeed with an empty response.
+    """
+
+    def __init__(self, region, subnet_ids, latency=0.0, polls=2):
+        """
+        :param region: AWS region
+        :param subnet_ids: Subnets of the VPC, as in the configuration file
+        :param latency: Simulated latency of each call in seconds
+        :param polls: Number of polls a resource stays in progress
+        """
+        self.region = region
+        self.subnet_ids = list(subnet_ids)
+        self.latency = latency
+        self.polls = polls
+        self.stacks = {}
+        self.nodegroups = {}
+        self.updates = {}
+        self.buckets = {}
+        self.repositories = {}
+        self.policies = []
+        self.hosted_zones = {}
+        self.changes = {}
+        self.__lock = threading.Lock()
+        self.__ids = itertools.count(1)
+
+    def register(self, client):
+        """
+        Registers the fake on a client, before any other handler of its calls
+        :param client: botocore client
+        """
+        client.meta.events.register_first('before-parameter-build.*.*', self._save_params,
+                                          unique_id='fakeaws-before-parameter-build')
+        client.meta.events.register('before-call.*.*', self._answer, unique_id='fakeaws-before-call')
+
+    @staticmethod
+    def _save_params(params, context, **kwargs):
+        context['fakeaws_params'] = dict(params)
+
+    def _answer(self, model, context, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        service = model.service_model.service_name.replace('-', '_')
+        handler = getattr(self, '_{0}_{1}'.format(service, model.name), None)
+        metadata = {'HTTPStatusCode': 200, 'RequestId': str(uuid.uuid4()), 'HTTPHeaders': {}, 'RetryAttempts': 0}
+        try:
+            with self.__lock:
+                parsed = handler(**context.get('fakeaws_params', {})) if handler else {}
+        except FakeAwsError as error:
+            metadata['HTTPStatusCode'] = error.status_code
+            parsed = {'Error': {'Code': error.code, 'Message': error.message}}
+        parsed['ResponseMetadata'] = metadata
+        return AWSResponse(url='https://fakeaws', status_code=metadata['HTTPStatusCode'], headers={}, raw=None), \
+            parsed
+
+    def _next_id(self, prefix):
+        return "{0}-{1:08x}".format(prefix, next(self.__ids))
+
+    @staticmethod
+    def _progress(resource, done_status):
+        """
+        Moves a resource in progress one poll closer to its final status
+        :return: Current status
+        """
+        if resource['polls'] > 0:
+            resource['polls'] -= 1
+        else:
+            resource['status'] = done_status
+        return resource['status']
+
+    def seed_deployment(self, env_name, k8s_version, instance_type):
+        """
+        Creates the resources of an installed deployment
+        :param env_name: Name of the environment
+        :param k8s_version: K8S version the deployment was installed with
+        :param instance_type: Instance type of the node group
+        """
+        stack_names = [constants.BASE_VPC_STACK_NAME, env_name, env_name + constants.IDUN_ADDITIONAL_SUFFIX_STACK_NAME,
+                       env_name + constants.ALB_CONTROLLER_SUFFIX_STACK_NAME,
+                       env_name + constants.CSI_CONTROLLER_SUFFIX_STACK_NAME]
+        for stack_name in stack_names:
+            self._cloudformation_CreateStack(StackName=stack_name, Parameters=[
+                {'ParameterKey': constants.K8S_VERSION, 'ParameterValue': k8s_version},
+                {'ParameterKey': constants.SECONDARY_VPC_CIDR, 'ParameterValue': '100.64.0.0/16'}])
+            self.stacks[stack_name].update(status='CREATE_COMPLETE', polls=0)
+        cluster_name = utils.get_cluster_name_from_stack(env_name)
+        self._eks_CreateNodegroup(clusterName=cluster_name, nodegroupName=cluster_name + '-Node-Group-seed',
+                                  scalingConfig={'minSize': 2, 'maxSize': 10, 'desiredSize': 2},
+                                  instanceTypes=[instance_type])
+        for nodegroup in self.nodegroups.values():
+            nodegroup.update(status='ACTIVE', polls=0, version=k8s_version)
+        self._iam_CreatePolicy(PolicyName=constants.AUTOSCALER_IAM_POLICY.format(env_name))
+        bucket_name = env_name.lower() + constants.BUCKET_POSTFIX
+        self.buckets[bucket_name] = {constants.VERSION + '/' + name: b'' for name in ('a.yaml', 'b.yaml')}
+        self._route53_CreateHostedZone(Name=PRIVATE_DOMAIN_NAME)
+        self._route53_ChangeResourceRecordSets(HostedZoneId=self.hosted_zones[PRIVATE_DOMAIN_NAME + '.']['Id'],
+                                               ChangeBatch={'Changes': [{'Action': 'CREATE', 'ResourceRecordSet': {
+                                                   'Name': 'so.' + PRIVATE_DOMAIN_NAME + '.', 'Type': 'A'}}]})
+
+    # CloudFormation
+
+    def _stack_outputs(self, stack_name):
+        env_name = stack_name.replace(constants.IDUN_ADDITIONAL_SUFFIX_STACK_NAME, '') \
+            .replace(constants.ALB_CONTROLLER_SUFFIX_STACK_NAME, '') \
+            .replace(constants.CSI_CONTROLLER_SUFFIX_STACK_NAME, '')
+        outputs = {
+            constants.EKS_CLUSTER_NAME: utils.get_cluster_name_from_stack(env_name),
+            constants.EKS_CLUSTER_OIDC: 'oidc.eks.{0}.amazonaws.com/id/{1}'.format(self.region, OIDC_ID),
+            constants.EBS_KMS_KEY_ARN: 'arn:aws:kms:{0}:{1}:key/ebs'.format(self.region, ACCOUNT_ID),
+            constants.POD_SECURITY_GROUP: 'sg-pods',
+            constants.POD_SUBNET_IDS: 'subnet-pod-a,subnet-pod-b',
+            constants.POD_SUBNET_AZS: '{0}a,{0}b'.format(self.region),
+            constants.AWS_ACCOUNT_ID: ACCOUNT_ID,
+            constants.NODE_ROLE_ARN: 'arn:aws:iam::{0}:role/{1}-NodeRole'.format(ACCOUNT_ID, env_name),
+            constants.CSI_CONTROLLER_ROLE_ARN: 'arn:aws:iam::{0}:role/{1}-CSIRole'.format(ACCOUNT_ID, env_name),
+            constants.ENDPOINT_SECURITY_GROUP_ID: 'sg-endpoints',
+            constants.PRIVATE_DOMAIN_NAME: PRIVATE_DOMAIN_NAME,
+        }
+        return [{'OutputKey': key, 'OutputValue': value} for key, value in outputs.items()]
+
+    def _get_stack(self, name):
+        for stack in self.stacks.values():
+            if name in (stack['StackName'], stack['StackId']):
+                return stack
+        raise FakeAwsError('ValidationError', 'Stack with id {0} does not exist'.format(name))
+
+    def _cloudformation_ListStacks(self, **kwargs):
+        return {'StackSummaries': [{'StackName': stack['StackName'], 'StackId': stack['StackId'],
+                                    'StackStatus': stack['status']} for stack in self.stacks.values()]}
+
+    def _cloudformation_CreateStack(self, StackName, Parameters=(), **kwargs):
+        if StackName in self.stacks:
+            raise FakeAwsError('AlreadyExistsException', 'Stack [{0}] already exists'.format(StackName))
+        stack_id = 'arn:aws:cloudformation:{0}:{1}:stack/{2}/{3}'.format(self.region, ACCOUNT_ID, StackName,
+                                                                        self._next_id('stack'))
+        self.stacks[StackName] = {'StackName': StackName, 'StackId': stack_id, 'status': 'CREATE_IN_PROGRESS',
+                                  'polls': self.polls, 'final': 'CREATE_COMPLETE', 'Parameters': list(Parameters)}
+        return {'StackId': stack_id}
+
+    def _cloudformation_UpdateStack(self, StackName, Parameters=(), **kwargs):
+        stack = self._get_stack(StackName)
+        if list(Parameters) == stack['Parameters']:
+            raise FakeAwsError('ValidationError', 'No updates are to be performed.')
+        stack.update(status='UPDATE_IN_PROGRESS', polls=self.polls, final='UPDATE_COMPLETE',
+                     Parameters=list(Parameters))
+        return {'StackId': stack['StackId']}
+
+    def _cloudformation_DeleteStack(self, StackName, **kwargs):
+        stack = self._get_stack(StackName)
+        stack.update(status='DELETE_IN_PROGRESS', polls=self.polls, final='DELETE_COMPLETE')
+        return {}
+
+    def _cloudformation_DescribeStacks(self, StackName, **kwargs):
+        stack = self._get_stack(StackName)
+        status = self._progress(stack, stack['final'])
+        if status == 'DELETE_COMPLETE':
+            del self.stacks[stack['StackName']]
+            raise FakeAwsError('ValidationError', 'Stack with id {0} does not exist'.format(StackName))
+        return {'Stacks': [{'StackName': stack['StackName'], 'StackId': stack['StackId'], 'StackStatus': status,
+                            'Parameters': stack['Parameters'], 'Outputs': self._stack_outputs(stack['StackName'])}]}
+
+    # EKS
+
+    def _eks_DescribeCluster(self, name, **kwargs):
+        return {'cluster': {
+            'name': name, 'status': 'ACTIVE',
+            'resourcesVpcConfig': {'endpointPublicAccess': True, 'endpointPrivateAccess': False},
+            'identity': {'oidc': {'issuer': 'https://oidc.eks.{0}.amazonaws.com/id/{1}'.format(self.region,
+                                                                                               OIDC_ID)}}
+        }}
+
+    def _eks_UpdateClusterConfig(self, name, **kwargs):
+        update_id = self._next_id('update')
+        self.updates[update_id] = {'id': update_id, 'status': 'InProgress', 'polls': self.polls}
+        return {'update': {'id': update_id, 'status': 'InProgress'}}
+
+    def _eks_DescribeUpdate(self, name, updateId, **kwargs):
+        update = self.updates[updateId]
+        return {'update': {'id': updateId, 'status': self._progress(update, 'Successful')}}
+
+    def _eks_CreateNodegroup(self, clusterName, nodegroupName, scalingConfig=None, instanceTypes=(), **kwargs):
+        self.nodegroups[(clusterName, nodegroupName)] = {
+            'nodegroupName': nodegroupName, 'clusterName': clusterName, 'status': 'CREATING', 'polls': self.polls,
+            'final': 'ACTIVE', 'scalingConfig': scalingConfig or {}, 'instanceTypes': list(instanceTypes),
+            'version': None
+        }
+        return {'nodegroup': {'nodegroupName': nodegroupName, 'status': 'CREATING'}}
+
+    def _get_nodegroup(self, cluster_name, nodegroup_name):
+        nodegroup = self.nodegroups.get((cluster_name, nodegroup_name))
+        if nodegroup is None:
+            raise FakeAwsError('ResourceNotFoundException', 'No node group found for name: {0}.'.format(
+                nodegroup_name), status_code=404)
+        return nodegroup
+
+    def _eks_DescribeNodegroup(self, clusterName, nodegroupName, **kwargs):
+        nodegroup = self._get_nodegroup(clusterName, nodegroupName)
+        status = self._progress(nodegroup, nodegroup['final'])
+        if status == 'DELETE_COMPLETE':
+            del self.nodegroups[(clusterName, nodegroupName)]
+            return self._eks_DescribeNodegroup(clusterName, nodegroupName)
+        return {'nodegroup': {key: value for key, value in nodegroup.items() if key not in ('polls', 'final')}}
+
+    def _eks_DeleteNodegroup(self, clusterName, nodegroupName, **kwargs):
+        nodegroup = self._get_nodegroup(clusterName, nodegroupName)
+        nodegroup.update(status='DELETING', polls=self.polls, final='DELETE_COMPLETE')
+        return {'nodegroup': {'nodegroupName': nodegroupName, 'status': 'DELETING'}}
+
+    def _eks_ListNodegroups(self, clusterName, **kwargs):
+        return {'nodegroups': [name for cluster, name in self.nodegroups if cluster == clusterName]}
+
+    # EC2
+
+    def _ec2_DescribeVpcs(self, VpcIds=(), **kwargs):
+        return {'Vpcs': [{'VpcId': vpc_id, 'CidrBlock': VPC_CIDR} for vpc_id in VpcIds]}
+
+    def _ec2_DescribeSubnets(self, SubnetIds=(), **kwargs):
+        return {'Subnets': [{'SubnetId': subnet_id,
+                             'AvailabilityZone': self.region + 'abc'[self.subnet_ids.index(subnet_id) % 3]}
+                            for subnet_id in SubnetIds]}
+
+    def _ec2_DescribeRouteTables(self, **kwargs):
+        return {'RouteTables': [{'RouteTableId': 'rtb-' + subnet_id, 'Associations': [{'SubnetId': subnet_id}]}
+                                for subnet_id in self.subnet_ids]}
+
+    def _ec2_AuthorizeSecurityGroupIngress(self, **kwargs):
+        return {'Return': True}
+
+    def _ec2_RevokeSecurityGroupIngress(self, **kwargs):
+        return {'Return': True}
+
+    # Route53
+
+    def _new_change(self):
+        change_id = '/change/' + self._next_id('C')
+        self.changes[change_id] = {'status': 'PENDING', 'polls': self.polls}
+        return {'Id': change_id, 'Status': 'PENDING'}
+
+    def _get_hosted_zone(self, zone_id):
+        for zone in self.hosted_zones.values():
+            if zone['Id'] == zone_id:
+                return zone
+        raise FakeAwsError('NoSuchHostedZone', 'No hosted zone found with ID: {0}'.format(zone_id), 404)
+
+    def _route53_ListHostedZonesByName(self, DNSName=None, **kwargs):
+        names = sorted(name for name in self.hosted_zones if DNSName is None or name >= DNSName)
+        return {'HostedZones': [{key: value for key, value in self.hosted_zones[name].items() if key != 'records'}
+                                for name in names]}
+
+    def _route53_CreateHostedZone(self, Name, **kwargs):
+        name = Name.rstrip('.') + '.'
+        zone_id = '/hostedzone/' + self._next_id('Z')
+        self.hosted_zones[name] = {'Id': zone_id, 'Name': name, 'records': [
+            {'Name': name, 'Type': 'NS'}, {'Name': name, 'Type': 'SOA'}]}
+        return {'HostedZone': {'Id': zone_id, 'Name': name}, 'ChangeInfo': self._new_change()}
+
+    def _route53_GetChange(self, Id, **kwargs):
+        return {'ChangeInfo': {'Id': Id, 'Status': self._progress(self.changes[Id], 'INSYNC')}}
+
+    def _route53_ChangeResourceRecordSets(self, HostedZoneId, ChangeBatch, **kwargs):
+        zone = self._get_hosted_zone(HostedZoneId)
+        for change in ChangeBatch['Changes']:
+            record = change['ResourceRecordSet']
+            zone['records'] = [existing for existing in zone['records']
+                               if (existing['Name'], existing['Type']) != (record['Name'], record['Type'])]
+            if change['Action'] != 'DELETE':
+                zone['records'].append(record)
+        return {'ChangeInfo': self._new_change()}
+
+    def _route53_ListResourceRecordSets(self, HostedZoneId, **kwargs):
+        return {'ResourceRecordSets': list(self._get_hosted_zone(HostedZoneId)['records'])}
+
+    def _route53_DeleteHostedZone(self, Id, **kwargs):
+        zone = self._get_hosted_zone(Id)
+        del self.hosted_zones[zone['Name']]
+        return {'ChangeInfo': self._new_change()}
+
+    # ELB
+
+    def _elbv2_DescribeLoadBalancers(self, **kwargs):
+        return {'LoadBalancers': [{'LoadBalancerArn': arn, 'CanonicalHostedZoneId': 'Z32O12XQLNTSW2'}
+                                  for arn in kwargs.get('LoadBalancerArns', [])]}
+
+    # S3
+
+    def _s3_ListBuckets(self, **kwargs):
+        return {'Buckets': [{'Name': name} for name in self.buckets]}
+
+    def _s3_CreateBucket(self, Bucket, **kwargs):
+        self.buckets.setdefault(Bucket, {})
+        return {'Location': '/' + Bucket}
+
+    def _s3_PutObject(self, Bucket, Key, **kwargs):
+        self.buckets[Bucket][Key] = b''
+        return {'ETag': '"{0}"'.format(hashlib.md5(Key.encode()).hexdigest())}
+
+    def _s3_ListObjectsV2(self, Bucket, **kwargs):
+        keys = sorted(self.buckets[Bucket])
+        return {'KeyCount': len(keys), 'Contents': [{'Key': key} for key in keys]}
+
+    def _s3_DeleteObjects(self, Bucket, Delete, **kwargs):
+        for item in Delete['Objects']:
+            self.buckets[Bucket].pop(item['Key'], None)
+        return {}
+
+    def _s3_DeleteBucket(self, Bucket, **kwargs):
+        del self.buckets[Bucket]
+        return {}
+
+    # IAM
+
+    def _iam_ListRoles(self, **kwargs):
+        return {'Roles': [{'RoleName': 'AWSReservedSSO_SSO-Consumer-admin_0123456789abcdef',
+                           'Arn': 'arn:aws:iam::{0}:role/sso-admin'.format(ACCOUNT_ID)}]}
+
+    def _iam_CreatePolicy(self, PolicyName, **kwargs):
+        policy = {'PolicyName': PolicyName, 'Arn': 'arn:aws:iam::{0}:policy/{1}'.format(ACCOUNT_ID, PolicyName)}
+        self.policies.append(policy)
+        return {'Policy': policy}
+
+    def _iam_CreateRole(self, RoleName, **kwargs):
+        return {'Role': {'RoleName': RoleName, 'Arn': 'arn:aws:iam::{0}:role/{1}'.format(ACCOUNT_ID, RoleName)}}
+
+    def _iam_CreateOpenIDConnectProvider(self, Url, **kwargs):
+        return {'OpenIDConnectProviderArn': 'arn:aws:iam::{0}:oidc-provider/{1}'.format(
+            ACCOUNT_ID, Url.replace('https://', ''))}
+
+    def _iam_ListPolicies(self, **kwargs):
+        return {'Policies': list(self.policies)}
+
+    def _iam_ListOpenIDConnectProviders(self, **kwargs):
+        return {'OpenIDConnectProviderList': [{'Arn': 'arn:aws:iam::{0}:oidc-provider/oidc.eks.{1}.amazonaws.com/id/'
+                                                      '{2}'.format(ACCOUNT_ID, self.region, OIDC_ID)}]}
+
+    # ECR
+
+    def _ecr_DescribeRegistry(self, **kwargs):
+        return {'registryId': ACCOUNT_ID}
+
+    def _ecr_DescribeRepositories(self, **kwargs):
+        return {'repositories': [{'repositoryName': name, 'imageScanningConfiguration': {'scanOnPush': scan}}
+                                 for name, scan in self.repositories.items()]}
+
+    def _ecr_CreateRepository(self, repositoryName, imageScanningConfiguration=None, **kwargs):
+        if repositoryName in self.repositories:
+            raise FakeAwsError('RepositoryAlreadyExistsException', 'The repository already exists')
+        self.repositories[repositoryName] = (imageScanningConfiguration or {}).get('scanOnPush', False)
+        return {'repository': {'repositoryName': repositoryName}}
+
+    def _ecr_GetAuthorizationToken(self, **kwargs):
+        return {'authorizationData': [{'authorizationToken': base64.b64encode(b'AWS:password').decode()}]}
+
+
+class FakeImage:
+    """ Image of the fake Docker client """
+
+    def tag(self, repository, tag):
+        """ Tags the image """
+        return True
+
+
+class FakeImages:
+    """ Images API of the fake Docker client, counting the pulls and pushes """
+
+    def __init__(self):
+        self.pulled = []
+        self.pushed = []
+
+    def pull(self, repository, tag):
+        """ Pulls an image """
+        self.pulled.append('{0}:{1}'.format(repository, tag))
+        return FakeImage()
+
+    @staticmethod
+    def get(name):
+        """ Gets a pulled image """
+        return FakeImage()
+
+    def push(self, repository, tag, stream=False, decode=False):
+        """ Pushes an image, streaming the progress as docker does """
+        image = '{0}:{1}'.format(repository, tag)
+        self.pushed.append(image)
+        digest = 'sha256:' + hashlib.sha256(image.encode()).hexdigest()
+        return iter([{'status': 'Pushed'}, {'status': '{0}: digest: {1}'.format(tag, digest)},
+                     {'aux': {'Tag': tag, 'Digest': digest, 'Size': 1024}}])
+
+
+class FakeDockerClient:
+    """ Docker client of the benchmarks, no daemon needed """
+
+    def __init__(self, **kwargs):
+        self.images = FakeImages()
+
+    def login(self, username, password, registry):
+        """ Logs in to a registry """
+        return {'Status': 'Login Succeeded'}
+
+    def close(self):
+        """ Closes the client """
@@ -0,0 +1,185 @@
+"""
+Offline benchmarks of the install, upgrade, delete and image commands.
+Each command runs end to end against the local stand-ins of conftest.py, and its wall time, AWS API
+calls per operation, subprocesses, waits and peak RSS are compared to baseline.json.
+A benchmark fails when a command makes more AWS calls, runs more subprocesses or waits longer than
+in the baseline, or when its wall time or memory regress beyond the tolerances.
+
+Run with BENCHMARK_UPDATE_BASELINE=1 to record the current figures as the new baseline.
+"""
+
+import json
+import logging
+import os
+import resource
+import time
+
+import pytest
+
+from aws_deployment_manager import apimetrics
+from aws_deployment_manager import timing
+from aws_deployment_manager.commands.delete import DeleteManager
+from aws_deployment_manager.commands.image import ImageManager
+from aws_deployment_manager.commands.install import InstallManager
+from aws_deployment_manager.commands.upgrade import UpgradeManager
+from aws_deployment_manager.tests.benchmarks import conftest
+
+LOG = logging.getLogger(__name__)
+
+BASELINE_PATH = os.path.join(conftest.BENCHMARKS_DIR, "baseline.json")
+UPDATE_BASELINE_ENV_VAR = "BENCHMARK_UPDATE_BASELINE"
+# Wall time may exceed the baseline by this factor plus this slack before failing, machines differ
+WALL_TIME_TOLERANCE = 1.5
+WALL_TIME_SLACK = 2.0
+PEAK_RSS_TOLERANCE = 1.5
+# The delays of the waiters are randomized by a jitter of up to 10%
+WAITED_SECONDS_TOLERANCE = 1.1
+
+
+def run_install(fake_aws):
+    """ install command """
+    install_manager = InstallManager("user", "pass")
+    install_manager.pre_install()
+    install_manager.install()
+    install_manager.post_install()
+
+
+def run_upgrade(fake_aws):
+    """ upgrade command, from the previous K8S version """
+    fake_aws.seed_deployment(conftest.ENVIRONMENT_NAME, "1.23", conftest.INSTANCE_TYPE)
+    UpgradeManager().upgrade(False)
+
+
+def run_delete(fake_aws):
+    """ delete command """
+    fake_aws.seed_deployment(conftest.ENVIRONMENT_NAME, conftest.K8S_VERSION, conftest.INSTANCE_TYPE)
+    DeleteManager(env_name=conftest.ENVIRONMENT_NAME, region=conftest.REGION).delete()
+
+
+def run_image(fake_aws):
+    """ image command """
+    ImageManager().image(force=True)
+
+
+SCENARIOS = {
+    'install': run_install,
+    'upgrade': run_upgrade,
+    'delete': run_delete,
+    'image': run_image
+}
+
+
+def measure(scenario, fake_aws, virtual_clock):
+    """
+    Runs a scenario and collects its figures
+    :param scenario: Function running the command
+    :param fake_aws: FakeAws of the test
+    :param virtual_clock: VirtualClock of the test
+    :return: Figures as dictionary
+    """
+    timing.reset()
+    apimetrics.reset()
+    start = time.perf_counter()
+    scenario(fake_aws)
+    wall_time = time.perf_counter() - start
+    aws_calls = {"{0}.{1}".format(operation['service'], operation['operation']): operation['calls']
+                 for operation in apimetrics.get_operation_stats()}
+    subprocesses = sum(1 for span in timing.get_spans() if span.category == timing.CATEGORY_SUBPROCESS)
+    return {
+        'wall_time': round(wall_time, 3),
+        'aws_calls': dict(sorted(aws_calls.items())),
+        'total_aws_calls': sum(aws_calls.values()),
+        'subprocesses': subprocesses,
+        'waited_seconds': round(virtual_clock.slept, 1),
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+
+def load_baseline():
+    """
+    :return: Baseline figures per scenario
+    """
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH, 'r') as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(name, figures):
+    """
+    Records the figures of a scenario in the baseline
+    :param name: Name of the scenario
+    :param figures: Figures measured by measure
+    """
+    baseline = load_baseline()
+    baseline[name] = figures
+    with open(BASELINE_PATH, 'w') as baseline_file:
+        json.dump(dict(sorted(baseline.items())), baseline_file, indent=2)
+        baseline_file.write("\n")
+
+
+def find_regressions(figures, baseline):
+    """
+    :param figures: Figures measured by measure
+    :param baseline: Baseline figures of the same scenario
+    :return: List of regressions as messages, empty if there are none
+    """
+    regressions = []
+    for operation, calls in figures['aws_calls'].items():
+        baseline_calls = baseline['aws_calls'].get(operation, 0)
+        if calls > baseline_calls:
+            regressions.append("{0}: {1} calls, baseline {2}".format(operation, calls, baseline_calls))
+    if figures['subprocesses'] > baseline['subprocesses']:
+        regressions.append("subprocesses: {0}, baseline {1}".format(figures['subprocesses'], baseline['subprocesses']))
+    waited_seconds_limit = baseline['waited_seconds'] * WAITED_SECONDS_TOLERANCE
+    if figures['waited_seconds'] > waited_seconds_limit:
+        regressions.append("waited_seconds: {0:.0f}, limit {1:.0f}".format(figures['waited_seconds'],
+                                                                           waited_seconds_limit))
+    wall_time_limit = baseline['wall_time'] * WALL_TIME_TOLERANCE + WALL_TIME_SLACK
+    if figures['wall_time'] > wall_time_limit:
+        regressions.append("wall_time: {0}s, limit {1:.3f}s".format(figures['wall_time'], wall_time_limit))
+    peak_rss_limit = baseline['peak_rss_mb'] * PEAK_RSS_TOLERANCE
+    if figures['peak_rss_mb'] > peak_rss_limit:
+        regressions.append("peak_rss_mb: {0}, limit {1:.1f}".format(figures['peak_rss_mb'], peak_rss_limit))
+    return regressions
+
+
+@pytest.mark.parametrize("name", sorted(SCENARIOS))
+def test_benchmark(name, workdir, fake_aws, virtual_clock):
+    """ Benchmarks a command against the baseline """
+    figures = measure(SCENARIOS[name], fake_aws, virtual_clock)
+    LOG.info("Benchmark {0}: {1}".format(name, json.dumps(figures)))
+
+    if os.environ.get(UPDATE_BASELINE_ENV_VAR):
+        save_baseline(name, figures)
+        return
+
+    baseline = load_baseline()
+    assert name in baseline, "No baseline for {0}, run with {1}=1 to record it".format(name, UPDATE_BASELINE_ENV_VAR)
+    regressions = find_regressions(figures, baseline[name])
+    assert not regressions, "{0} regressed: {1}".format(name, "; ".join(regressions))
+
+
+class TestFindRegressions:
+    """ Class to test the comparison with the baseline """
+    # pylint: disable=no-self-use
+
+    BASELINE = {'wall_time': 1.0, 'aws_calls': {'eks.DescribeNodegroup': 3}, 'total_aws_calls': 3,
+                'subprocesses': 5, 'waited_seconds': 60, 'peak_rss_mb': 100.0}
+
+    def test_same_figures(self):
+        """ Same figures as the baseline """
+        assert not find_regressions(dict(self.BASELINE), self.BASELINE)
+
+    def test_more_calls(self):
+        """ An operation called more often, or a new one """
+        figures = dict(self.BASELINE, aws_calls={'eks.DescribeNodegroup': 4, 'eks.ListNodegroups': 1})
+        assert find_regressions(figures, self.BASELINE) == ["eks.DescribeNodegroup: 4 calls, baseline 3",
+                                                            "eks.ListNodegroups: 1 calls, baseline 0"]
+
+    def test_slower(self):
+        """ Wall time within and beyond the tolerance """
+        assert not find_regressions(dict(self.BASELINE, wall_time=3.0), self.BASELINE)
+        assert find_regressions(dict(self.BASELINE, wall_time=4.0), self.BASELINE) == [
+            "wall_time: 4.0s, limit 3.500s"]
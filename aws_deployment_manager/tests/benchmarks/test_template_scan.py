@@ -0,0 +1,69 @@
+"""
+Offline benchmark of the scan of the images in the shipped templates.
+The scan of yamlhelper.get_image_from_template, with its default workers, is timed against the scan it replaced,
+which loaded every document of every template with the pure-Python safe_load_all. Both must find the same
+images, and the current scan must be faster by at least MIN_SPEEDUP.
+"""
+
+import glob
+import logging
+import time
+
+import yaml
+
+from aws_deployment_manager import constants
+from aws_deployment_manager import yamlhelper
+from aws_deployment_manager.tests.benchmarks import conftest
+
+LOG = logging.getLogger(__name__)
+
+REPEAT = 5
+MIN_SPEEDUP = 2.0
+
+
+def legacy_get_image_from_template(foldername, blacklist):
+    """
+    Scan of the images as done before the documents without images were skipped
+    :param foldername: folder containing the YAML files
+    :param blacklist: list of files to skip
+    :return: set of images
+    """
+    image_set = set()
+    for filename in glob.glob(foldername + '/*.yaml'):
+        if filename in blacklist:
+            continue
+        with open(filename, "rb") as file:
+            try:
+                for data in yaml.safe_load_all(file):
+                    yamlhelper.extract_images(data, image_set, ["image"])
+            except yaml.YAMLError:
+                pass
+    return image_set
+
+
+def best_time(scan):
+    """
+    :param scan: Function scanning the templates
+    :return: Images found and best wall time of REPEAT runs
+    """
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        images = scan()
+        timings.append(time.perf_counter() - start)
+    return images, min(timings)
+
+
+def test_template_scan():
+    """ Benchmarks the scan of the shipped templates against the legacy scan """
+    blacklist = [filename.replace(constants.TEMPLATES_DIR, conftest.REPO_TEMPLATES_DIR)
+                 for filename in constants.TEMPLATE_BLACKLIST]
+    legacy_images, legacy_time = best_time(
+        lambda: legacy_get_image_from_template(conftest.REPO_TEMPLATES_DIR, blacklist))
+    images, scan_time = best_time(lambda: yamlhelper.get_image_from_template(conftest.REPO_TEMPLATES_DIR, blacklist))
+    LOG.info("Template scan: {0:.3f}s, legacy scan: {1:.3f}s, {2} images".format(scan_time, legacy_time,
+                                                                                 len(images)))
+
+    assert images == legacy_images
+    assert scan_time * MIN_SPEEDUP <= legacy_time, \
+        "Template scan took {0:.3f}s, legacy scan {1:.3f}s".format(scan_time, legacy_time)
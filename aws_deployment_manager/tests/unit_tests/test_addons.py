@@ -0,0 +1,102 @@
+"""
+Unit Tests for the updates of the add ons.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from aws_deployment_manager import addons
+from aws_deployment_manager import aio
+from aws_deployment_manager import clock
+from aws_deployment_manager import utils
+
+KUBE_PROXY_IMAGE = "602401143452.dkr.ecr.eu-west-1.amazonaws.com/eks/kube-proxy:v1.23.16-eksbuild.2"
+CORE_DNS_IMAGE = "602401143452.dkr.ecr.eu-west-1.amazonaws.com/eks/coredns:v1.9.3-eksbuild.3"
+AUTO_SCALER_IMAGE = "registry.k8s.io/autoscaling/cluster-autoscaler:v1.23.1"
+
+
+def workload(kind, name, image):
+    """
+    :return: Workload of an add on, rolled out
+    """
+    status = {'observedGeneration': 1, 'desiredNumberScheduled': 2, 'updatedNumberScheduled': 2,
+              'numberAvailable': 2} if kind == 'DaemonSet' else \
+        {'observedGeneration': 1, 'replicas': 1, 'updatedReplicas': 1, 'availableReplicas': 1}
+    return {'kind': kind, 'metadata': {'name': name, 'generation': 1}, 'status': status,
+            'spec': {'replicas': 1, 'template': {'spec': {'containers': [
+                {'name': 'sidecar', 'image': 'sidecar:1.0.0'}, {'name': name, 'image': image}]}}}}
+
+
+WORKLOADS = {'daemonset/kube-proxy': workload('DaemonSet', 'kube-proxy', KUBE_PROXY_IMAGE),
+             'deployment/coredns': workload('Deployment', 'coredns', CORE_DNS_IMAGE),
+             'deployment/cluster-autoscaler': workload('Deployment', 'cluster-autoscaler', AUTO_SCALER_IMAGE)}
+
+
+@pytest.fixture
+def kubectl(monkeypatch):
+    """
+    Fakes kubectl, the image of an add on being set while the one of another is being set
+    :return: List of the executed commands
+    """
+    commands = []
+    setting = []
+
+    async def execute_command_async(command):
+        commands.append(command)
+        words = command.split()
+        if words[1:3] == ['set', 'image']:
+            setting.append(words[3])
+            # The images are set concurrently: each waits until all of them are being set
+            while len(setting) < 2:
+                await asyncio.sleep(0)
+            return ""
+        if '/' in words[2]:
+            return json.dumps({'kind': 'List', 'items': [WORKLOADS[resource] for resource in words[2:5]]})
+        return json.dumps(WORKLOADS["{0}/{1}".format(words[2], words[3])])
+
+    monkeypatch.setattr(utils, 'execute_command_async', execute_command_async)
+    return commands
+
+
+# pylint: disable=no-self-use,redefined-outer-name
+class TestAddOns:
+    """
+    Class to run tests for the updates of the add ons.
+    """
+
+    def test_target_image(self):
+        """Test that only the version of the tag is replaced"""
+        assert addons.get_target_image(KUBE_PROXY_IMAGE, '1.24.10') == \
+            "602401143452.dkr.ecr.eu-west-1.amazonaws.com/eks/kube-proxy:v1.24.10-eksbuild.2"
+        assert addons.get_target_image("registry:5000/cluster-autoscaler:v1.23.1", '1.27.1') == \
+            "registry:5000/cluster-autoscaler:v1.27.1"
+        assert addons.get_target_image("registry:5000/cluster-autoscaler", '1.27.1') == \
+            "registry:5000/cluster-autoscaler"
+
+    def test_changed_add_ons_updated_concurrently(self, kubectl):
+        """Test that the add ons are read at once, and the changed ones set concurrently and waited for"""
+        add_ons = addons.get_add_ons(kube_proxy_version='1.24.10', core_dns_version='1.9.3',
+                                     auto_scaler_version='1.27.1')
+        with clock.use_clock(clock.VirtualClock()):
+            durations = aio.run(addons.update(add_ons, 'kubeconfig'))
+
+        assert sorted(durations) == ['AutoScaler', 'KubeProxy']
+        assert kubectl[0] == 'kubectl get daemonset/kube-proxy deployment/coredns deployment/cluster-autoscaler ' \
+                             '--namespace kube-system --output json --kubeconfig kubeconfig'
+        assert sorted(kubectl[1:3]) == [
+            'kubectl set image daemonset/kube-proxy kube-proxy={0} --namespace kube-system --kubeconfig kubeconfig'
+            .format(addons.get_target_image(KUBE_PROXY_IMAGE, '1.24.10')),
+            'kubectl set image deployment/cluster-autoscaler cluster-autoscaler={0} --namespace kube-system '
+            '--kubeconfig kubeconfig'.format(addons.get_target_image(AUTO_SCALER_IMAGE, '1.27.1'))]
+        assert sorted(kubectl[3:]) == [
+            'kubectl get daemonset kube-proxy -n kube-system --output json --kubeconfig kubeconfig',
+            'kubectl get deployment cluster-autoscaler -n kube-system --output json --kubeconfig kubeconfig']
+
+    def test_nothing_to_update(self, kubectl):
+        """Test that add ons already at their target version are only read"""
+        add_ons = addons.get_add_ons(kube_proxy_version='1.23.16', core_dns_version='1.9.3',
+                                     auto_scaler_version='1.23.1')
+        assert aio.run(addons.update(add_ons, 'kubeconfig')) == {}
+        assert len(kubectl) == 1
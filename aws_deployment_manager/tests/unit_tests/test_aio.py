@@ -0,0 +1,87 @@
+"""
+Unit Tests for the asyncio execution core.
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from aws_deployment_manager import aio
+from aws_deployment_manager import clock
+from aws_deployment_manager import timing
+from aws_deployment_manager import utils
+from aws_deployment_manager import waiter
+from aws_deployment_manager.commands.base import Base
+
+
+# pylint: disable=no-self-use
+class TestAio:
+    """
+    Class to run tests for the asyncio execution core.
+    """
+
+    def test_blocking_operations_run_concurrently(self):
+        """Test that blocking operations run at the same time, their results kept in order"""
+        barrier = threading.Barrier(3, timeout=10)
+
+        def operation(value):
+            barrier.wait()
+            return value
+
+        assert aio.run_concurrently(*[lambda value=value: operation(value) for value in range(3)]) == [0, 1, 2]
+
+    def test_failure_waits_for_other_operations(self):
+        """Test that a failed operation is raised once the other operations have finished"""
+        finished = []
+
+        async def fail():
+            raise Exception("stack failed")
+
+        async def succeed():
+            await asyncio.sleep(0.05)
+            finished.append(True)
+
+        with pytest.raises(Exception, match="stack failed"):
+            aio.run(aio.gather(fail(), succeed()))
+        assert finished == [True]
+
+    def test_async_waits_overlap(self):
+        """Test that waits awaited together overlap, each ending as soon as its state is final"""
+        async def wait_for(polls_needed):
+            polls = []
+
+            async def poll():
+                polls.append(True)
+                return len(polls)
+            return await waiter.wait_async(poll=poll, until=lambda count: count >= polls_needed,
+                                           description="test wait {0}".format(polls_needed),
+                                           backoff=waiter.Backoff(first_delay=2, jitter=0))
+
+        with clock.use_clock(clock.VirtualClock()) as virtual_clock:
+            assert aio.run(aio.gather(wait_for(2), wait_for(3))) == [2, 3]
+        assert sorted(virtual_clock.sleeps) == [2, 2, 4, 4, 8]
+        spans = {span.name: span for span in timing.get_spans()}
+        assert spans['test wait 3'].duration >= 14
+
+    def test_async_command(self):
+        """Test that commands run as asyncio subprocesses, with or without shell, and fail on error"""
+        async def run_commands():
+            return await aio.gather(utils.execute_command_async(['echo', 'kubectl']),
+                                    utils.execute_command_async('echo helm | tr h H'))
+
+        assert aio.run(run_commands()) == ['kubectl\n', 'Helm\n']
+        with pytest.raises(Exception, match='Failed to execute command'):
+            aio.run(utils.execute_command_async('exit 3'))
+        assert [span.name for span in timing.get_spans() if span.category == timing.CATEGORY_SUBPROCESS][-3:] == \
+            ['echo kubectl', 'echo helm | tr', 'exit 3']
+
+    def test_coroutine_stage(self):
+        """Test that a stage can be a coroutine function awaiting a group of operations"""
+        results = []
+
+        async def stage():
+            results.extend(await aio.gather(aio.call(sum, [1, 2]), aio.call(max, [1, 2])))
+
+        Base.run_stage_function(stage)
+        assert results == [3, 2]
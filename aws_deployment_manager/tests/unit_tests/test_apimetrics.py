@@ -0,0 +1,83 @@
+"""
+Unit Tests for the apimetrics module.
+"""
+
+import json
+
+import botocore.session
+import pytest
+from botocore.stub import Stubber
+
+from aws_deployment_manager import apimetrics
+
+
+# pylint: disable=no-self-use, unused-argument
+class TestApiMetrics:
+    """
+    Class to run tests for the apimetrics module.
+    """
+
+    @pytest.fixture(autouse=True)
+    def reset_calls(self):
+        """Starts each test without recorded calls"""
+        apimetrics.reset()
+        yield
+        apimetrics.reset()
+
+    @staticmethod
+    def _stubbed_client():
+        session = botocore.session.get_session()
+        client = session.create_client('cloudformation', region_name='eu-west-1',
+                                       aws_access_key_id='test', aws_secret_access_key='test')
+        apimetrics.instrument(client)
+        return client, Stubber(client)
+
+    def test_calls_aggregated_per_operation(self):
+        """Test that successful and failed calls are recorded per operation"""
+        client, stubber = self._stubbed_client()
+        stubber.add_response('list_stacks', {'StackSummaries': []})
+        stubber.add_response('list_stacks', {'StackSummaries': []})
+        stubber.add_client_error('describe_stacks', service_error_code='ValidationError', http_status_code=400)
+        with stubber:
+            client.list_stacks()
+            client.list_stacks()
+            with pytest.raises(Exception):
+                client.describe_stacks(StackName='missing')
+
+        stats = {operation['operation']: operation for operation in apimetrics.get_operation_stats()}
+        assert stats['ListStacks']['calls'] == 2
+        assert stats['ListStacks']['errors'] == 0
+        assert sum(stats['ListStacks']['histogram']['counts']) == 2
+        assert stats['DescribeStacks']['errors'] == 1
+        assert stats['DescribeStacks']['status_codes'] == {'400': 1}
+        assert stats['DescribeStacks']['service'] == 'cloudformation'
+
+    def test_throttled_attempts_counted(self):
+        """Test that throttled attempts seen by the retry handler are counted"""
+        context = {}
+        operation_model = botocore.session.get_session().get_service_model('ec2').operation_model(
+            'DescribeRouteTables')
+        apimetrics._before_call(model=operation_model, context=context)
+        apimetrics._needs_retry(response=(None, {'Error': {'Code': 'RequestLimitExceeded'}}),
+                                request_dict={'context': context})
+        apimetrics._after_call(context=context,
+                               parsed={'ResponseMetadata': {'HTTPStatusCode': 200, 'RetryAttempts': 1}})
+        stats = apimetrics.get_operation_stats()[0]
+        assert (stats['operation'], stats['throttles'], stats['retries'], stats['errors']) == \
+            ('DescribeRouteTables', 1, 1, 0)
+
+    def test_report_written_as_json_lines(self, tmp_path):
+        """Test that the statistics are written as JSON lines next to the log file"""
+        client, stubber = self._stubbed_client()
+        stubber.add_response('list_stacks', {'StackSummaries': []})
+        with stubber:
+            client.list_stacks()
+        report_path = apimetrics.report(str(tmp_path / 'install.log'))
+        assert report_path == str(tmp_path / 'install_api_calls.jsonl')
+        with open(report_path) as report_file:
+            lines = [json.loads(line) for line in report_file]
+        assert [line['operation'] for line in lines] == ['ListStacks']
+
+    def test_no_report_without_calls(self, tmp_path):
+        """Test that no file is written when no call was made"""
+        assert apimetrics.report(str(tmp_path / 'install.log')) is None
@@ -0,0 +1,58 @@
+"""
+Unit Tests for the AWS client pool.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from aws_deployment_manager import constants
+from aws_deployment_manager.aws import aws_clientpool
+from aws_deployment_manager.aws.aws_base import AwsBase
+
+
+# pylint: disable=no-self-use
+class TestAwsClientPool:
+    """
+    Class to run tests for the AWS client pool.
+    """
+
+    @pytest.fixture(autouse=True)
+    def reset_pool(self):
+        """Starts and ends each test with an empty pool"""
+        aws_clientpool.reset()
+        yield
+        aws_clientpool.reset()
+
+    def test_client_shared_by_wrappers(self):
+        """Test that the wrappers of a region share one client per service"""
+        config = {constants.AWS_REGION: 'eu-west-1'}
+        client = AwsBase(config).create_client(constants.EKS_SERVICE)
+
+        assert AwsBase(config).create_client(constants.EKS_SERVICE) is client
+        assert aws_clientpool.get_client(constants.EKS_SERVICE, 'eu-west-1') is client
+        assert aws_clientpool.get_client(constants.EKS_SERVICE, 'us-east-1') is not client
+        assert client.meta.config.max_pool_connections == constants.AWS_MAX_POOL_CONNECTIONS
+        assert client.meta.config.retries['mode'] == 'adaptive'
+
+    def test_client_created_once_by_concurrent_threads(self):
+        """Test that threads asking for a client at the same time get the same one"""
+        barrier = threading.Barrier(8)
+
+        def get_client():
+            barrier.wait()
+            return aws_clientpool.get_client(constants.S3_SERVICE, 'eu-west-1')
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            clients = list(executor.map(lambda _: get_client(), range(8)))
+        assert len({id(client) for client in clients}) == 1
+
+    def test_resource_per_thread(self):
+        """Test that resources, which are not thread safe, are not shared by threads"""
+        resource = aws_clientpool.get_resource(constants.EC2_SERVICE, 'eu-west-1')
+        assert aws_clientpool.get_resource(constants.EC2_SERVICE, 'eu-west-1') is resource
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            other = executor.submit(aws_clientpool.get_resource, constants.EC2_SERVICE, 'eu-west-1').result()
+        assert other is not resource
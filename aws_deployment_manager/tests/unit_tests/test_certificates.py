@@ -0,0 +1,103 @@
+"""
+Unit Tests for the thumbprint of the OIDC identity provider.
+"""
+
+import shutil
+import socket
+import ssl
+import subprocess
+import threading
+
+import pytest
+
+from aws_deployment_manager import certificates
+
+
+def openssl(*arguments, cwd):
+    """
+    Runs openssl
+    :param arguments: Arguments of openssl
+    :param cwd: Working directory
+    :return: Standard output
+    """
+    return subprocess.run(['openssl', *arguments], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+@pytest.fixture
+def tls_server(tmp_path):
+    """
+    Serves a chain of a leaf certificate signed by a CA on a free port of the loopback interface
+    :return: Port, and SHA-1 fingerprint of the CA computed by openssl
+    """
+    if shutil.which('openssl') is None:
+        pytest.skip("openssl not installed")
+    openssl('req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-keyout', 'ca.key', '-out', 'ca.pem', '-days', '1',
+            '-subj', '/CN=Test Root CA', cwd=tmp_path)
+    openssl('req', '-newkey', 'rsa:2048', '-nodes', '-keyout', 'leaf.key', '-out', 'leaf.csr',
+            '-subj', '/CN=localhost', cwd=tmp_path)
+    openssl('x509', '-req', '-in', 'leaf.csr', '-CA', 'ca.pem', '-CAkey', 'ca.key', '-CAcreateserial',
+            '-out', 'leaf.pem', '-days', '1', cwd=tmp_path)
+    (tmp_path / 'chain.pem').write_text((tmp_path / 'leaf.pem').read_text() + (tmp_path / 'ca.pem').read_text())
+    ca_fingerprint = openssl('x509', '-in', 'ca.pem', '-fingerprint', '-sha1', '-noout', cwd=tmp_path)
+
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(str(tmp_path / 'chain.pem'), str(tmp_path / 'leaf.key'))
+    server = socket.create_server(('127.0.0.1', 0))
+    stopped = threading.Event()
+
+    def serve():
+        while not stopped.is_set():
+            try:
+                connection, _ = server.accept()
+            except OSError:
+                return
+            try:
+                connection.settimeout(5)
+                with context.wrap_socket(connection, server_side=True) as tls_connection:
+                    # Keep the connection open until the client closes it, as a web server would
+                    tls_connection.recv(1)
+            except (OSError, ssl.SSLError):
+                connection.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield server.getsockname()[1], ca_fingerprint.split('=')[1].strip().replace(':', '').lower()
+    stopped.set()
+    server.close()
+
+
+# pylint: disable=no-self-use,redefined-outer-name
+class TestCertificates:
+    """
+    Class to run tests for the thumbprint of the OIDC identity provider.
+    """
+
+    def test_chain_fetched_with_openssl(self, tls_server):
+        """Test that the chain is read with openssl and the last certificate fingerprinted in memory"""
+        port, ca_fingerprint = tls_server
+        chain = certificates.get_certificate_chain('localhost', port)
+        assert len(chain) == 2
+        assert certificates.get_fingerprint(chain[-1]) == ca_fingerprint
+
+    def test_thumbprint_cached_per_issuer_host(self, monkeypatch):
+        """Test that the thumbprint of an issuer host is computed once"""
+        certificates.clear_cache()
+        jwks_hosts = []
+
+        class Response:
+            """ Discovery document of the issuer """
+            def json(self):
+                return {'jwks_uri': 'https://oidc.eks.eu-west-1.amazonaws.com/id/0123/keys'}
+
+        def get_certificate_chain(host):
+            jwks_hosts.append(host)
+            return [b'leaf', b'root']
+
+        monkeypatch.setattr(certificates.requests, 'get', lambda url, timeout: Response())
+        monkeypatch.setattr(certificates, 'get_certificate_chain', get_certificate_chain)
+        thumbprints = [certificates.get_oidc_thumbprint(
+            'https://oidc.eks.eu-west-1.amazonaws.com/id/{0}'.format(cluster_id)) for cluster_id in ['0123', '4567']]
+        certificates.clear_cache()
+
+        assert jwks_hosts == ['oidc.eks.eu-west-1.amazonaws.com']
+        assert thumbprints == [certificates.get_fingerprint(b'root')] * 2
@@ -0,0 +1,65 @@
+"""
+Unit Tests for the clock module.
+"""
+
+import time
+
+from aws_deployment_manager import clock
+from aws_deployment_manager import timing
+from aws_deployment_manager import utils
+
+
+# pylint: disable=no-self-use
+class TestClock:
+    """
+    Class to run tests for the clock module.
+    """
+
+    def test_virtual_sleep(self):
+        """Test that a virtual sleep returns at once and moves the time forward"""
+        virtual_clock = clock.VirtualClock()
+        start, start_counter = virtual_clock.time(), virtual_clock.monotonic()
+        real_start = time.perf_counter()
+        virtual_clock.sleep(3600)
+        virtual_clock.sleep(30)
+
+        assert time.perf_counter() - real_start < 1
+        assert virtual_clock.time() - start >= 3630
+        assert virtual_clock.monotonic() - start_counter >= 3630
+        assert virtual_clock.sleeps == [3600, 30]
+        assert virtual_clock.slept == 3630
+
+    def test_use_clock(self):
+        """Test that the clock is restored after the block"""
+        real_clock = clock.get_clock()
+        virtual_clock = clock.VirtualClock()
+        with clock.use_clock(virtual_clock):
+            assert clock.get_clock() is virtual_clock
+            timing.sleep(180, reason='wait for NGINX controller')
+        assert clock.get_clock() is real_clock
+        assert virtual_clock.sleeps == [180]
+        span = [span for span in timing.get_spans() if span.name == 'wait for NGINX controller'][-1]
+        assert span.duration >= 180
+
+    def test_simulated_waits(self, monkeypatch):
+        """Test that 40 polling cycles of 60 seconds run at full speed with the same polls and deadline"""
+        polls = []
+
+        def get_unhealthy_pods(kubeconfig_path):
+            polls.append(kubeconfig_path)
+            return len(polls) >= 40, []
+
+        monkeypatch.setattr(utils, 'get_unhealthy_pods', get_unhealthy_pods)
+        real_start = time.perf_counter()
+        with clock.use_clock(clock.VirtualClock()) as virtual_clock:
+            assert utils.wait_for_all_pods_to_healthy(kubeconfig_path='config')
+        assert time.perf_counter() - real_start < 1
+        assert len(polls) == 40
+        assert virtual_clock.slept == 40 * 60
+
+        # Deadline of 5 retries, the PODs never become healthy
+        del polls[:]
+        with clock.use_clock(clock.VirtualClock()) as virtual_clock:
+            assert not utils.wait_for_all_pods_to_healthy(kubeconfig_path='config', max_retry=5)
+        assert len(polls) == 6
+        assert virtual_clock.slept == 6 * 60
@@ -0,0 +1,116 @@
+"""
+Unit Tests for the cache of the VPC CNI plugin manifests.
+"""
+
+import pytest
+import wget
+
+from aws_deployment_manager import cnimanifest
+from aws_deployment_manager import constants
+
+MANIFEST = b"""kind: DaemonSet
+spec:
+  template:
+    spec:
+      containers:
+        - image: 602401143452.dkr.ecr.us-west-2.amazonaws.com/amazon-k8s-cni:v1.12.6
+        - image: 602401143452.dkr.ecr.us-west-2.amazonaws.com/amazon-k8s-cni-init:v1.12.6
+"""
+
+
+@pytest.fixture
+def caches(tmp_path, monkeypatch):
+    """
+    Moves the caches and the temporary directory to a temporary path, and fakes the downloads
+    :return: List of the downloaded URLs
+    """
+    monkeypatch.setattr(constants, "CNI_MANIFEST_IMAGE_CACHE_DIR", str(tmp_path / "image"))
+    monkeypatch.setattr(constants, "CNI_MANIFEST_CACHE_DIR", str(tmp_path / "workdir"))
+    monkeypatch.setattr(constants, "TEMPORARY_DIR", str(tmp_path))
+    urls = []
+
+    def download(url, out=None):
+        urls.append(url)
+        with open(out, 'wb') as manifest_file:
+            manifest_file.write(MANIFEST)
+        return out
+
+    monkeypatch.setattr(wget, "download", download)
+    return urls
+
+
+# pylint: disable=no-self-use,redefined-outer-name
+class TestCniManifest:
+    """
+    Class to run tests for the cache of the VPC CNI plugin manifests.
+    """
+
+    def test_manifest_downloaded_once(self, caches):
+        """Test that a manifest is downloaded on a miss and read from the workdir cache afterwards"""
+        assert cnimanifest.get_manifest('1.12.6') == MANIFEST.decode()
+        assert cnimanifest.get_manifest('1.12.6') == MANIFEST.decode()
+        assert caches == [constants.CNI_MANIFEST_URL.format('1.12.6')]
+        assert cnimanifest.read_cached(constants.CNI_MANIFEST_CACHE_DIR, '1.12.6') == MANIFEST
+
+    def test_image_cache_without_internet(self, caches, monkeypatch):
+        """Test that a manifest cached in the image is used without downloading it"""
+        cnimanifest.store(constants.CNI_MANIFEST_IMAGE_CACHE_DIR, '1.12.6', MANIFEST)
+
+        def download(url, out=None):
+            raise OSError("Network is unreachable")
+
+        monkeypatch.setattr(wget, "download", download)
+        assert cnimanifest.get_manifest('1.12.6', expected_digest=cnimanifest.get_digest(MANIFEST)) == \
+            MANIFEST.decode()
+        with pytest.raises(Exception, match='v1.13.2 is not cached and could not be downloaded'):
+            cnimanifest.get_manifest('1.13.2')
+
+    def test_corrupted_manifest_downloaded_again(self, caches):
+        """Test that a cached manifest not matching its digest is downloaded again"""
+        digest = cnimanifest.store(constants.CNI_MANIFEST_CACHE_DIR, '1.12.6', MANIFEST)
+        with open("{0}/{1}.yaml".format(constants.CNI_MANIFEST_CACHE_DIR, digest), 'wb') as manifest_file:
+            manifest_file.write(MANIFEST[:20])
+        assert cnimanifest.get_manifest('1.12.6') == MANIFEST.decode()
+        assert len(caches) == 1
+
+    def test_pinned_digest_mismatch(self, caches):
+        """Test that a downloaded manifest not matching the pinned digest is rejected and not cached"""
+        with pytest.raises(Exception, match='expected 0000'):
+            cnimanifest.get_manifest('1.12.6', expected_digest='0000')
+        assert cnimanifest.read_cached(constants.CNI_MANIFEST_CACHE_DIR, '1.12.6') is None
+
+    def test_set_region(self):
+        """Test that all the images are pointed to the registry of the region"""
+        manifest = cnimanifest.set_region(MANIFEST.decode(), 'eu-west-1')
+        assert 'us-west-2' not in manifest
+        assert manifest.count('602401143452.dkr.ecr.eu-west-1.amazonaws.com') == 2
+
+    def test_prefetch(self, caches, tmp_path):
+        """Test that the manifests of all the supported versions are cached once each"""
+        (tmp_path / 'eks_versions.yaml').write_text('"1.22":\n  CNIPlugin: "1.12.0"\n'
+                                                   '"1.23":\n  CNIPlugin: "1.12.6"\n'
+                                                   '"1.24":\n  CNIPlugin: "1.12.6"\n')
+        assert cnimanifest.prefetch(str(tmp_path / 'image'), str(tmp_path / 'eks_versions.yaml')) == \
+            ['1.12.0', '1.12.6']
+        assert len(caches) == 2
+        assert cnimanifest.get_manifest('1.12.0') == MANIFEST.decode()
+        assert len(caches) == 2
+
+    def test_prefetch_requires_pins(self, caches, tmp_path):
+        """Test that the image prefetch fails on a version not pinned or not matching its pin"""
+        digest = cnimanifest.get_digest(MANIFEST)
+        (tmp_path / 'eks_versions.yaml').write_text('"1.22":\n  CNIPlugin: "1.12.0"\n'
+                                                   '"1.23":\n  CNIPlugin: "1.12.6"\n  CNIPluginSha256: "{0}"\n'
+                                                   .format(digest))
+        with pytest.raises(Exception, match='v1.12.0 downloaded with {0}'.format(digest)):
+            cnimanifest.prefetch(str(tmp_path / 'image'), str(tmp_path / 'eks_versions.yaml'), require_pins=True)
+        assert cnimanifest.read_cached(str(tmp_path / 'image'), '1.12.6') is None
+
+        (tmp_path / 'eks_versions.yaml').write_text('"1.23":\n  CNIPlugin: "1.12.6"\n  CNIPluginSha256: "0000"\n')
+        with pytest.raises(Exception, match='expected 0000'):
+            cnimanifest.prefetch(str(tmp_path / 'image'), str(tmp_path / 'eks_versions.yaml'), require_pins=True)
+
+        (tmp_path / 'eks_versions.yaml').write_text('"1.23":\n  CNIPlugin: "1.12.6"\n  CNIPluginSha256: "{0}"\n'
+                                                   .format(digest))
+        assert cnimanifest.prefetch(str(tmp_path / 'image'), str(tmp_path / 'eks_versions.yaml'),
+                                    require_pins=True) == ['1.12.6']
@@ -0,0 +1,29 @@
+"""
+Unit Tests for the content-addressed file caches.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from aws_deployment_manager import filecache
+
+
+# pylint: disable=no-self-use
+class TestFileCache:
+    """
+    Class to run tests for the content-addressed file caches.
+    """
+
+    def test_store_and_lookup(self, tmp_path):
+        """Test that a stored file is looked up by its key, and not when it does not match its digest"""
+        digest = filecache.store(str(tmp_path), 'prometheus-18.1.1', b'chart', '.tgz')
+        assert filecache.lookup(str(tmp_path), 'prometheus-18.1.1', '.tgz') == \
+            filecache.get_file_path(str(tmp_path), digest, '.tgz')
+        assert filecache.lookup(str(tmp_path), 'prometheus-18.1.1', '.tgz', expected_digest='0000') is None
+        assert filecache.lookup(str(tmp_path), 'prometheus-18.1.2', '.tgz') is None
+
+    def test_concurrent_stores_keep_every_entry(self, tmp_path):
+        """Test that files stored at the same time by several threads are all in the index"""
+        keys = ['chart-{0}'.format(number) for number in range(32)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda key: filecache.store(str(tmp_path), key, key.encode(), '.tgz'), keys))
+        assert all(filecache.lookup(str(tmp_path), key, '.tgz') is not None for key in keys)
@@ -0,0 +1,160 @@
+"""
+Unit Tests for the fleet command.
+"""
+
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import pytest
+
+from aws_deployment_manager.commands import fleet, runner
+from aws_deployment_manager.commands.fleet import FleetManager
+
+CONFIG_TEMPLATE = '''
+EnvironmentName: {name}
+AWSRegion: {region}
+VPCID: vpc-0fleet
+ControlPlaneSubnetIds: subnet-0fleet1,subnet-0fleet2
+WorkerNodeSubnetIds: {worker_node_subnet_ids}
+SecondaryVpcCIDR: 100.64.0.0/16
+DisablePublicAccess: True
+NodeInstanceType: m5.2xlarge
+DiskSize: 20
+MinNodes: 2
+MaxNodes: 10
+SshKeyPairName: fleet-keypair
+PrivateDomainName: idunaas.ericsson.se
+K8SVersion: '1.24'
+KubeDownscaler: true
+BackupInstanceType: t3.medium
+BackupAmiId: ami00a40405a13c972f4
+BackupDisk: 50
+BackupPass: pass
+Hostnames:
+  so: so.eo.idunaas.ericsson.se
+'''
+
+
+def write_environment(fleet_path, name, region, worker_node_subnet_ids='subnet-0fleet1'):
+    """
+    Writes the working directory of an environment of the fleet
+    :param fleet_path: Fleet directory
+    :param name: Name of the environment
+    :param region: Region of the environment
+    :param worker_node_subnet_ids: Worker node subnet IDs of the environment
+    :return: Working directory of the environment
+    """
+    environment_workdir = Path(fleet_path) / name
+    environment_workdir.mkdir()
+    (environment_workdir / 'config.yaml').write_text(CONFIG_TEMPLATE.format(
+        name=name, region=region, worker_node_subnet_ids=worker_node_subnet_ids))
+    return environment_workdir
+
+
+# pylint: disable=no-self-use
+class TestFleet:
+    """
+    Class to run tests for the fleet command.
+    """
+
+    def test_validate_across_fleet(self, tmp_path):
+        """Test that each environment is validated by a worker process, logging to its own working directory"""
+        valid_workdir = write_environment(tmp_path, 'idun-a', 'eu-west-1')
+        invalid_workdir = write_environment(tmp_path, 'idun-b', 'us-east-1',
+                                            worker_node_subnet_ids='subnet-1,subnet-2,subnet-3')
+
+        results = FleetManager(fleet_path=tmp_path, command='validate', max_workers=2).run()
+
+        assert [result['environment'] for result in results] == ['idun-a', 'idun-b']
+        assert [result['status'] for result in results] == [runner.STATUS_SUCCEEDED, runner.STATUS_FAILED]
+        assert results[1]['error'] == 'Configuration File not valid'
+        assert Path(results[0]['log_file']).parent == valid_workdir / 'logs'
+        assert 'Configuration File valid' in Path(results[0]['log_file']).read_text()
+        assert '3 provided' in next((invalid_workdir / 'logs').glob('*_validate.log')).read_text()
+
+    def test_concurrency_capped_per_region(self, tmp_path, monkeypatch):
+        """Test that no more than max_per_region environments of a region run at the same time"""
+        for index in range(4):
+            write_environment(tmp_path, 'idun-eu-{0}'.format(index), 'eu-west-1')
+        for index in range(2):
+            write_environment(tmp_path, 'idun-us-{0}'.format(index), 'us-east-1')
+        lock = threading.Lock()
+        running = Counter()
+        peaks = Counter()
+
+        def run_environment(command, workdir_path, options):
+            region = 'eu-west-1' if '-eu-' in workdir_path else 'us-east-1'
+            with lock:
+                running[region] += 1
+                peaks[region] = max(peaks[region], running[region])
+                peaks['total'] = max(peaks['total'], sum(running.values()))
+            time.sleep(0.05)
+            with lock:
+                running[region] -= 1
+            return {'status': runner.STATUS_SUCCEEDED, 'time_taken': 0.05, 'log_file': 'log', 'error': None}
+
+        monkeypatch.setattr(fleet, 'ProcessPoolExecutor',
+                            lambda max_workers, mp_context: ThreadPoolExecutor(max_workers=max_workers))
+        monkeypatch.setattr(fleet, 'run_environment', run_environment)
+
+        results = FleetManager(fleet_path=tmp_path, command='upgrade', max_workers=3, max_per_region=2).run()
+
+        assert len(results) == 6
+        assert peaks['eu-west-1'] == 2
+        assert peaks['us-east-1'] <= 2
+        assert peaks['total'] == 3
+
+    def test_broken_worker_processes(self, tmp_path, monkeypatch):
+        """Test that the environments not run when a worker process died are reported as failed"""
+        for name in ['idun-a', 'idun-b', 'idun-c']:
+            write_environment(tmp_path, name, 'eu-west-1')
+
+        class BrokenPoolExecutor(ThreadPoolExecutor):
+            """ Pool whose worker process dies running the first environment """
+
+            def submit(self, *args, **kwargs):  # pylint: disable=arguments-differ
+                if getattr(self, 'broken', False):
+                    raise BrokenProcessPool('A child process terminated abruptly')
+                self.broken = True  # pylint: disable=attribute-defined-outside-init
+                future = Future()
+                future.set_exception(BrokenProcessPool('A process in the process pool was terminated abruptly'))
+                return future
+
+        monkeypatch.setattr(fleet, 'ProcessPoolExecutor',
+                            lambda max_workers, mp_context: BrokenPoolExecutor(max_workers=max_workers))
+
+        results = FleetManager(fleet_path=tmp_path, command='validate', max_workers=1).run()
+
+        assert [result['environment'] for result in results] == ['idun-a', 'idun-b', 'idun-c']
+        assert [result['status'] for result in results] == [runner.STATUS_FAILED] * 3
+        assert results[0]['error'].startswith('Worker process failed')
+        assert results[2]['error'].startswith('Not run, the worker processes are broken')
+        assert len(fleet.format_results(results)) == 4
+
+    def test_results_table(self):
+        """Test that the results are formatted as an aligned table"""
+        results = [
+            {'environment': 'idun-a', 'region': 'eu-west-1', 'command': 'delete',
+             'status': runner.STATUS_SUCCEEDED, 'time_taken': 125.2, 'log_file': '/fleet/idun-a/logs/delete.log',
+             'error': None},
+            {'environment': 'idun-long-name', 'region': 'us-east-1', 'command': 'delete',
+             'status': runner.STATUS_FAILED, 'time_taken': None, 'log_file': None, 'error': 'Worker process failed'}
+        ]
+
+        lines = fleet.format_results(results)
+
+        assert lines[1].split() == ['idun-a', 'eu-west-1', 'delete', 'succeeded', '0:02:05',
+                                    '/fleet/idun-a/logs/delete.log']
+        assert lines[2].split()[3:] == ['failed', '-', 'Worker', 'process', 'failed']
+        assert lines[0].index('REGION') == lines[1].index('eu-west-1') == lines[2].index('us-east-1')
+
+    def test_invalid_fleet(self, tmp_path):
+        """Test that unsupported commands and directories without environments are rejected"""
+        with pytest.raises(Exception, match='can not be run across a fleet'):
+            FleetManager(fleet_path=tmp_path, command='install')
+        with pytest.raises(Exception, match='No environment found'):
+            FleetManager(fleet_path=tmp_path, command='validate')
@@ -0,0 +1,85 @@
+"""
+Unit Tests for the vendored Helm charts.
+"""
+
+import os
+import shlex
+
+import pytest
+
+from aws_deployment_manager import constants
+from aws_deployment_manager import helmcharts
+
+ARCHIVE = b"\x1f\x8b chart archive"
+
+
+@pytest.fixture
+def caches(tmp_path, monkeypatch):
+    """
+    Moves the caches and the temporary directory to a temporary path, and fakes helm pull
+    :return: List of the pulled charts, as (name, version)
+    """
+    monkeypatch.setattr(constants, "HELM_CHART_IMAGE_CACHE_DIR", str(tmp_path / "image"))
+    monkeypatch.setattr(constants, "HELM_CHART_CACHE_DIR", str(tmp_path / "workdir"))
+    monkeypatch.setattr(constants, "TEMPORARY_DIR", str(tmp_path))
+    pulled = []
+
+    def execute_command(command):
+        arguments = shlex.split(command)
+        assert arguments[:2] == ['helm', 'pull']
+        name = arguments[2]
+        version = arguments[arguments.index('--version') + 1]
+        destination = arguments[arguments.index('--destination') + 1]
+        pulled.append((name, version))
+        with open(os.path.join(destination, "{0}-{1}.tgz".format(name, version)), 'wb') as archive:
+            archive.write(ARCHIVE)
+        return ""
+
+    monkeypatch.setattr(helmcharts.utils, "execute_command", execute_command)
+    return pulled
+
+
+# pylint: disable=no-self-use,redefined-outer-name
+class TestHelmCharts:
+    """
+    Class to run tests for the vendored Helm charts.
+    """
+
+    def test_chart_pulled_once(self, caches, tmp_path):
+        """Test that a chart is pulled on a miss and taken from the workdir cache afterwards"""
+        path = helmcharts.get_chart(constants.HELM_CHART_PROMETHEUS, '18.1.1')
+        assert helmcharts.get_chart(constants.HELM_CHART_PROMETHEUS, '18.1.1') == path
+        assert caches == [(constants.HELM_CHART_PROMETHEUS, '18.1.1')]
+        assert path.startswith(constants.HELM_CHART_CACHE_DIR)
+        with open(path, 'rb') as archive:
+            assert archive.read() == ARCHIVE
+        assert sorted(os.listdir(tmp_path)) == ['workdir']
+
+    def test_image_cache_preferred(self, caches, tmp_path):
+        """Test that a chart vendored in the image is used without pulling it"""
+        (tmp_path / 'eks_versions.yaml').write_text('"1.23":\n  AWSLbControllerChart: "1.5.3"\n')
+        helmcharts.prefetch(constants.HELM_CHART_IMAGE_CACHE_DIR, str(tmp_path / 'eks_versions.yaml'))
+        del caches[:]
+        path = helmcharts.get_chart(constants.HELM_CHART_CSI_DRIVER, constants.CSI_DRIVER_CHART_VERSION)
+        assert path.startswith(constants.HELM_CHART_IMAGE_CACHE_DIR)
+        assert caches == []
+
+    def test_pinned_charts(self, tmp_path):
+        """Test that the load balancer controller chart is pinned per Kubernetes version, once per version"""
+        (tmp_path / 'eks_versions.yaml').write_text('"1.22":\n  AWSLbControllerChart: "1.4.5"\n'
+                                                   '"1.23":\n  AWSLbControllerChart: "1.5.3"\n'
+                                                   '"1.24":\n  AWSLbControllerChart: "1.5.3"\n')
+        assert helmcharts.get_pinned_charts(str(tmp_path / 'eks_versions.yaml')) == [
+            (constants.HELM_CHART_CSI_DRIVER, constants.CSI_DRIVER_CHART_VERSION),
+            (constants.HELM_CHART_PROMETHEUS, constants.PROMETHEUS_CHART_VERSION),
+            (constants.HELM_CHART_ALB_CONTROLLER, '1.4.5'),
+            (constants.HELM_CHART_ALB_CONTROLLER, '1.5.3')]
+
+    def test_prefetch(self, caches, tmp_path):
+        """Test that the charts are pulled once each, and not again when already cached"""
+        (tmp_path / 'eks_versions.yaml').write_text('"1.23":\n  AWSLbControllerChart: "1.5.3"\n')
+        keys = helmcharts.prefetch(str(tmp_path / 'image'), str(tmp_path / 'eks_versions.yaml'))
+        assert keys == ['aws-ebs-csi-driver-2.19.0', 'prometheus-18.1.1', 'aws-load-balancer-controller-1.5.3']
+        assert len(caches) == 3
+        helmcharts.prefetch(str(tmp_path / 'image'), str(tmp_path / 'eks_versions.yaml'))
+        assert len(caches) == 3
@@ -0,0 +1,89 @@
+"""
+Unit Tests for the state of the Helm releases.
+"""
+
+import json
+
+import pytest
+
+from aws_deployment_manager import constants
+from aws_deployment_manager import helmreleases
+from aws_deployment_manager import utils
+
+
+@pytest.fixture
+def chart(tmp_path):
+    """
+    :return: Path of a chart archive
+    """
+    path = tmp_path / 'aws-ebs-csi-driver-2.19.0.tgz'
+    path.write_bytes(b"\x1f\x8b chart archive")
+    return str(path)
+
+
+def fake_helm_status(monkeypatch, release):
+    """
+    Fakes helm status
+    :param release: Release returned as JSON, or None if it is not installed
+    :return: List of the executed commands
+    """
+    commands = []
+
+    def execute_command(command):
+        commands.append(command)
+        if release is None:
+            raise Exception("Failed to execute command - {0}. Error is - Error: release: not found".format(command))
+        return json.dumps(release)
+
+    monkeypatch.setattr(utils, 'execute_command', execute_command)
+    return commands
+
+
+def deployed_release(version, description, status='deployed'):
+    """
+    :return: Release as returned by helm status
+    """
+    return {'name': 'aws-ebs-csi-driver', 'namespace': 'kube-system',
+            'info': {'status': status, 'description': description},
+            'chart': {'metadata': {'name': 'aws-ebs-csi-driver', 'version': version}}}
+
+
+# pylint: disable=no-self-use,redefined-outer-name
+class TestHelmReleases:
+    """
+    Class to run tests for the state of the Helm releases.
+    """
+
+    def test_digest_of_chart_and_values(self, chart, tmp_path):
+        """Test that the digest changes with the chart archive and with any value"""
+        digest = helmreleases.get_release_digest(chart, 'controller:\n  replicas: 2\n', 'eu-west-1')
+        assert helmreleases.get_release_digest(chart, 'controller:\n  replicas: 2\n', 'eu-west-1') == digest
+        assert helmreleases.get_release_digest(chart, 'controller:\n  replicas: 3\n', 'eu-west-1') != digest
+        assert helmreleases.get_release_digest(chart, 'controller:\n  replicas: 2\neu-west-1') != digest
+        other_chart = tmp_path / 'other.tgz'
+        other_chart.write_bytes(b"\x1f\x8b other chart archive")
+        assert helmreleases.get_release_digest(str(other_chart), 'controller:\n  replicas: 2\n', 'eu-west-1') != \
+            digest
+
+    def test_up_to_date(self, chart, monkeypatch):
+        """Test that a release deployed with the same chart version and digest is up to date, with one helm call"""
+        digest = helmreleases.get_release_digest(chart, 'values')
+        commands = fake_helm_status(monkeypatch, deployed_release('2.19.0', helmreleases.get_description(digest)))
+        assert helmreleases.is_up_to_date('aws-ebs-csi-driver', 'kube-system', '2.19.0', digest)
+        assert commands == [constants.COMMAND_HELM_STATUS.format('aws-ebs-csi-driver', 'kube-system',
+                                                                 constants.KUBECONFIG_PATH)]
+
+    @pytest.mark.parametrize('release', [
+        None,
+        deployed_release('2.18.0', helmreleases.get_description('{digest}')),
+        deployed_release('2.19.0', helmreleases.get_description('0000')),
+        deployed_release('2.19.0', 'Upgrade complete'),
+        deployed_release('2.19.0', helmreleases.get_description('{digest}'), status='failed')
+    ])
+    def test_not_up_to_date(self, chart, monkeypatch, release):
+        """Test that a release not installed, or deployed with another chart version, digest or status is upgraded"""
+        digest = helmreleases.get_release_digest(chart, 'values')
+        if release is not None:
+            release['info']['description'] = release['info']['description'].format(digest=digest)
+        fake_helm_status(monkeypatch, release)
+        assert not helmreleases.is_up_to_date('aws-ebs-csi-driver', 'kube-system', '2.19.0', digest)
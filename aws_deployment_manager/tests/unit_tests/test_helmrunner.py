@@ -0,0 +1,90 @@
+"""
+Unit Tests for the runner of the Helm release operations.
+"""
+
+import threading
+
+import pytest
+
+from aws_deployment_manager import constants
+from aws_deployment_manager import helmrunner
+from aws_deployment_manager import utils
+from aws_deployment_manager.stagescheduler import StageScheduler
+from aws_deployment_manager.helmrunner import HelmOperation
+
+
+@pytest.fixture
+def cache_homes(monkeypatch, tmp_path):
+    """
+    Fakes the execution of the commands
+    :return: HELM_CACHE_HOME of the executed commands by command, None when not set
+    """
+    monkeypatch.setattr(constants, "HELM_CACHE_DIR", str(tmp_path))
+    commands = {}
+
+    def execute_command(command, env=None):
+        commands[command] = (env or {}).get('HELM_CACHE_HOME')
+        return ""
+
+    monkeypatch.setattr(utils, "execute_command", execute_command)
+    return commands
+
+
+# pylint: disable=no-self-use,redefined-outer-name
+class TestHelmRunner:
+    """
+    Class to run tests for the runner of the Helm release operations.
+    """
+
+    def test_cache_home_per_release(self, cache_homes, tmp_path):
+        """Test that the helm commands of an operation use the cache of its release, and others the default one"""
+        helmrunner.run([HelmOperation('prometheus', lambda: helmrunner.execute_command('helm install prometheus')),
+                        HelmOperation('aws-ebs-csi-driver',
+                                      lambda: helmrunner.execute_command('helm upgrade aws-ebs-csi-driver'))])
+        helmrunner.execute_command('helm ls')
+        assert cache_homes == {'helm install prometheus': str(tmp_path / 'prometheus'),
+                               'helm upgrade aws-ebs-csi-driver': str(tmp_path / 'aws-ebs-csi-driver'),
+                               'helm ls': None}
+
+    def test_operations_run_concurrently(self):
+        """Test that the operations run at the same time and their results are returned by release"""
+        barrier = threading.Barrier(2, timeout=5)
+
+        def operation():
+            barrier.wait()
+            return helmrunner.get_release()
+
+        assert helmrunner.run([HelmOperation('prometheus', operation),
+                               HelmOperation('aws-ebs-csi-driver', operation)]) == \
+            {'prometheus': 'prometheus', 'aws-ebs-csi-driver': 'aws-ebs-csi-driver'}
+
+    def test_failures_collected_per_release(self):
+        """Test that a failed operation does not stop the others, and that failures are reported per release"""
+        finished = []
+
+        def fail(message):
+            raise Exception(message)
+
+        with pytest.raises(Exception, match='timed out') as single_failure:
+            helmrunner.run([HelmOperation('prometheus', lambda: fail('timed out')),
+                            HelmOperation('aws-ebs-csi-driver', lambda: finished.append('aws-ebs-csi-driver'))])
+        assert not isinstance(single_failure.value, helmrunner.HelmOperationsFailedError)
+        assert finished == ['aws-ebs-csi-driver']
+
+        with pytest.raises(helmrunner.HelmOperationsFailedError) as failures:
+            helmrunner.run([HelmOperation('prometheus', lambda: fail('timed out')),
+                            HelmOperation('aws-ebs-csi-driver', lambda: fail('forbidden')),
+                            HelmOperation('aws-load-balancer-controller', lambda: None)])
+        assert sorted(failures.value.failures) == ['aws-ebs-csi-driver', 'prometheus']
+        assert 'Release prometheus failed: timed out' in str(failures.value)
+
+    def test_release_stage(self, cache_homes, tmp_path):
+        """Test that a release stage runs in the stage machinery with the cache of its release"""
+        stage = helmrunner.release_stage('configure.deploy.prometheus', 'prometheus',
+                                         lambda: helmrunner.execute_command('helm install prometheus'),
+                                         depends_on=['configure.deploy.nginx.controller'])
+        assert stage.depends_on == ('configure.deploy.nginx.controller',)
+        StageScheduler(execute=lambda stage: stage.func(), max_workers=2).run(
+            [helmrunner.release_stage('configure.deploy.nginx.controller', 'ingress-nginx', lambda: None), stage])
+        assert cache_homes == {'helm install prometheus': str(tmp_path / 'prometheus')}
+        assert helmrunner.get_release() is None
@@ -2,9 +2,13 @@
 Unit Tests for the backup module.
 """
 
+import json
+import types
+
 import pytest
 
 import aws_deployment_manager.commands.image as image
+from aws_deployment_manager import constants
 
 # pylint: disable=no-self-use, protected-access, unused-argument, unused-variable, trailing-whitespace, trailing-newlines
 @pytest.mark.usefixtures("setup_config_file")
@@ -26,3 +30,122 @@ class TestImage:
         assert isinstance(img, dict)
         assert img['repository'] == 'repo'
         assert img['tag'] == 'tag'
+
+
+class RepositoryAlreadyExistsException(Exception):
+    """Error of the ECR client when a repository is created twice"""
+
+
+class LifecyclePolicyNotFoundException(Exception):
+    """Error of the ECR client when a repository has no lifecycle policy"""
+
+
+class FakeEcrClient:
+    """Minimal in-memory stand-in for the ECR client"""
+
+    exceptions = types.SimpleNamespace(RepositoryAlreadyExistsException=RepositoryAlreadyExistsException,
+                                       LifecyclePolicyNotFoundException=LifecyclePolicyNotFoundException)
+
+    def __init__(self, repositories, page_size=2, lifecycle_policies=None):
+        self.repositories = dict(repositories)
+        self.page_size = page_size
+        self.describe_calls = 0
+        self.created = []
+        self.lifecycle_policies = dict(lifecycle_policies or {})
+        self.lifecycle_updates = []
+        self.scan_updates = []
+
+    def get_paginator(self, operation_name):
+        """Returns a paginator over the known repositories"""
+        assert operation_name == 'describe_repositories'
+        return self
+
+    def paginate(self):
+        """Yields the repositories in pages, one describe call per page"""
+        names = sorted(self.repositories)
+        for start in range(0, max(len(names), 1), self.page_size):
+            self.describe_calls += 1
+            yield {'repositories': [
+                {'repositoryName': name,
+                 'imageScanningConfiguration': {'scanOnPush': self.repositories[name]}}
+                for name in names[start:start + self.page_size]]}
+
+    def create_repository(self, repositoryName, imageScanningConfiguration):
+        """Records the created repository"""
+        self.created.append(repositoryName)
+        self.repositories[repositoryName] = imageScanningConfiguration['scanOnPush']
+
+    def get_lifecycle_policy(self, repositoryName):
+        """Returns the lifecycle policy of a repository"""
+        if repositoryName not in self.lifecycle_policies:
+            raise LifecyclePolicyNotFoundException(repositoryName)
+        return {'lifecyclePolicyText': self.lifecycle_policies[repositoryName]}
+
+    def put_lifecycle_policy(self, repositoryName, lifecyclePolicyText):
+        """Records the lifecycle policy"""
+        self.lifecycle_updates.append(repositoryName)
+        self.lifecycle_policies[repositoryName] = lifecyclePolicyText
+
+    def put_image_scanning_configuration(self, repositoryName, imageScanningConfiguration):
+        """Records the scanning configuration update"""
+        self.scan_updates.append(repositoryName)
+        self.repositories[repositoryName] = imageScanningConfiguration['scanOnPush']
+
+
+class TestImageRepoProvisioning:
+    """
+    Class to run tests for the ECR repository provisioning of the image module.
+    """
+
+    @staticmethod
+    def _image_manager(ecr):
+        manager = image.ImageManager.__new__(image.ImageManager)
+        manager._ecr = ecr
+        return manager
+
+    def test_create_only_missing_repos(self):
+        """Test that only the missing repos are created and the listing is paginated"""
+        policy = json.dumps(constants.ECR_LIFECYCLE_POLICY)
+        ecr = FakeEcrClient({'proj/a': True, 'proj/b': True, 'proj/c': True},
+                            lifecycle_policies={'proj/a': policy, 'proj/b': policy})
+        images = ['REG/proj/a:1.0', 'REG/proj/b:2.0', 'REG/proj/d:1.0', 'REG/proj/e:1.0', 'REG/proj/d:1.1']
+        self._image_manager(ecr)._create_repo_in_aws_ecr_if_required(images)
+        assert ecr.describe_calls == 2
+        assert sorted(ecr.created) == ['proj/d', 'proj/e']
+        assert sorted(ecr.lifecycle_updates) == ['proj/d', 'proj/e']
+        assert ecr.scan_updates == []
+
+    def test_update_existing_repos(self):
+        """Test that existing repos without scan on push or the lifecycle policy get them, and only them"""
+        policy = json.dumps(constants.ECR_LIFECYCLE_POLICY)
+        ecr = FakeEcrClient({'proj/a': False, 'proj/b': True, 'proj/c': True},
+                            lifecycle_policies={'proj/a': policy, 'proj/c': policy})
+        self._image_manager(ecr)._create_repo_in_aws_ecr_if_required(
+            ['REG/proj/a:1.0', 'REG/proj/b:1.0', 'REG/proj/c:1.0'])
+        assert ecr.created == []
+        assert ecr.scan_updates == ['proj/a']
+        assert ecr.lifecycle_updates == ['proj/b']
+        assert ecr.lifecycle_policies['proj/b'] == policy
+
+    def test_repo_created_since_listing(self):
+        """Test that a repo created by another run since the listing still gets the lifecycle policy"""
+        ecr = FakeEcrClient({})
+
+        def create_repository_mock(repositoryName, imageScanningConfiguration):
+            raise RepositoryAlreadyExistsException(repositoryName)
+
+        ecr.create_repository = create_repository_mock
+        self._image_manager(ecr)._create_repo_in_aws_ecr_if_required(['REG/proj/a:1.0'])
+        assert ecr.lifecycle_updates == ['proj/a']
+
+    def test_create_repo_failure(self):
+        """Test that a failure in the creation of a repo is reported"""
+        ecr = FakeEcrClient({})
+
+        def create_repository_mock(repositoryName, imageScanningConfiguration):
+            raise Exception('This is a good failure!')
+
+        ecr.create_repository = create_repository_mock
+        with pytest.raises(Exception) as exception:
+            self._image_manager(ecr)._create_repo_in_aws_ecr_if_required(['REG/proj/a:1.0'])
+        assert str(exception.value) == 'Failed to set up the following repos in AWS: proj/a'
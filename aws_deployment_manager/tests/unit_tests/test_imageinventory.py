@@ -0,0 +1,85 @@
+"""
+Unit Tests for the imageinventory module.
+"""
+
+import json
+
+from aws_deployment_manager import constants
+from aws_deployment_manager import imageinventory
+
+TEST_TEMPLATE_CONTENT = """
+image: mydockerimage:mytag
+---
+image:
+  repository: myrepo
+  tag: mytag
+"""
+
+TEST_RENDERED_CHART_CONTENT = """
+image: chartimage:1.0
+"""
+
+
+# pylint: disable=no-self-use, unused-argument
+class TestImageInventory:
+    """
+    Class to run tests for the imageinventory module.
+    """
+
+    @staticmethod
+    def _setup(tmp_path, monkeypatch):
+        templates_dir = tmp_path / 'templates'
+        templates_dir.mkdir()
+        (templates_dir / 'test.yaml').write_text(TEST_TEMPLATE_CONTENT)
+        (templates_dir / constants.TEMPLATE_PROMETHEUS_VALUES).write_text('values: {}\n')
+        (templates_dir / constants.TEMPLATE_CSI_VALUES).write_text('values: {}\n')
+        commands = []
+
+        def execute_command_mock(command):
+            commands.append(command)
+            return TEST_RENDERED_CHART_CONTENT
+
+        monkeypatch.setattr(imageinventory.utils, 'execute_command', execute_command_mock)
+        monkeypatch.setattr(imageinventory.helmcharts, 'get_chart',
+                            lambda name, version: '/charts/{0}-{1}.tgz'.format(name, version))
+        return str(templates_dir), str(tmp_path / 'inventory.json'), commands
+
+    def test_build_inventory(self, tmp_path, monkeypatch):
+        """Test the inventory is built from the templates and the rendered charts"""
+        templates_dir, path, commands = self._setup(tmp_path, monkeypatch)
+        images = imageinventory.get_images(templates_dir=templates_dir, blacklist=[], path=path)
+        assert images == ['chartimage:1.0', 'mydockerimage:mytag', 'myrepo:mytag']
+        assert len(commands) == 2
+        assert all(' /charts/' in command for command in commands)
+        with open(path) as inventory_file:
+            assert json.load(inventory_file)['images'] == images
+
+    def test_inventory_reused_when_inputs_unchanged(self, tmp_path, monkeypatch):
+        """Test the charts are not rendered again when the inputs did not change"""
+        templates_dir, path, commands = self._setup(tmp_path, monkeypatch)
+        imageinventory.get_images(templates_dir=templates_dir, blacklist=[], path=path)
+        del commands[:]
+        images = imageinventory.get_images(templates_dir=templates_dir, blacklist=[], path=path)
+        assert commands == []
+        assert images == ['chartimage:1.0', 'mydockerimage:mytag', 'myrepo:mytag']
+
+    def test_inventory_rebuilt_when_template_changes(self, tmp_path, monkeypatch):
+        """Test the inventory is rebuilt when a template changes, keeping known digests"""
+        templates_dir, path, commands = self._setup(tmp_path, monkeypatch)
+        imageinventory.get_images(templates_dir=templates_dir, blacklist=[], path=path)
+        imageinventory.record_image_digests({'myrepo:mytag': 'sha256:1234', 'unknown:1.0': 'sha256:5678'},
+                                            path=path)
+        with open(templates_dir + '/other.yaml', 'w') as template_file:
+            template_file.write('image: otherimage:2.0\n')
+        del commands[:]
+        images = imageinventory.get_images(templates_dir=templates_dir, blacklist=[], path=path)
+        assert len(commands) == 2
+        assert 'otherimage:2.0' in images
+        inventory = imageinventory.load_image_inventory(path)
+        assert inventory['digests'] == {'myrepo:mytag': 'sha256:1234'}
+
+    def test_malformed_inventory_ignored(self, tmp_path):
+        """Test that an unreadable inventory is treated as missing"""
+        path = tmp_path / 'inventory.json'
+        path.write_text('not json')
+        assert imageinventory.load_image_inventory(str(path)) is None
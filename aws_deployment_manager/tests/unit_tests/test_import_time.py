@@ -0,0 +1,52 @@
+"""
+Unit Tests for the start up time of the CLI, measured with python -X importtime.
+"""
+
+import os
+import subprocess
+import sys
+
+REPOSITORY_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+# Modules only needed by the commands, which must not be loaded to start the CLI
+COMMAND_DEPENDENCIES = ['boto3', 'botocore', 'docker', 'wget', 'requests', 'cerberus', 'packaging']
+CLI_MODULE = 'aws_deployment_manager.aws_deployment_manager'
+# Cumulative import time of the CLI module, it was about 400 ms when all the managers were imported
+IMPORT_TIME_BUDGET_MS = 200
+
+
+def import_times(*args):
+    """
+    Runs python -X importtime with the arguments
+    :return: Cumulative import time in microseconds by module
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + list(args), cwd=REPOSITORY_PATH,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    times = {}
+    for line in result.stderr.decode('utf-8').splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # import time: self [us] | cumulative | imported package
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+# pylint: disable=no-self-use
+class TestImportTime:
+    """
+    Class to run tests for the start up time of the CLI.
+    """
+
+    def test_help_does_not_import_commands(self):
+        """Test that --help loads neither the managers nor their dependencies"""
+        times = import_times('-m', 'aws_deployment_manager', '--help')
+
+        loaded = [name for name in times
+                  if name.split('.')[0] in COMMAND_DEPENDENCIES or name.startswith('aws_deployment_manager.commands')]
+        assert not loaded
+
+    def test_import_time_budget(self):
+        """Test that importing the CLI stays within the budget"""
+        times = import_times('-c', 'import ' + CLI_MODULE)
+
+        assert times[CLI_MODULE] / 1000 < IMPORT_TIME_BUDGET_MS
@@ -0,0 +1,66 @@
+"""
+Unit Tests for the job queue of the deployment service.
+"""
+
+import threading
+
+from aws_deployment_manager import jobqueue
+from aws_deployment_manager.jobqueue import JobQueue
+
+
+# pylint: disable=no-self-use
+class TestJobQueue:
+    """
+    Class to run tests for the job queue of the deployment service.
+    """
+
+    def test_jobs_claimed_in_order_one_per_environment(self, tmp_path):
+        """Test that jobs are claimed in submission order, skipping environments with a running job"""
+        queue = JobQueue(tmp_path / 'jobs.db')
+        first = queue.submit('idun-a', 'upgrade', {'upgrade_kube_downscaler': True})
+        second = queue.submit('idun-a', 'cleanup')
+        third = queue.submit('idun-b', 'validate')
+
+        claimed = queue.claim_next()
+        assert claimed['id'] == first['id']
+        assert claimed['status'] == jobqueue.JOB_RUNNING
+        assert claimed['options'] == {'upgrade_kube_downscaler': True}
+        assert queue.claim_next()['id'] == third['id']
+        assert queue.claim_next() is None
+
+        queue.finish(first['id'], jobqueue.JOB_SUCCEEDED, log_file='upgrade.log')
+        assert queue.claim_next()['id'] == second['id']
+        assert queue.get(first['id'])['log_file'] == 'upgrade.log'
+        assert [job['id'] for job in queue.list(environment='idun-a')] == [second['id'], first['id']]
+
+    def test_jobs_persisted_and_recovered(self, tmp_path):
+        """Test that the queue survives a restart, failing the jobs that were running"""
+        queue = JobQueue(tmp_path / 'jobs.db')
+        running = queue.submit('idun-a', 'install')
+        queued = queue.submit('idun-a', 'configure', {'namespace': 'eiap'})
+        queue.claim_next()
+        queue.close()
+
+        queue = JobQueue(tmp_path / 'jobs.db')
+        assert queue.recover() == 1
+        assert queue.get(running['id'])['status'] == jobqueue.JOB_FAILED
+        assert queue.claim_next()['id'] == queued['id']
+
+    def test_job_claimed_once_by_concurrent_threads(self, tmp_path):
+        """Test that concurrent claims never run two jobs of an environment"""
+        queue = JobQueue(tmp_path / 'jobs.db')
+        for _ in range(5):
+            queue.submit('idun-a', 'validate')
+        barrier = threading.Barrier(5)
+        claimed = []
+
+        def claim():
+            barrier.wait()
+            claimed.append(queue.claim_next())
+
+        threads = [threading.Thread(target=claim) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len([job for job in claimed if job is not None]) == 1
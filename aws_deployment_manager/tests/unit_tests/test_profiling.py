@@ -0,0 +1,60 @@
+"""
+Unit Tests for the profiling module.
+"""
+
+import logging
+import pstats
+import threading
+
+import pytest
+
+from aws_deployment_manager import profiling
+
+
+def busy_worker():
+    """Function run in a separate thread, expected in the CPU profile"""
+    return sum(index * index for index in range(10000))
+
+
+# pylint: disable=no-self-use
+class TestProfiling:
+    """
+    Class to run tests for the profiling module.
+    """
+
+    @pytest.fixture
+    def log_file_path(self, tmp_path):
+        """Logs to a file in a temporary directory, as a command does"""
+        path = tmp_path / '2023-01-01T00_00_00_install.log'
+        handler = logging.FileHandler(str(path))
+        logging.getLogger('').addHandler(handler)
+        yield path
+        logging.getLogger('').removeHandler(handler)
+        handler.close()
+
+    def test_cpu_profile_includes_threads(self, log_file_path):
+        """Test that the CPU profile is saved next to the log file and covers the started threads"""
+        with profiling.profiled(profiling.MODE_CPU):
+            thread = threading.Thread(target=busy_worker)
+            thread.start()
+            thread.join()
+
+        stats = pstats.Stats(str(log_file_path.with_name(log_file_path.stem + '.pstats')))
+        assert 'busy_worker' in [function for _, _, function in stats.stats]
+
+    def test_memory_profile(self, log_file_path):
+        """Test that the memory profile reports the peak and the top allocations"""
+        with profiling.profiled(profiling.MODE_MEM):
+            data = [bytearray(1024) for _ in range(1000)]
+
+        with open(str(log_file_path.with_name(log_file_path.stem + '_memory.txt'))) as memory_file:
+            report = memory_file.read()
+        assert report.startswith('Peak traced memory:')
+        assert 'test_profiling.py' in report
+        assert len(data) == 1000
+
+    def test_no_profile(self, log_file_path):
+        """Test that nothing is saved when profiling is not requested"""
+        with profiling.profiled(None):
+            pass
+        assert [path.name for path in log_file_path.parent.iterdir()] == [log_file_path.name]
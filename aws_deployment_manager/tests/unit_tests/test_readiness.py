@@ -0,0 +1,104 @@
+"""
+Unit Tests for the readiness probes.
+"""
+
+import json
+
+import pytest
+
+from aws_deployment_manager import aio
+from aws_deployment_manager import clock
+from aws_deployment_manager import readiness
+from aws_deployment_manager import utils
+from aws_deployment_manager import waiter
+
+DEPLOYMENT_ROLLING = {'metadata': {'generation': 2}, 'spec': {'replicas': 2},
+                      'status': {'observedGeneration': 2, 'replicas': 3, 'updatedReplicas': 2, 'availableReplicas': 2}}
+DEPLOYMENT_ROLLED_OUT = {'metadata': {'generation': 2}, 'spec': {'replicas': 2},
+                         'status': {'observedGeneration': 2, 'replicas': 2, 'updatedReplicas': 2,
+                                    'availableReplicas': 2}}
+SERVICE_PENDING = {'status': {'loadBalancer': {}}}
+SERVICE_PROVISIONED = {'status': {'loadBalancer': {'ingress': [{'hostname': 'idun.elb.amazonaws.com'}]}}}
+
+
+def fake_kubectl(monkeypatch, outputs):
+    """
+    Replaces the execution of the commands by successive outputs, the last one repeated
+    :param outputs: Outputs of the commands, an exception being raised as a failure of the command
+    :return: List of the executed commands
+    """
+    commands = []
+
+    def execute_command(command):
+        commands.append(command)
+        output = outputs[min(len(commands), len(outputs)) - 1]
+        if isinstance(output, Exception):
+            raise output
+        return output if isinstance(output, str) else json.dumps(output)
+    monkeypatch.setattr(utils, 'execute_command', execute_command)
+    return commands
+
+
+# pylint: disable=no-self-use
+class TestReadiness:
+    """
+    Class to run tests for the readiness probes.
+    """
+
+    def test_api_server_ready_after_failures(self, monkeypatch):
+        """Test that the API server probe retries the failed probes and returns as soon as it is ready"""
+        commands = fake_kubectl(monkeypatch, [Exception('connection refused'), 'ok'])
+        with clock.use_clock(clock.VirtualClock()) as virtual_clock:
+            readiness.wait_for_api_server('kubeconfig')
+        assert len(commands) == 2
+        assert commands[0] == 'kubectl get --raw /readyz --kubeconfig kubeconfig'
+        assert virtual_clock.slept < 10
+
+    def test_rollout_complete(self, monkeypatch):
+        """Test that the rollout probe waits for the old replicas to be gone"""
+        assert not readiness.is_rollout_complete(DEPLOYMENT_ROLLING)
+        assert readiness.is_rollout_complete(DEPLOYMENT_ROLLED_OUT)
+        assert not readiness.is_rollout_complete({**DEPLOYMENT_ROLLED_OUT, 'metadata': {'generation': 3}})
+        commands = fake_kubectl(monkeypatch, [Exception('not found'), DEPLOYMENT_ROLLING, DEPLOYMENT_ROLLED_OUT])
+        with clock.use_clock(clock.VirtualClock()):
+            readiness.wait_for_rollout('ingress-nginx-controller', 'ingress-nginx', 'kubeconfig')
+        assert len(commands) == 3
+
+    def test_daemonset_rollout_complete(self, monkeypatch):
+        """Test that the asynchronous rollout probe waits for the PODs of all the nodes to be updated"""
+        rolling = {'kind': 'DaemonSet', 'metadata': {'generation': 2},
+                   'status': {'observedGeneration': 2, 'desiredNumberScheduled': 3, 'updatedNumberScheduled': 2,
+                              'numberAvailable': 3}}
+        rolled_out = {**rolling, 'status': {**rolling['status'], 'updatedNumberScheduled': 3}}
+        assert not readiness.is_workload_rollout_complete(rolling)
+        assert readiness.is_workload_rollout_complete(rolled_out)
+        assert readiness.is_workload_rollout_complete({**DEPLOYMENT_ROLLED_OUT, 'kind': 'Deployment'})
+        outputs = [rolling, rolling, rolled_out]
+        commands = []
+
+        async def execute_command_async(command):
+            commands.append(command)
+            return json.dumps(outputs[len(commands) - 1])
+
+        monkeypatch.setattr(utils, 'execute_command_async', execute_command_async)
+        with clock.use_clock(clock.VirtualClock()):
+            aio.run(readiness.wait_for_workload_rollout('daemonset', 'kube-proxy', 'kube-system', 'kubeconfig'))
+        assert commands == ['kubectl get daemonset kube-proxy -n kube-system --output json --kubeconfig kubeconfig'] * 3
+
+    def test_load_balancer_hostname(self, monkeypatch):
+        """Test that the load balancer probe returns the hostname as soon as it is provisioned"""
+        fake_kubectl(monkeypatch, [SERVICE_PENDING, SERVICE_PROVISIONED])
+        with clock.use_clock(clock.VirtualClock()) as virtual_clock:
+            hostname = readiness.wait_for_load_balancer('ingress-nginx-controller', 'ingress-nginx', 'kubeconfig')
+        assert hostname == 'idun.elb.amazonaws.com'
+        assert virtual_clock.slept < 180
+
+    def test_load_balancer_never_provisioned(self, monkeypatch):
+        """Test that the load balancer probe fails at its deadline with the reason"""
+        fake_kubectl(monkeypatch, [SERVICE_PENDING])
+        with clock.use_clock(clock.VirtualClock()) as virtual_clock:
+            with pytest.raises(Exception) as exception:
+                readiness.wait_for_load_balancer('ingress-nginx-controller', 'ingress-nginx', 'kubeconfig',
+                                                 backoff=waiter.Backoff(first_delay=5, jitter=0, timeout=60))
+        assert 'status.loadBalancer.ingress is empty' in str(exception.value)
+        assert virtual_clock.slept == pytest.approx(60, abs=1)
@@ -0,0 +1,126 @@
+"""
+Unit Tests for the deployment service.
+"""
+
+import json
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from aws_deployment_manager import jobqueue
+from aws_deployment_manager.commands import serve
+from aws_deployment_manager.commands.serve import ServeManager
+from aws_deployment_manager.tests.unit_tests.test_fleet import write_environment
+
+JOB_TIMEOUT = 60
+
+
+@pytest.fixture
+def service(tmp_path):
+    """
+    Runs the service on a free port of the loopback interface
+    :return: Base URL of the service
+    """
+    write_environment(tmp_path, 'idun-a', 'eu-west-1')
+    write_environment(tmp_path, 'idun-b', 'us-east-1', worker_node_subnet_ids='subnet-1,subnet-2,subnet-3')
+    manager = ServeManager(service_path=tmp_path, max_environments=2)
+    server = serve.create_server(manager, host='127.0.0.1', port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    manager.start()
+    thread.start()
+    yield "http://127.0.0.1:{0}".format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+    manager.stop()
+
+
+def request(url, body=None):
+    """
+    Sends a request to the service
+    :param url: URL
+    :param body: JSON body of a POST request
+    :return: Status and body of the response
+    """
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data)) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, error.read()
+
+
+def wait_for_job(service, job_id):
+    """
+    Waits for a job to finish
+    :param service: Base URL of the service
+    :param job_id: ID of the job
+    :return: Job
+    """
+    deadline = time.time() + JOB_TIMEOUT
+    while time.time() < deadline:
+        _, body = request("{0}/jobs/{1}".format(service, job_id))
+        job = json.loads(body)
+        if job['status'] in jobqueue.FINISHED_STATES:
+            return job
+        time.sleep(0.1)
+    raise Exception("Job {0} did not finish".format(job_id))
+
+
+# pylint: disable=no-self-use,redefined-outer-name
+class TestServe:
+    """
+    Class to run tests for the deployment service.
+    """
+
+    def test_jobs_run_in_environment_workers(self, service):
+        """Test that submitted jobs run, one after the other, in the warm worker of their environment"""
+        jobs = [json.loads(request(service + "/jobs", {'environment': environment, 'command': 'validate'})[1])
+                for environment in ['idun-a', 'idun-b', 'idun-a']]
+
+        results = [wait_for_job(service, job['id']) for job in jobs]
+
+        assert [result['status'] for result in results] == [jobqueue.JOB_SUCCEEDED, jobqueue.JOB_FAILED,
+                                                            jobqueue.JOB_SUCCEEDED]
+        assert results[1]['error'] == 'Configuration File not valid'
+        assert results[2]['started'] >= results[0]['finished']
+        status, log = request("{0}/jobs/{1}/log?follow=1".format(service, jobs[1]['id']))
+        assert status == 200
+        assert b'3 provided' in log
+        assert results[1]['log_file'].endswith('_validate_job{0}.log'.format(jobs[1]['id']))
+
+    def test_invalid_requests(self, service):
+        """Test that unknown environments, jobs and commands are answered with client errors"""
+        assert request(service + "/jobs", {'environment': 'idun-x', 'command': 'validate'})[0] == 404
+        assert request(service + "/jobs", {'environment': 'idun-a', 'command': 'generate'})[0] == 400
+        assert request(service + "/jobs", {'environment': 'idun-a'})[0] == 400
+        assert request(service + "/jobs/42")[0] == 404
+        job = json.loads(request(service + "/jobs", {'environment': 'idun-a', 'command': 'validate'})[1])
+        assert request("{0}/jobs/{1}/log?offset=abc".format(service, job['id']))[0] == 400
+        assert request("{0}/jobs/{1}/log?offset=-1".format(service, job['id']))[0] == 400
+        wait_for_job(service, job['id'])
+        status, body = request(service + "/environments")
+        assert status == 200
+        assert [environment['name'] for environment in json.loads(body)] == ['idun-a', 'idun-b']
+
+    def test_unix_socket(self, tmp_path):
+        """Test that the service answers on a Unix socket"""
+        socket_path = str(tmp_path / 'service.sock')
+        manager = ServeManager(service_path=tmp_path)
+        server = serve.create_server(manager, socket_path=socket_path)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                client.connect(socket_path)
+                client.sendall(b"GET /health HTTP/1.0\r\n\r\n")
+                response = b''.join(iter(lambda: client.recv(4096), b''))
+        finally:
+            server.shutdown()
+            server.server_close()
+            manager.stop()
+        assert response.startswith(b'HTTP/1.0 200')
+        assert json.loads(response.split(b'\r\n\r\n', 1)[1]) == {'status': 'ok', 'running_jobs': []}
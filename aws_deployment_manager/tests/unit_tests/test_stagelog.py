@@ -0,0 +1,84 @@
+"""
+Unit Tests for the stagelog module.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from aws_deployment_manager import constants
+from aws_deployment_manager import stagelog
+
+
+# pylint: disable=no-self-use
+class TestStagelog:
+    """
+    Class to run tests for the stagelog module.
+    """
+
+    def test_write_structured_records(self, tmp_path):
+        """Test that records hold timestamps, durations, attempts, host and version"""
+        log_path = str(tmp_path / 'stage.log')
+        stagelog.write_to_stage_log(log_path, 'install', constants.STAGE_STARTED)
+        stagelog.write_to_stage_log(log_path, 'install', constants.STAGE_STARTED)
+        stagelog.write_to_stage_log(log_path, 'install', constants.STAGE_FINISHED, duration=1.23456)
+
+        with open(log_path) as file:
+            records = [json.loads(line) for line in file]
+        assert [record['attempt'] for record in records] == [1, 2, 2]
+        assert records[2]['duration'] == 1.235
+        assert records[0]['version'] == constants.VERSION
+        assert all('ts' in record and 'host' in record for record in records)
+        assert stagelog.get_stage(log_path, 'install') == constants.STAGE_FINISHED
+
+    def test_invalid_state(self, tmp_path):
+        """Test that an invalid state is refused"""
+        with pytest.raises(Exception) as exception:
+            stagelog.write_to_stage_log(str(tmp_path / 'stage.log'), 'install', 'running')
+        assert str(exception.value) == 'Invalid state running passed for stage install'
+
+    def test_read_legacy_and_structured_lines(self, tmp_path):
+        """Test that legacy lines are still read and mixed with structured ones"""
+        log_path = str(tmp_path / 'stage.log')
+        with open(log_path, 'w') as file:
+            file.write('install::finished\nupgrade::started\n')
+        stagelog.write_to_stage_log(log_path, 'upgrade', constants.STAGE_FINISHED)
+
+        assert stagelog.get_all_stages(log_path) == {'install': constants.STAGE_FINISHED,
+                                                     'upgrade': constants.STAGE_FINISHED}
+        assert stagelog.get_stage(log_path, 'missing') is None
+        assert stagelog.get_stage_records(log_path)[0] == {'stage': 'install', 'state': 'finished'}
+
+    def test_index_follows_appends_and_rewrites(self, tmp_path):
+        """Test that the index picks up appended lines and detects a replaced or removed file"""
+        log_path = str(tmp_path / 'stage.log')
+        stagelog.write_to_stage_log(log_path, 'a', constants.STAGE_FINISHED)
+        assert stagelog.get_all_stages(log_path) == {'a': constants.STAGE_FINISHED}
+
+        with open(log_path, 'a') as file:
+            file.write('b::started\n')
+        assert stagelog.get_all_stages(log_path) == {'a': constants.STAGE_FINISHED, 'b': constants.STAGE_STARTED}
+
+        with open(log_path, 'w') as file:
+            file.write('c::finished\n' * 20)
+        assert stagelog.get_all_stages(log_path) == {'c': constants.STAGE_FINISHED}
+
+        os.remove(log_path)
+        assert stagelog.get_all_stages(log_path) == {}
+
+    def test_concurrent_writes(self, tmp_path):
+        """Test that concurrent writers do not interleave lines"""
+        log_path = str(tmp_path / 'stage.log')
+
+        def write(index):
+            stagelog.write_to_stage_log(log_path, 'stage{0}'.format(index), constants.STAGE_STARTED)
+            stagelog.write_to_stage_log(log_path, 'stage{0}'.format(index), constants.STAGE_FINISHED)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(write, range(50)))
+
+        with open(log_path) as file:
+            assert len([json.loads(line) for line in file]) == 100
+        assert set(stagelog.get_all_stages(log_path).values()) == {constants.STAGE_FINISHED}
@@ -0,0 +1,122 @@
+"""
+Unit Tests for the stagescheduler module.
+"""
+
+import threading
+import time
+
+import pytest
+
+from aws_deployment_manager import constants
+from aws_deployment_manager import stagelog
+from aws_deployment_manager.commands.base import Base
+from aws_deployment_manager.stagescheduler import Stage, StageScheduler, StageFailedError, validate_stages
+
+
+# pylint: disable=no-self-use
+class TestStageScheduler:
+    """
+    Class to run tests for the stagescheduler module.
+    """
+
+    @staticmethod
+    def _run(stages, max_workers=4):
+        scheduler = StageScheduler(execute=lambda stage: stage.func(), max_workers=max_workers)
+        scheduler.run(stages)
+
+    def test_dependencies_respected(self):
+        """Test that a stage only starts once its dependencies have finished"""
+        events = []
+        lock = threading.Lock()
+
+        def record(name, delay=0.0):
+            def func():
+                with lock:
+                    events.append(('start', name))
+                time.sleep(delay)
+                with lock:
+                    events.append(('end', name))
+            return func
+
+        self._run([
+            Stage('a', record('a', 0.05)),
+            Stage('b', record('b', 0.01), depends_on=['a']),
+            Stage('c', record('c', 0.02), depends_on=['a']),
+            Stage('d', record('d'), depends_on=['b', 'c']),
+        ])
+        assert events.index(('end', 'a')) < events.index(('start', 'b'))
+        assert events.index(('end', 'a')) < events.index(('start', 'c'))
+        assert events.index(('end', 'b')) < events.index(('start', 'd'))
+        assert events.index(('end', 'c')) < events.index(('start', 'd'))
+
+    def test_independent_stages_run_concurrently(self):
+        """Test that independent stages overlap, within the concurrency limit"""
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def func():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.pop()
+
+        self._run([Stage(str(index), func) for index in range(5)], max_workers=2)
+        assert max(peak) == 2
+
+    def test_failure_stops_scheduling(self):
+        """Test that the original exception is raised and dependent stages are not started"""
+        called = []
+
+        def fail():
+            raise ValueError('This is a good failure!')
+
+        with pytest.raises(ValueError) as exception:
+            self._run([
+                Stage('a', fail),
+                Stage('b', lambda: called.append('b'), depends_on=['a']),
+            ])
+        assert str(exception.value) == 'This is a good failure!'
+        assert called == []
+
+    def test_multiple_failures(self):
+        """Test that several failures are reported together"""
+        def fail():
+            raise ValueError('This is a good failure!')
+
+        with pytest.raises(StageFailedError) as exception:
+            self._run([Stage('a', fail), Stage('b', fail)])
+        assert sorted(exception.value.failures) == ['a', 'b']
+
+    def test_invalid_graphs(self):
+        """Test that unknown dependencies, duplicates and cycles are rejected"""
+        with pytest.raises(Exception) as exception:
+            validate_stages([Stage('a', None, depends_on=['x'])])
+        assert str(exception.value) == 'Stage a depends on unknown stages: x'
+
+        with pytest.raises(Exception) as exception:
+            validate_stages([Stage('a', None), Stage('a', None)])
+        assert str(exception.value) == 'Duplicate stages: a'
+
+        with pytest.raises(Exception) as exception:
+            validate_stages([Stage('a', None, depends_on=['b']), Stage('b', None, depends_on=['a'])])
+        assert str(exception.value) == 'Cyclic dependency between stages: a, b'
+
+    def test_execute_stages_resumable(self, tmp_path):
+        """Test that finished stages are skipped and the others recorded in the stage log"""
+        base = Base.__new__(Base)
+        stage_log_path = str(tmp_path / 'stage.log')
+        stagelog.write_to_stage_log(stage_log_path, 'done', constants.STAGE_FINISHED)
+        base.load_stage_states(stage_log_path)
+        called = []
+
+        base.execute_stages([
+            Stage('done', lambda: called.append('done')),
+            Stage('step', lambda: called.append('step'), depends_on=['done'], resumable=False),
+            Stage('todo', lambda: called.append('todo'), depends_on=['step']),
+        ])
+        assert called == ['step', 'todo']
+        assert stagelog.get_all_stages(stage_log_path) == {'done': constants.STAGE_FINISHED,
+                                                           'todo': constants.STAGE_FINISHED}
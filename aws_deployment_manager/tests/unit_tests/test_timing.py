@@ -0,0 +1,82 @@
+"""
+Unit Tests for the timing module.
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from aws_deployment_manager import timing
+from aws_deployment_manager import utils
+
+
+# pylint: disable=no-self-use, unused-argument
+class TestTiming:
+    """
+    Class to run tests for the timing module.
+    """
+
+    @pytest.fixture(autouse=True)
+    def reset_spans(self, monkeypatch):
+        """Starts each test without spans and without really sleeping"""
+        monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+        timing.reset()
+        yield
+        timing.reset()
+
+    def test_report_breakdown(self):
+        """Test that time is attributed to the innermost category within a stage"""
+        with timing.timed('install.stage', timing.CATEGORY_STAGE):
+            with timing.timed('cloudformation wait create stack', timing.CATEGORY_AWS_WAIT):
+                timing.sleep(30)
+            timing.sleep(10, reason='wait for EKS control plane')
+            utils.execute_command('echo hello')
+
+        report = timing.build_report(wall_time=1.0)
+        assert [stage['name'] for stage in report['stages']] == ['install.stage']
+        names = [operation['name'] for operation in report['top_operations']]
+        assert sorted(names) == ['cloudformation wait create stack', 'echo hello', 'wait for EKS control plane']
+        assert report['totals'][timing.CATEGORY_STAGE] >= report['totals'][timing.CATEGORY_SUBPROCESS]
+        assert len(report['spans']) == 5
+
+    def test_command_name_hides_option_values(self):
+        """Test that option values are not part of the operation name"""
+        utils.execute_command('echo --docker-password=secret hello world again')
+        assert [span.name for span in timing.get_spans()] == ['echo hello world again']
+
+    def test_report_saved_next_to_log(self, tmp_path):
+        """Test that the JSON report is saved next to the log file"""
+        with timing.timed('stage', timing.CATEGORY_STAGE):
+            pass
+        log_file_path = tmp_path / '2023-01-01T00_00_00_install.log'
+        report_path = timing.report(str(log_file_path), 12.5)
+        assert report_path == str(tmp_path / '2023-01-01T00_00_00_install_timing.json')
+        with open(report_path) as report_file:
+            assert json.load(report_file)['wall_time'] == 12.5
+
+    def test_report_failure_not_raised(self, tmp_path):
+        """Test that a report which cannot be saved does not raise"""
+        assert timing.report(str(tmp_path / 'missing' / 'install.log'), 1.0) is None
+
+    def test_chrome_trace(self, tmp_path):
+        """Test that spans are exported as nested trace events with one track per thread"""
+        with timing.timed('install.stage', timing.CATEGORY_STAGE):
+            timing.add_span('eks.DescribeCluster', timing.CATEGORY_AWS_CALL, time.time(), 0.2)
+        thread = threading.Thread(target=timing.sleep, args=(1, 'worker sleep'), name='stage_0')
+        thread.start()
+        thread.join()
+
+        log_file_path = tmp_path / '2023-01-01T00_00_00_install.log'
+        trace_path = timing.write_chrome_trace(str(log_file_path), 'install', time.time() - 5, 5.0)
+        assert trace_path == str(tmp_path / '2023-01-01T00_00_00_install_trace.json')
+        with open(trace_path) as trace_file:
+            events = json.load(trace_file)['traceEvents']
+        complete = {event['name']: event for event in events if event['ph'] == 'X'}
+        assert set(complete) == {'install', 'install.stage', 'eks.DescribeCluster', 'worker sleep'}
+        assert complete['eks.DescribeCluster']['cat'] == timing.CATEGORY_AWS_CALL
+        assert complete['eks.DescribeCluster']['dur'] == 200000
+        assert complete['worker sleep']['tid'] != complete['install.stage']['tid']
+        thread_names = {event['args']['name'] for event in events if event['name'] == 'thread_name'}
+        assert 'stage_0' in thread_names
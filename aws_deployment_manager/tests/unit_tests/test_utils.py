@@ -255,11 +255,34 @@ class TestUtils:
         is_valid, validation_errors = utils.validate_idun_config(invalid_config)
         expected_errors = [
             'Minimum 1 and Maximum 2 Worker Node Subnet IDs to be provided. 3 provided',
-            '2 Control Plane Subnet IDs to be provided. 3 provided'
+            '2 Control Plane Subnet IDs to be provided. 1 provided'
         ]
         assert is_valid is False
         assert len(validation_errors) == 2
-        assert [expected_error in validation_errors for expected_error in expected_errors]
+        assert all(expected_error in validation_errors for expected_error in expected_errors)
+
+    def test_validate_idun_config_rules_across_parameters(self):
+        """
+        Tests that the region, CIDR, K8S version and mandatory parameter rules are checked in the
+        same validation, with a validator compiled once.
+        """
+        config = utils.load_yaml(self.valid_config_file_path)
+        config.update(AWSRegion='eu-north-1', SecondaryVpcCIDR='172.32.4.0/33', K8SVersion='latest',
+                      NodeInstanceType=' ')
+        is_valid, validation_errors = utils.validate_idun_config(config)
+        assert is_valid is False
+        assert sorted(validation_errors) == sorted([
+            "Region eu-north-1 is not supported. Please select region from ['eu-west-1', 'us-east-1']",
+            "Parameter SecondaryVpcCIDR must be a CIDR block, e.g. 100.64.0.0/16. 172.32.4.0/33 provided",
+            "Parameter K8SVersion must be a K8S version, e.g. 1.24. latest provided",
+            "Missing Mandatory Parameter - NodeInstanceType"
+        ])
+
+        validator = utils._get_config_validator()  # pylint: disable=protected-access
+        is_valid, validation_errors = utils.validate_idun_config(utils.load_yaml(self.valid_config_file_path))
+        assert is_valid is True
+        assert validation_errors == []
+        assert utils._get_config_validator() is validator  # pylint: disable=protected-access
 
     def test_get_stack_outputs(self):
         """
@@ -0,0 +1,90 @@
+"""
+Unit Tests for the waiter module.
+"""
+
+import pytest
+
+from aws_deployment_manager import clock
+from aws_deployment_manager import errors
+from aws_deployment_manager import timing
+from aws_deployment_manager import waiter
+
+
+def poll_states(states):
+    """
+    :param states: States returned by the successive polls, the last one repeated
+    :return: Poll function, with the list of the states it returned
+    """
+    returned = []
+
+    def poll():
+        returned.append(states[min(len(returned), len(states) - 1)])
+        return returned[-1]
+    return poll, returned
+
+
+# pylint: disable=no-self-use
+class TestWaiter:
+    """
+    Class to run tests for the waiter module.
+    """
+
+    def test_delays_grow_to_cap(self):
+        """Test that the delays grow exponentially from the first delay up to the cap"""
+        delays = waiter.Backoff(first_delay=2, factor=2, max_delay=30, jitter=0).delays()
+        assert [next(delays) for _ in range(7)] == [2, 4, 8, 16, 30, 30, 30]
+
+    def test_delays_jittered_within_cap(self):
+        """Test that the jitter keeps the delays around their value and under the cap"""
+        delays = waiter.Backoff(first_delay=10, factor=2, max_delay=30, jitter=0.2).delays()
+        first, second, third = next(delays), next(delays), next(delays)
+        assert 8 <= first <= 12
+        assert 16 <= second <= 24
+        assert 24 <= third <= 30
+
+    def test_wait_until_final_state(self):
+        """Test that the waiter polls until the state is final, reporting the progress and the timing"""
+        poll, returned = poll_states(['PENDING', 'PENDING', 'INSYNC'])
+        progress = []
+        with clock.use_clock(clock.VirtualClock()) as virtual_clock:
+            state = waiter.wait(poll=poll, until=lambda status: status == 'INSYNC', description='test change',
+                                backoff=waiter.Backoff(first_delay=2, jitter=0),
+                                on_progress=lambda status, attempts, waited: progress.append((status, attempts)))
+
+        assert state == 'INSYNC'
+        assert returned == ['PENDING', 'PENDING', 'INSYNC']
+        assert progress == [('PENDING', 1), ('PENDING', 2), ('INSYNC', 3)]
+        assert virtual_clock.sleeps == [2, 4, 8]
+        span = [span for span in timing.get_spans() if span.name == 'test change'][-1]
+        assert span.category == timing.CATEGORY_AWS_WAIT
+        assert span.duration >= 14
+
+    def test_wait_deadline(self):
+        """Test that the waiter gives up at the deadline, without sleeping past it"""
+        poll, returned = poll_states(['PENDING'])
+        with clock.use_clock(clock.VirtualClock()) as virtual_clock:
+            with pytest.raises(errors.WaitTimeoutError) as timeout_error:
+                waiter.wait(poll=poll, until=lambda status: status == 'INSYNC', description='test change',
+                            backoff=waiter.Backoff(first_delay=10, max_delay=60, jitter=0, timeout=100))
+
+        assert virtual_clock.sleeps == pytest.approx([10, 20, 40, 30], abs=1)
+        assert len(returned) == 4
+        assert timeout_error.value.state == 'PENDING'
+        assert 'after 100s and 4 polls' in str(timeout_error.value)
+
+    def test_wait_max_attempts(self):
+        """Test that the waiter gives up after the maximum number of polls"""
+        poll, returned = poll_states([False])
+        with clock.use_clock(clock.VirtualClock()):
+            with pytest.raises(errors.WaitTimeoutError):
+                waiter.wait(poll=poll, until=bool, description='test pods',
+                            backoff=waiter.Backoff(first_delay=60, factor=1, jitter=0, max_attempts=3))
+        assert len(returned) == 3
+
+    def test_quick_route53_change(self):
+        """Test that a Route53 change syncing in a few seconds is no longer waited for 30 seconds"""
+        poll, _ = poll_states(['PENDING', 'INSYNC'])
+        with clock.use_clock(clock.VirtualClock()) as virtual_clock:
+            waiter.wait(poll=poll, until=lambda status: status == 'INSYNC', description='route53 change',
+                        backoff=waiter.ROUTE53_CHANGE)
+        assert virtual_clock.slept < 10
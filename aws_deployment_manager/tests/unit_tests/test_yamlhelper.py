@@ -4,6 +4,9 @@ Unit Tests for the YamlHelper module.
 
 import os
 import shutil
+
+import pytest
+
 from aws_deployment_manager import yamlhelper
 
 TEST_FILE_CONTENT = """
@@ -53,3 +56,42 @@ class TestYamlhelper:
         images = ['mydockerimage:mytag', 'myrepo:mytag']
         for img in image_set:
             assert img in images
+
+    def test_scan_images_in_file_skips_documents_without_images(self):
+        """Test the fast scan ignores documents without images and handles quoted keys"""
+        my_testdir, _ = self.__create_test_file()
+        test_filename = my_testdir + '/multi.yaml'
+        with open(test_filename, 'w') as test_file:
+            test_file.write('kind: ConfigMap\ndata: {a: "[not: valid"}\n---\n{"image": "jsonimage:1.0"}\n'
+                            '--- # comment\nspec:\n  containers:\n  - image: nested:2.0\n')
+        assert yamlhelper.scan_images_in_file(test_filename) == {'jsonimage:1.0', 'nested:2.0'}
+
+    def test_get_images_sequential_and_parallel(self):
+        """Test the sequential and parallel scans return the same images"""
+        my_testdir, _ = self.__create_test_file()
+        with open(my_testdir + '/other.yaml', 'w') as test_file:
+            test_file.write('image: otherimage:1.0\n')
+        expected = {'mydockerimage:mytag', 'myrepo:mytag', 'otherimage:1.0'}
+        assert yamlhelper.get_image_from_template(my_testdir, [], max_workers=1) == expected
+        assert yamlhelper.get_image_from_template(my_testdir, [], max_workers=2) == expected
+
+    def test_get_images_in_process_below_size_threshold(self, monkeypatch):
+        """Test the default scan only tries a process pool from the size threshold"""
+        my_testdir, _ = self.__create_test_file()
+        pools = []
+
+        def process_pool_executor(**kwargs):
+            pools.append(kwargs['max_workers'])
+            raise OSError('No /dev/shm')
+
+        monkeypatch.setattr(yamlhelper, 'ProcessPoolExecutor', process_pool_executor)
+        monkeypatch.setattr(os, 'cpu_count', lambda: 4)
+        with open(my_testdir + '/other.yaml', 'w') as test_file:
+            test_file.write('image: otherimage:1.0\n')
+        expected = {'mydockerimage:mytag', 'myrepo:mytag', 'otherimage:1.0'}
+        assert yamlhelper.get_image_from_template(my_testdir, []) == expected
+        assert not pools
+
+        monkeypatch.setattr(yamlhelper, 'PARALLEL_SCAN_MIN_BYTES', 1)
+        assert yamlhelper.get_image_from_template(my_testdir, []) == expected
+        assert pools == [2]
@@ -0,0 +1,275 @@
+"""
+This module records where the time of a command goes: stages, AWS waiters, AWS API calls,
+subprocesses and sleeps.
+A report is logged and saved as JSON next to the log file at the end of each command, and the spans
+can be exported as a Chrome trace-event timeline.
+"""
+
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+from aws_deployment_manager import clock
+
+LOG = logging.getLogger(__name__)
+
+CATEGORY_STAGE = "stage"
+CATEGORY_AWS_WAIT = "aws_wait"
+CATEGORY_SUBPROCESS = "subprocess"
+CATEGORY_SLEEP = "sleep"
+CATEGORY_AWS_CALL = "aws_call"
+CATEGORIES = [CATEGORY_STAGE, CATEGORY_AWS_WAIT, CATEGORY_AWS_CALL, CATEGORY_SUBPROCESS, CATEGORY_SLEEP]
+
+TOP_OPERATIONS = 10
+REPORT_FILE_POSTFIX = "_timing.json"
+TRACE_FILE_POSTFIX = "_trace.json"
+
+_LOCK = threading.Lock()
+_SPANS = []
+_LOCAL = threading.local()
+
+
+class Span:
+    """ A timed operation """
+
+    def __init__(self, name, category, start, duration, thread_id, thread_name, parents):
+        """
+        :param name: Name of the operation
+        :param category: One of CATEGORIES
+        :param start: Start time, seconds since the epoch
+        :param duration: Duration in seconds
+        :param thread_id: Identifier of the thread running the operation
+        :param thread_name: Name of the thread running the operation
+        :param parents: Categories of the spans enclosing this one in the same thread
+        """
+        self.name = name
+        self.category = category
+        self.start = start
+        self.duration = duration
+        self.thread_id = thread_id
+        self.thread_name = thread_name
+        self.parents = parents
+
+    def as_dict(self):
+        """
+        :return: The span as dictionary
+        """
+        return {
+            'name': self.name,
+            'category': self.category,
+            'start': round(self.start, 3),
+            'duration': round(self.duration, 3),
+            'thread': self.thread_name
+        }
+
+
+def _get_stack():
+    if not hasattr(_LOCAL, 'stack'):
+        _LOCAL.stack = []
+    return _LOCAL.stack
+
+
+@contextmanager
+def timed(name, category):
+    """
+    Context manager recording the duration of the enclosed block as a span
+    :param name: Name of the operation
+    :param category: One of CATEGORIES
+    """
+    stack = _get_stack()
+    parents = tuple(stack)
+    stack.append(category)
+    current_clock = clock.get_clock()
+    start = current_clock.time()
+    start_counter = current_clock.monotonic()
+    try:
+        yield
+    finally:
+        duration = current_clock.monotonic() - start_counter
+        stack.pop()
+        thread = threading.current_thread()
+        with _LOCK:
+            _SPANS.append(Span(name, category, start, duration, thread.ident, thread.name, parents))
+
+
+def add_span(name, category, start, duration):
+    """
+    Records an operation timed by the caller, in the current thread
+    :param name: Name of the operation
+    :param category: One of CATEGORIES
+    :param start: Start time, seconds since the epoch
+    :param duration: Duration in seconds
+    """
+    thread = threading.current_thread()
+    with _LOCK:
+        _SPANS.append(Span(name, category, start, duration, thread.ident, thread.name, tuple(_get_stack())))
+
+
+def sleep(seconds, reason=None):
+    """
+    Sleep of the clock in use, recorded as a span. Sleeps inside an AWS waiter are accounted to the waiter.
+    :param seconds: Seconds to sleep
+    :param reason: Name of the operation, defaults to the duration
+    """
+    with timed(reason or "sleep {0}s".format(seconds), CATEGORY_SLEEP):
+        clock.get_clock().sleep(seconds)
+
+
+def get_spans():
+    """
+    :return: Copy of the spans recorded so far
+    """
+    with _LOCK:
+        return list(_SPANS)
+
+
+def reset():
+    """
+    Discards the recorded spans
+    """
+    with _LOCK:
+        del _SPANS[:]
+
+
+def build_report(wall_time, spans=None):
+    """
+    Builds the timing report. Time is attributed to the innermost non stage category, so that
+    a sleep inside a waiter counts as AWS wait and a subprocess is not counted twice.
+    Totals are cumulative over threads and can exceed the wall time when stages run in parallel.
+    :param wall_time: Wall time of the command in seconds
+    :param spans: Spans to report, defaults to the recorded ones
+    :return: Report as dictionary
+    """
+    spans = get_spans() if spans is None else spans
+    totals = {category: 0.0 for category in CATEGORIES}
+    operations = []
+    stages = []
+    for span in spans:
+        if span.category == CATEGORY_STAGE:
+            totals[CATEGORY_STAGE] += span.duration
+            stages.append(span)
+            continue
+        if any(parent != CATEGORY_STAGE for parent in span.parents):
+            continue
+        totals[span.category] += span.duration
+        operations.append(span)
+
+    stages.sort(key=lambda span: span.start)
+    operations.sort(key=lambda span: span.duration, reverse=True)
+    return {
+        'wall_time': round(wall_time, 3),
+        'totals': {category: round(total, 3) for category, total in totals.items()},
+        'stages': [span.as_dict() for span in stages],
+        'top_operations': [span.as_dict() for span in operations[:TOP_OPERATIONS]],
+        'spans': [span.as_dict() for span in spans]
+    }
+
+
+def _format_seconds(seconds):
+    return str(timedelta(seconds=round(seconds)))
+
+
+def log_report(report):
+    """
+    Logs the timing report
+    :param report: Report built by build_report
+    """
+    LOG.info("Timing report (wall time {0})".format(_format_seconds(report['wall_time'])))
+    LOG.info("  Time in stages:          {0}".format(_format_seconds(report['totals'][CATEGORY_STAGE])))
+    LOG.info("  Blocked in AWS waiters:  {0}".format(_format_seconds(report['totals'][CATEGORY_AWS_WAIT])))
+    LOG.info("  Other AWS API calls:     {0}".format(_format_seconds(report['totals'][CATEGORY_AWS_CALL])))
+    LOG.info("  Running subprocesses:    {0}".format(_format_seconds(report['totals'][CATEGORY_SUBPROCESS])))
+    LOG.info("  Fixed sleeps:            {0}".format(_format_seconds(report['totals'][CATEGORY_SLEEP])))
+    if report['stages']:
+        LOG.info("  Stages:")
+        for stage in report['stages']:
+            LOG.info("    {0:<60} {1}".format(stage['name'], _format_seconds(stage['duration'])))
+    if report['top_operations']:
+        LOG.info("  Slowest operations:")
+        for operation in report['top_operations']:
+            LOG.info("    {0:<12} {1:<60} {2}".format(operation['category'], operation['name'],
+                                                     _format_seconds(operation['duration'])))
+
+
+def get_report_path(log_file_path, postfix=REPORT_FILE_POSTFIX):
+    """
+    :param log_file_path: Path of the log file of the command
+    :param postfix: Postfix replacing the extension of the log file
+    :return: Path of the JSON timing report next to it
+    """
+    path = Path(log_file_path)
+    return str(path.with_name(path.stem + postfix))
+
+
+def build_chrome_trace(command, start, wall_time, spans=None):
+    """
+    Builds a Chrome trace-event timeline of the command, with the spans nested under the command
+    and one track per thread
+    :param command: Name of the command
+    :param start: Start time of the command, seconds since the epoch
+    :param wall_time: Wall time of the command in seconds
+    :param spans: Spans to export, defaults to the recorded ones
+    :return: Trace as dictionary, in the JSON object format
+    """
+    spans = get_spans() if spans is None else spans
+    pid = os.getpid()
+    main_thread = threading.main_thread()
+    events = [
+        {'ph': 'M', 'name': 'process_name', 'pid': pid, 'tid': main_thread.ident, 'args': {'name': command}},
+        {'ph': 'X', 'name': command, 'cat': 'command', 'pid': pid, 'tid': main_thread.ident,
+         'ts': int(start * 1e6), 'dur': int(wall_time * 1e6)}
+    ]
+    threads = {main_thread.ident: main_thread.name}
+    # Longest first, so that viewers nest spans starting at the same time correctly
+    for span in sorted(spans, key=lambda span: (span.start, -span.duration)):
+        threads.setdefault(span.thread_id, span.thread_name)
+        events.append({'ph': 'X', 'name': span.name, 'cat': span.category, 'pid': pid, 'tid': span.thread_id,
+                       'ts': int(span.start * 1e6), 'dur': max(int(span.duration * 1e6), 1)})
+    for thread_id, thread_name in threads.items():
+        events.append({'ph': 'M', 'name': 'thread_name', 'pid': pid, 'tid': thread_id, 'args': {'name': thread_name}})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def write_chrome_trace(log_file_path, command, start, wall_time):
+    """
+    Saves the Chrome trace-event timeline of the command next to its log file.
+    Failures are logged and never raised.
+    :param log_file_path: Path of the log file of the command
+    :param command: Name of the command
+    :param start: Start time of the command, seconds since the epoch
+    :param wall_time: Wall time of the command in seconds
+    :return: Path of the trace, None if it could not be saved
+    """
+    try:
+        trace_path = get_report_path(log_file_path, TRACE_FILE_POSTFIX)
+        with open(trace_path, 'w') as trace_file:
+            json.dump(build_chrome_trace(command, start, wall_time), trace_file)
+        LOG.info("Trace saved to {0}, open it with chrome://tracing or https://ui.perfetto.dev".format(trace_path))
+        return trace_path
+    except Exception as exception:
+        LOG.warning("Failed to save the trace: {0}".format(exception))
+        return None
+
+
+def report(log_file_path, wall_time):
+    """
+    Logs the timing report of the command and saves it as JSON next to its log file.
+    Failures are logged and never raised, the report must not change the outcome of the command.
+    :param log_file_path: Path of the log file of the command
+    :param wall_time: Wall time of the command in seconds
+    :return: Path of the JSON report, None if it could not be saved
+    """
+    try:
+        timing_report = build_report(wall_time)
+        log_report(timing_report)
+        report_path = get_report_path(log_file_path)
+        with open(report_path, 'w') as report_file:
+            json.dump(timing_report, report_file, indent=2)
+        LOG.info("Timing report saved to {0}".format(report_path))
+        return report_path
+    except Exception as exception:
+        LOG.warning("Failed to produce the timing report: {0}".format(exception))
+        return None
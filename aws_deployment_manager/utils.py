@@ -1,20 +1,28 @@
-"""This module contains a list of utility functions."""
+"""This module contains a list of utility functions.
+
+docker, boto3 and cerberus, through the modules using them, are imported by the functions using them, as they
+are slow to import and this module is loaded by every command of the CLI.
+"""
+# pylint: disable=import-outside-toplevel
+import asyncio
 import json
 import logging
-import time
 from datetime import datetime
 from pathlib import Path
 import subprocess
 import os
+import threading
 import base64
 import yaml
-import docker
-import boto3
-from cerberus import Validator
+from aws_deployment_manager import clock
 from aws_deployment_manager import constants
+from aws_deployment_manager import errors
+from aws_deployment_manager import timing
+from aws_deployment_manager import waiter
 
 LOG = logging.getLogger(__name__)
 USER_HOME = str(Path.home())
+_LOCAL = threading.local()
 
 
 def get_log_level_from_verbosity(verbosity):
@@ -83,65 +91,39 @@ def write_yaml(file_path, data):
                   sort_keys=False)
 
 
+def _get_config_validator():
+    """
+    :return: Validator of the IDUN configuration, compiled once per thread
+    """
+    if not hasattr(_LOCAL, 'config_validator'):
+        from aws_deployment_manager import schema
+        _LOCAL.config_validator = schema.ConfigValidator(schema.SCHEMA)
+    return _LOCAL.config_validator
+
+
 def validate_idun_config(config):
     """
     Validate IDUN Configuration Parameters
     :param config: Configuration object
     :return: True if configuration is valid, else returns array of validation errors
     """
+    validator = _get_config_validator()
+    configuration_valid = validator.validate(config)
+
     validation_errors = []
-    if os.path.exists('./aws_deployment_manager/schema.py'):
-        schema = eval(open('./aws_deployment_manager/schema.py', 'r').read())
-    else:
-        schema = eval(open('/venv/aws_deployment_manager/schema.py', 'r').read())
-
-    validator = Validator(schema)
-    configuration_valid = validator.validate(config, schema)
-
-    if not configuration_valid:
-        schema_errors = validator.errors
-        for param in schema_errors:
-            if 'regex' in str(schema_errors[param]):
-                validation_errors.append(
-                    "Schema Error for Parameter {0}. Error - {1}".format(param, 'Empty String in parameter value'))
-            else:
-                validation_errors.append(
-                    "Schema Error for Parameter {0}. Error - {1}".format(param, schema_errors[param]))
-
-    if len(validation_errors) > 0:
-        configuration_valid = False
-        return configuration_valid, validation_errors
-
-    # Check that AWS Region is supported
-    region = config[constants.AWS_REGION]
-    if region not in constants.SUPPORTED_REGIONS:
-        validation_errors.append("Region {0} is not supported. Please select region from {1}".
-                                 format(region, constants.SUPPORTED_REGIONS))
-
-    # Check that all mandatory parameters are provided
-    mandatory_parameters = [constants.ENVIRONMENT_NAME, constants.SECONDARY_VPC_CIDR,
-                            constants.NODE_INSTANCE_TYPE, constants.PRIVATE_DOMAIN_NAME]
-
-    for param in mandatory_parameters:
-        if not str(config[param]).strip():
-            validation_errors.append("Missing Mandatory Parameter - {0}".format(param))
-
-    private_subnet_ids = config[constants.WORKER_NODE_SUBNET_IDS].split(",")
-    if len(private_subnet_ids) > 2 or len(private_subnet_ids) < 1:
-        validation_errors.append("Minimum 1 and Maximum 2 Worker Node Subnet IDs to be provided. {0} provided".
-                                 format(len(private_subnet_ids)))
-
-    control_plane_subnet_ids = config[constants.CONTROL_PLANE_SUBNET_IDS].split(",")
-    if len(control_plane_subnet_ids) != 2:
-        validation_errors.append("2 Control Plane Subnet IDs to be provided. {0} provided".
-                                 format(len(private_subnet_ids)))
-
-    # secondary_cidr = str(config[constants.SECONDARY_VPC_CIDR])
-    # if not secondary_cidr.endswith("/22"):
-    #     validation_errors.append("Parameter {0} must have subnet of /22".format(constants.SECONDARY_VPC_CIDR))
-
-    if len(validation_errors) > 0:
-        configuration_valid = False
+    schema_errors = validator.errors
+    for param in schema_errors:
+        if 'regex' in str(schema_errors[param]):
+            validation_errors.append(
+                "Schema Error for Parameter {0}. Error - {1}".format(param, 'Empty String in parameter value'))
+        else:
+            validation_errors.append(
+                "Schema Error for Parameter {0}. Error - {1}".format(param, schema_errors[param]))
+
+    # The rules across parameters are only reported for configurations matching the schema
+    if not validation_errors:
+        validation_errors = list(validator.config_errors)
+
     return configuration_valid, validation_errors
 
 
@@ -208,16 +190,18 @@ def get_stack_parameters(stack_details):
     return stack_parameters
 
 
-def execute_command(command):
+def execute_command(command, env=None):
     """
     Execute a command on shell
     :param command: Command to be executed
+    :param env: Environment of the command, the one of this process if None
     :return: Command Response
     """
     LOG.info("Executing command - {0}".format(command))
 
-    proc = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-    stdout_value = proc.communicate()[0].decode("utf-8")
+    with timing.timed(_get_command_name(command), timing.CATEGORY_SUBPROCESS):
+        proc = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=env)
+        stdout_value = proc.communicate()[0].decode("utf-8")
 
     LOG.info("Command Output - ")
     LOG.info("{0}".format(stdout_value))
@@ -230,6 +214,48 @@ def execute_command(command):
     return stdout_value
 
 
+async def execute_command_async(command):
+    """
+    Execute a command from a coroutine, without blocking the event loop
+    :param command: Command to be executed on shell, or list of the program and its arguments executed without shell
+    :return: Command Response
+    """
+    command_line = command if isinstance(command, str) else ' '.join(command)
+    LOG.info("Executing command - {0}".format(command_line))
+
+    current_clock = clock.get_clock()
+    start = current_clock.time()
+    start_counter = current_clock.monotonic()
+    if isinstance(command, str):
+        proc = await asyncio.create_subprocess_shell(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    else:
+        proc = await asyncio.create_subprocess_exec(*command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    stdout_value = (await proc.communicate())[0].decode("utf-8")
+    # Coroutines of a loop share its thread, the span is added at the end rather than nested with timed
+    timing.add_span(_get_command_name(command_line), timing.CATEGORY_SUBPROCESS, start,
+                    current_clock.monotonic() - start_counter)
+
+    LOG.info("Command Output - ")
+    LOG.info("{0}".format(stdout_value))
+    return_value = proc.returncode
+    LOG.info("Return Code = {0}".format(return_value))
+
+    if return_value != 0:
+        raise Exception("Failed to execute command - {0}. Error is - {1}".format(command_line, stdout_value))
+
+    return stdout_value
+
+
+def _get_command_name(command):
+    """
+    Short name of a command for the timing report, without option values which may hold secrets
+    :param command: Command to be executed
+    :return: Name of the command
+    """
+    words = [word for word in command.split() if '=' not in word]
+    return ' '.join(words[:4])
+
+
 def get_stack_name_from_cluster(cluster_name):
     """
     Get IDUN Stack name from EKS Cluster Name
@@ -256,6 +282,7 @@ def test_docker_registry_login(registry_url, registry_user, registry_password):
     :param registry_password: Password
     :return: True if connection is successful, else raise Exception
     """
+    import docker
     docker_config_json = create_docker_config_json(registry_url, registry_user, registry_password)
     create_docker_config_json_file(docker_config_json=docker_config_json)
     client = docker.from_env()
@@ -457,25 +484,22 @@ def wait_for_all_pods_to_healthy(kubeconfig_path, max_retry=60, seconds_to_sleep
     """
     Wait for all PODs in K8S to be healthy
     :param kubeconfig_path: Path to kubeconfig file
+    :param max_retry: Number of checks after the first one
+    :param seconds_to_sleep: Seconds before each check
     :return: True if all PODs are healthy, or False if there are unhealthy PODs
     """
-    retry_count = 0
-    all_pods_healthy = False
-
-    while not all_pods_healthy:
-        LOG.info("Waiting for 1 min...")
-        time.sleep(seconds_to_sleep)
-
-        LOG.info("Checking PODs health status...")
-        all_pods_healthy, _ = get_unhealthy_pods(kubeconfig_path=kubeconfig_path)
-
-        if not all_pods_healthy:
-            retry_count += 1
-
-        if retry_count > max_retry:
-            break
-
-        LOG.info("Test {0} (max {1} retries)".format(retry_count, max_retry))
+    # Fixed delays, the PODs are checked max_retry times after the first check
+    backoff = waiter.Backoff(first_delay=seconds_to_sleep, factor=1, max_delay=seconds_to_sleep, jitter=0,
+                             max_attempts=max_retry + 1)
+    try:
+        all_pods_healthy = waiter.wait(
+            poll=lambda: get_unhealthy_pods(kubeconfig_path=kubeconfig_path)[0],
+            until=lambda healthy: healthy,
+            description="PODs to be healthy",
+            backoff=backoff,
+            category=timing.CATEGORY_SLEEP)
+    except errors.WaitTimeoutError:
+        all_pods_healthy = False
 
     LOG.info("All PODs healthy = {0}".format(all_pods_healthy))
     return all_pods_healthy
@@ -496,20 +520,31 @@ def create_file_from_template(file__in, file_out, replacements):
 
     write_file(file_out, content)
 
-def exec_cmd(command,template,substitutions):
+def render_template(template,substitutions):
     """
-    Create a temprary file from template replacing the key-value pairs in
-    substitutions and running the given command
-    :param command:            Command to execute
+    Create a temprary file from template replacing the key-value pairs in substitutions
     :param template:           Path to the template
     :param substitutions:      Dictionary of the replacements (each key-value is a replacement)
+    :return:                   Path to the temporary file
     """
     path_to_template = os.path.join(constants.TEMPLATES_DIR, template)
     path_to_tmp_file = os.path.join(constants.TEMPORARY_DIR, template)
     create_file_from_template(file__in=path_to_template,
                               file_out=path_to_tmp_file,
                               replacements=substitutions)
-    cmd = command.format(path_to_tmp_file, constants.KUBECONFIG_PATH)
+    return path_to_tmp_file
+
+def exec_cmd(command,template,substitutions,*args):
+    """
+    Create a temprary file from template replacing the key-value pairs in
+    substitutions and running the given command
+    :param command:            Command to execute
+    :param template:           Path to the template
+    :param substitutions:      Dictionary of the replacements (each key-value is a replacement)
+    :param args:               Arguments of the command after the temporary file and the kubeconfig, e.g. a chart
+    """
+    path_to_tmp_file = render_template(template, substitutions)
+    cmd = command.format(path_to_tmp_file, constants.KUBECONFIG_PATH, *args)
     return execute_command(command=cmd)
 
 def kubectl_apply(template,substitutions):
@@ -521,12 +556,14 @@ def kubectl_apply(template,substitutions):
     """
     exec_cmd(constants.COMMAND_KUBECTL_APPLY, template, substitutions)
 
-def get_aws_ecr_registry_id():
+def get_aws_ecr_registry_id(region=None):
     """
-    Fetch the ID of the Registry from ECR (use boto3 client)
+    Fetch the ID of the Registry from ECR
+    :param region: AWS Region, the default region of the session if None
     :return The RegistryId
     """
-    client = boto3.client('ecr')
+    from aws_deployment_manager.aws import aws_clientpool
+    client = aws_clientpool.get_client(constants.ECR_SERVICE, region)
     data = client.describe_registry()
     return data['registryId']
 
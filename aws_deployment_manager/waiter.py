@@ -0,0 +1,155 @@
+"""
+This module implements the waiter used by every loop waiting for AWS or Kubernetes.
+A waiter polls until the state it reads is final, with delays growing exponentially from a first delay
+up to a cap, randomized by a jitter so that parallel stages do not poll in step, and stops at a deadline.
+Each poll is reported to an optional progress callback, and the whole wait is recorded by the timing module.
+The delays are slept on the clock of the clock module, so that waits run on virtual time in tests.
+wait_async is the same waiter for the coroutines of the asyncio core, sleeping on the event loop.
+"""
+
+import logging
+import random
+
+from aws_deployment_manager import clock
+from aws_deployment_manager import errors
+from aws_deployment_manager import timing
+
+LOG = logging.getLogger(__name__)
+
+
+class Backoff:
+    """ Delays between the polls of a waiter, and when to give up """
+
+    def __init__(self, first_delay, factor=2.0, max_delay=30, jitter=0.1, timeout=None, max_attempts=None):
+        """
+        :param first_delay: Seconds before the first poll
+        :param factor: Growth factor of the delay after each poll
+        :param max_delay: Maximum delay in seconds
+        :param jitter: Fraction of the delay randomly added or removed
+        :param timeout: Seconds after which the waiter gives up, no deadline if None
+        :param max_attempts: Number of polls after which the waiter gives up, no limit if None
+        """
+        self.first_delay = first_delay
+        self.factor = factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+
+    def delays(self):
+        """
+        :return: Generator of the delays before each poll, in seconds
+        """
+        delay = self.first_delay
+        while True:
+            jittered = delay * random.uniform(1 - self.jitter, 1 + self.jitter) if self.jitter else delay
+            yield min(jittered, self.max_delay)
+            delay = min(delay * self.factor, self.max_delay)
+
+
+# Route53 changes usually sync within seconds. Deadline of the 10 retries of 30 s it used to have.
+ROUTE53_CHANGE = Backoff(first_delay=2, max_delay=30, timeout=300, max_attempts=15)
+# CloudFormation stacks take minutes to hours, e.g. EKS clusters
+CLOUDFORMATION_STACK = Backoff(first_delay=5, factor=1.5, max_delay=30, timeout=3 * 3600)
+EKS_CLUSTER_UPDATE = Backoff(first_delay=10, factor=1.5, max_delay=30, timeout=3600)
+EKS_NODEGROUP = Backoff(first_delay=15, factor=1.5, max_delay=30, timeout=2 * 3600)
+# Deadline of the 120 attempts of 60 s of the boto3 snapshot waiter
+EC2_SNAPSHOT = Backoff(first_delay=15, max_delay=60, timeout=2 * 3600)
+
+
+class _Wait:
+    """ Polls of a wait, shared by the blocking and the asyncio waiters """
+
+    def __init__(self, until, description, backoff, on_progress, format_state):
+        self.until = until
+        self.description = description
+        self.backoff = backoff
+        self.on_progress = on_progress
+        self.format_state = format_state
+        self.clock = clock.get_clock()
+        self.start = self.clock.monotonic()
+        self.attempts = 0
+        self.state = None
+
+    def delays(self):
+        """
+        :return: Generator of the delays before each poll, cut at the deadline
+        """
+        for delay in self.backoff.delays():
+            if self.backoff.timeout is not None:
+                delay = min(delay, max(self.backoff.timeout - (self.clock.monotonic() - self.start), 0))
+            yield delay
+
+    def polled(self, state):
+        """
+        Records the state read by a poll
+        :param state: State
+        :return: True if the state is final
+        :raises WaitTimeoutError: if the state is not final by the deadline or after the maximum number of polls
+        """
+        self.state = state
+        self.attempts += 1
+        waited = self.clock.monotonic() - self.start
+        LOG.info("Waiting for {0}: {1} (poll {2}, {3:.0f}s)".format(
+            self.description, self.format_state(state), self.attempts, waited))
+        if self.on_progress is not None:
+            self.on_progress(state, self.attempts, waited)
+        if self.until(state):
+            LOG.debug("Waited {0:.0f}s in {1} polls for {2}".format(waited, self.attempts, self.description))
+            return True
+        if (self.backoff.max_attempts is not None and self.attempts >= self.backoff.max_attempts) or \
+                (self.backoff.timeout is not None and waited >= self.backoff.timeout):
+            raise errors.WaitTimeoutError(
+                "Timed out waiting for {0} after {1:.0f}s and {2} polls, last state {3}".format(
+                    self.description, self.clock.monotonic() - self.start, self.attempts, self.format_state(state)),
+                state)
+        return False
+
+
+def wait(poll, until, description, backoff, category=timing.CATEGORY_AWS_WAIT, on_progress=None, format_state=str):
+    """
+    Polls a state until it is final
+    :param poll: Function reading the state
+    :param until: Function telling whether a state is final
+    :param description: Description of what is waited for, used in logs and timing spans
+    :param backoff: Backoff of the polls
+    :param category: Timing category of the wait
+    :param on_progress: Function called after each poll with the state, the number of polls and the seconds waited
+    :param format_state: Function formatting the state for the logs
+    :return: Final state
+    :raises WaitTimeoutError: if the state is not final by the deadline or after the maximum number of polls
+    """
+    polls = _Wait(until, description, backoff, on_progress, format_state)
+    with timing.timed(description, category):
+        for delay in polls.delays():
+            polls.clock.sleep(delay)
+            if polls.polled(poll()):
+                break
+    return polls.state
+
+
+async def wait_async(poll, until, description, backoff, category=timing.CATEGORY_AWS_WAIT, on_progress=None,
+                     format_state=str):
+    """
+    Polls a state until it is final, sleeping on the event loop
+    :param poll: Coroutine function reading the state
+    :param until: Function telling whether a state is final
+    :param description: Description of what is waited for, used in logs and timing spans
+    :param backoff: Backoff of the polls
+    :param category: Timing category of the wait
+    :param on_progress: Function called after each poll with the state, the number of polls and the seconds waited
+    :param format_state: Function formatting the state for the logs
+    :return: Final state
+    :raises WaitTimeoutError: if the state is not final by the deadline or after the maximum number of polls
+    """
+    polls = _Wait(until, description, backoff, on_progress, format_state)
+    start = polls.clock.time()
+    try:
+        for delay in polls.delays():
+            await polls.clock.sleep_async(delay)
+            if polls.polled(await poll()):
+                break
+    finally:
+        # Coroutines of a loop share its thread, the span is added at the end rather than nested with timed
+        timing.add_span(description, category, start, polls.clock.monotonic() - polls.start)
+    return polls.state
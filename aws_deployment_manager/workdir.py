@@ -43,3 +43,23 @@ class Workdir:
     def __create_directory_structure(self):
         """Create the directory structure of the working directory."""
         Path(self.logs_directory).mkdir(parents=True, exist_ok=True)
+
+
+def relocate(workdir_path):
+    """
+    Moves the working directory of the process, and every file the commands keep in it, to another path.
+    The paths are process wide, so the working directories of several environments can only be used by
+    separate processes.
+    :param workdir_path: Path of the new working directory
+    """
+    workdir_path = str(workdir_path)
+    constants.WORKDIR_PATH = workdir_path
+    constants.CONFIG_FILE_PATH = str(Path(workdir_path) / "config.yaml")
+    constants.LOGS_DIRECTORY_PATH = str(Path(workdir_path) / constants.LOGS_DIRECTORY_NAME)
+    constants.KUBECONFIG_PATH = str(Path(workdir_path) / "config")
+    constants.INSTALL_STAGE_LOG_PATH = str(Path(workdir_path) / ".install_stage.log")
+    constants.IMAGE_INVENTORY_PATH = str(Path(workdir_path) / ".image_inventory.json")
+    constants.CNI_MANIFEST_CACHE_DIR = str(Path(workdir_path) / ".cni_manifests")
+    constants.HELM_CHART_CACHE_DIR = str(Path(workdir_path) / ".helm_charts")
+    constants.HELM_CACHE_DIR = str(Path(workdir_path) / ".helm_cache")
+    LOG.debug("Working directory relocated to {0}".format(workdir_path))
@@ -2,10 +2,26 @@
 
 import logging
 import glob
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 import yaml
 
 LOG = logging.getLogger(__name__)
 
+# libyaml C loader when PyYAML has been built with it, pure-Python loader otherwise
+SAFE_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# A document can only contain an image if this matches somewhere in its text.
+# Quoted keys ("image": ...) and spaces before the colon are accepted, false positives are harmless.
+_IMAGE_KEY_PATTERN = re.compile(r'\bimage["\']?\s*:')
+_DOCUMENT_SEPARATOR_PATTERN = re.compile(r'^---(?=[ \t]|$)', re.MULTILINE)
+
+# Templates are only scanned across processes from this total size. Spawning a worker takes about 0.2s and
+# the in-process scan goes through about 8 MB/s, the shipped templates (0.4 MB) take 0.04s in process.
+PARALLEL_SCAN_MIN_BYTES = 8 * 1024 * 1024
+
 def load_yaml_document_from_file(filename):
     """
     YAML file can contains multiple documents separated by a triple dash.
@@ -20,7 +36,7 @@ def load_yaml_document_from_file(filename):
     yaml_document_in_file = []
     with open(filename, "rb") as file:
         try:
-            for config in yaml.safe_load_all(file):
+            for config in yaml.load_all(file, Loader=SAFE_LOADER):
                 yaml_document_in_file.append(config)
         except Exception as excpt:
             logging.info(f'{filename} seems to not be a valid YAML')
@@ -60,20 +76,67 @@ def extract_images(data, image_set, keys):
                     logging.info(f'Skipping -->{value}<-- because is not str nor dict')
             extract_images(value, image_set, keys)
 
-def get_image_from_template(foldername, blacklist):
+def scan_images_in_file(filename, keys=("image",)):
     """
-    This function will create a set of images read from the template
+    Returns the images found in a YAML file.
+    Documents are split on their separator and only the ones that can contain one of the keys
+    are parsed. If the split documents cannot be parsed, the whole file is loaded instead.
+    :param filename: Path of the YAML file
+    :param keys: the list of keys that will be looked for
+    :return: set of images
     """
     image_set = set()
-    for filename in glob.glob(foldername+'/*.yaml'):
+    with open(filename, "r") as file:
+        text = file.read()
+    if not _IMAGE_KEY_PATTERN.search(text):
+        return image_set
+    try:
+        for document in _DOCUMENT_SEPARATOR_PATTERN.split(text):
+            if not _IMAGE_KEY_PATTERN.search(document):
+                continue
+            for data in yaml.load_all(document, Loader=SAFE_LOADER):
+                extract_images(data, image_set, keys)
+    except yaml.YAMLError:
+        LOG.debug(f'Falling back to loading {filename} as a whole')
+        image_set = set()
+        for data in load_yaml_document_from_file(filename):
+            extract_images(data, image_set, keys)
+    return image_set
+
+def get_image_from_template(foldername, blacklist, max_workers=None):
+    """
+    This function will create a set of images read from the template.
+    Files are scanned in process, or across a process pool when they are large enough for it to pay off.
+    :param foldername: folder containing the YAML files
+    :param blacklist: list of files to skip
+    :param max_workers: number of worker processes, defaults to the number of CPUs from
+                        PARALLEL_SCAN_MIN_BYTES of files and to 1, in process, below
+    """
+    filenames = []
+    for filename in sorted(glob.glob(foldername+'/*.yaml')):
         logging.debug(f'filename={filename} balcklist={blacklist}')
         if filename in blacklist:
             logging.info(f"Skipping file {filename} because it is in blacklist")
             continue
-        for data in load_yaml_document_from_file(filename):
-            extract_images(data, image_set, ["image"])
-    return image_set
-
+        filenames.append(filename)
 
-if __name__ == '__main__':
-    logging.basicConfig(level=logging.DEBUG)
+    if max_workers is None:
+        total_size = sum(os.path.getsize(filename) for filename in filenames)
+        max_workers = (os.cpu_count() or 1) if total_size >= PARALLEL_SCAN_MIN_BYTES else 1
+    max_workers = min(max_workers, len(filenames))
+    image_set = set()
+    if max_workers > 1:
+        try:
+            # Spawned rather than forked, the commands run threads which may hold locks at fork time
+            with ProcessPoolExecutor(max_workers=max_workers,
+                                     mp_context=multiprocessing.get_context('spawn')) as executor:
+                for images in executor.map(scan_images_in_file, filenames):
+                    image_set.update(images)
+            return image_set
+        except (OSError, ImportError) as exception:
+            # e.g. no /dev/shm in the container, scan in process instead
+            LOG.debug(f'Process pool not available, scanning sequentially: {exception}')
+            image_set = set()
+    for filename in filenames:
+        image_set.update(scan_images_in_file(filename))
+    return image_set